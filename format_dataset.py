@@ -8,6 +8,7 @@ documentation.
 
 import numpy as np
 import h5py
+from scipy import sparse
 
 
 # The following variables are defined as an example, you should modify them to fit your dataset files.
@@ -23,21 +24,43 @@ hdf5_file = h5py.File("path/to/file.hdf5", "w")
 
 # Store each view in a hdf5 dataset :
 for view_index, (file_path, view_name) in enumerate(zip(data_file_paths, view_names)):
-    # Get the view's data from the csv file
-    view_data = np.genfromtxt(file_path, delimiter=",")
-
-    # Store it in a dataset in the hdf5 file,
-    # do not modify the name of the dataset
-    view_dataset = hdf5_file.create_dataset(name="View{}".format(view_index),
-                                            shape=view_data.shape,
-                                            data=view_data)
+    # Get the view's data from the csv file, or from a scipy.sparse
+    # matrix saved with scipy.sparse.save_npz
+    if file_path.endswith(".npz"):
+        view_data = sparse.load_npz(file_path)
+    else:
+        view_data = np.genfromtxt(file_path, delimiter=",")
+
+    if sparse.issparse(view_data):
+        # Store the sparse view in CSR format in a group,
+        # do not modify the names of the group and of its datasets
+        view_data = sparse.csr_matrix(view_data)
+        view_dataset = hdf5_file.create_group(name="View{}".format(view_index))
+        view_dataset.create_dataset("data", data=view_data.data)
+        view_dataset.create_dataset("indices", data=view_data.indices)
+        view_dataset.create_dataset("indptr", data=view_data.indptr)
+        view_dataset.attrs["shape"] = view_data.shape
+    else:
+        # Store it in a dataset in the hdf5 file,
+        # do not modify the name of the dataset.
+        # The view is chunked in blocks of rows of about 256KB and compressed,
+        # which speeds up the reading of the samples of a fold.
+        chunk_rows = max(1, min(view_data.shape[0],
+                                 256 * 1024 // view_data[0].nbytes))
+        view_dataset = hdf5_file.create_dataset(name="View{}".format(view_index),
+                                                shape=view_data.shape,
+                                                data=view_data,
+                                                chunks=(chunk_rows,
+                                                        view_data.shape[1]),
+                                                compression="lzf",
+                                                shuffle=True)
     # Store the name of the view in an attribute,
     # do not modify the attribute's key
     view_dataset.attrs["name"] = view_name
 
-    # This is an artifact of work in progress for sparse support, not available ATM,
+    # Store whether the view is sparse in an attribute,
     # do not modify the attribute's key
-    view_dataset.attrs["sparse"] = False
+    view_dataset.attrs["sparse"] = sparse.issparse(view_data)
 
 # Get le labels data from a csv file
 labels_data = np.genfromtxt(labels_file_path, delimiter=',')
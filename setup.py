@@ -56,6 +56,8 @@ def setup_package():
     # Une url qui pointe vers la page officielle de votre lib
     url='http://gitlab.lis-lab.fr/baptiste.bauvin/summit/',
     install_requires=requirements,
+    entry_points={
+        'console_scripts': ['summit = summit.execute:main']},
     extras_require={
             'dev': ['pytest', 'pytest-cov'],
             'doc': ['sphinx >= 3.0.2', 'numpydoc', 'docutils', 'sphinx-autoapi',
@@ -1,5 +1,6 @@
 """This is the execution module, used to execute the code"""
 
+import argparse
 import os
 
 
@@ -62,5 +63,135 @@ def execute(config_path=None):  # pragma: no cover
         exec_classif.exec_classif(["--config_path", config_path])
 
 
+def repack(arguments):
+    """Rewrites SuMMIT HDF5 files with a chunked and compressed layout"""
+    from summit.multiview_platform.utils.dataset import repack_hdf5
+    parser = argparse.ArgumentParser(
+        prog="summit repack",
+        description='Rewrites SuMMIT HDF5 files with row-block chunks, '
+                    'compression and shuffle filter.',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('files', nargs='+', metavar='FILE',
+                        help='The HDF5 files to repack')
+    parser.add_argument('--output', metavar='FILE', default=None,
+                        help='The path of the repacked file, if only one '
+                             'file is repacked, else the files are replaced')
+    parser.add_argument('--compression', choices=['lzf', 'gzip', 'none'],
+                        default='lzf', help='The compression filter')
+    parser.add_argument('--compression_opts', type=int, default=None,
+                        help='The gzip compression level')
+    parser.add_argument('--chunk_rows', type=int, default=None,
+                        help='The number of rows in each chunk, by default '
+                             'chunks of about 256KB')
+    parser.add_argument('--no_shuffle', action='store_true',
+                        help='Disables the shuffle filter')
+    parser.add_argument('--float32', action='store_true',
+                        help='Downcasts the floating point views to float32')
+    args = parser.parse_args(arguments)
+    if args.output is not None and len(args.files) > 1:
+        parser.error("--output can only be used with a single file")
+    for file_path in args.files:
+        repack_hdf5(file_path, output_path=args.output,
+                    chunk_rows=args.chunk_rows or "auto",
+                    compression=None if args.compression == 'none'
+                    else args.compression,
+                    compression_opts=args.compression_opts,
+                    shuffle=not args.no_shuffle, float32=args.float32)
+
+
+def run_worker(queue_dir, lease_timeout, poll_interval, idle_timeout,
+               max_tasks):  # pragma: no cover
+    from summit.multiview_platform.exec_classif import exec_one_task
+    from summit.multiview_platform.utils.task_queue import TaskQueue
+    task_queue = TaskQueue(queue_dir, lease_timeout=lease_timeout,
+                           poll_interval=poll_interval)
+    return task_queue.work(exec_one_task, idle_timeout=idle_timeout,
+                           max_tasks=max_tasks)
+
+
+def worker(arguments):  # pragma: no cover
+    """Runs the tasks of a benchmark queued in a shared directory"""
+    import logging
+    from multiprocessing import Process
+    parser = argparse.ArgumentParser(
+        prog="summit worker",
+        description='Claims and runs the experiments written in a task '
+                    'queue directory by benchmarks configured with '
+                    'task_queue.',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--queue', metavar='DIR', required=True,
+                        help='The task queue directory')
+    parser.add_argument('--nb_processes', type=int, default=1,
+                        help='The number of worker processes to start')
+    parser.add_argument('--lease_timeout', type=float, default=600,
+                        help='The lease_timeout of the benchmarks, in '
+                             'seconds')
+    parser.add_argument('--poll_interval', type=float, default=1.0,
+                        help='The delay between two scans of the queue, in '
+                             'seconds')
+    parser.add_argument('--idle_timeout', type=float, default=None,
+                        help='Stops after this many seconds without any '
+                             'task, by default the worker never stops')
+    parser.add_argument('--max_tasks', type=int, default=None,
+                        help='Stops after this many tasks in each process')
+    args = parser.parse_args(arguments)
+    logging.basicConfig(format='%(asctime)s %(process)d %(levelname)s: '
+                               '%(message)s', level=logging.INFO)
+    worker_args = (args.queue, args.lease_timeout, args.poll_interval,
+                   args.idle_timeout, args.max_tasks)
+    if args.nb_processes <= 1:
+        run_worker(*worker_args)
+    else:
+        processes = [Process(target=run_worker, args=worker_args)
+                     for _ in range(args.nb_processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+
+def plan(arguments):  # pragma: no cover
+    """Estimates the duration and memory of a benchmark without running it"""
+    from summit.multiview_platform.exec_classif import plan_benchmark
+    from summit.multiview_platform.utils import configuration
+    parser = argparse.ArgumentParser(
+        prog="summit plan",
+        description='Expands the benchmark of a configuration file without '
+                    'training anything, and estimates its total time, its '
+                    'critical path and its peak memory from the durations '
+                    'of the previous benchmarks.',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--config_path', metavar='FILE', required=True,
+                        help='The configuration file of the benchmark')
+    parser.add_argument('--nb_cores', type=int, default=None,
+                        help='The number of cores of the run, by default '
+                             'the nb_cores of the configuration')
+    parser.add_argument('--history', metavar='DIR', default=None,
+                        help='The directory of the previous results, by '
+                             'default the res_dir of the configuration')
+    args = parser.parse_args(arguments)
+    print(plan_benchmark(configuration.get_the_args(args.config_path),
+                         nb_cores=args.nb_cores,
+                         history_directory=args.history))
+
+
+def main(arguments=None):  # pragma: no cover
+    """
+    Entry point of the summit command : "summit repack ..." runs the
+    repack command, "summit worker ..." runs a task queue worker, "summit
+    plan ..." estimates the cost of a benchmark, any other arguments are
+    passed to the benchmark.
+    """
+    import sys
+    if arguments is None:
+        arguments = sys.argv[1:]
+    commands = {"repack": repack, "worker": worker, "plan": plan}
+    if arguments and arguments[0] in commands:
+        commands[arguments[0]](arguments[1:])
+    else:
+        from summit.multiview_platform import exec_classif
+        exec_classif.exec_classif(arguments)
+
+
 if __name__ == "__main__":
     execute()
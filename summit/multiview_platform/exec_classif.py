@@ -1,8 +1,12 @@
+import copy
+import glob
+import hashlib
 import logging
 import os
 import pkgutil
 import time
 import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import matplotlib
 import numpy as np
@@ -10,12 +14,24 @@ import numpy as np
 # Import own modules
 from . import monoview_classifiers
 from . import multiview_classifiers
-from .monoview.exec_classif_mono_view import exec_monoview
+from .monoview.exec_classif_mono_view import exec_monoview, load_view
 from .multiview.exec_multiview import exec_multiview
+from .multiview.multiview_utils import MultiviewResult
+from .result_analysis.duration_analysis import load_durations
 from .result_analysis.execution import analyze_iterations, analyze
 from .utils import execution, dataset, configuration
-from .utils.dataset import delete_HDF5
-from .utils.organization import secure_file_path
+from .utils.dataset import delete_HDF5, ViewPrefetcher
+from .utils.hyper_parameter_search import summarize_partial_report
+from .utils.result_cache import ResultCache, collect_outputs, \
+    restore_outputs, hash_random_state
+from .utils.supervision import get_task_limits, run_supervised, \
+    TaskLimitExceeded
+from .utils.task_queue import TaskQueue, get_run_id
+from .utils.planning import load_cost_history, fit_cost_model, \
+    estimate_duration, get_task_size, get_train_size, plan_schedule, \
+    simulate_schedule, format_duration, format_plan
+from .utils.organization import secure_file_path, save_task_results, \
+    load_task_results, get_checkpoint_path
 
 matplotlib.use(
     'Agg')  # Anti-Grain Geometry C++ library to make a raster (pixel) image of the figure
@@ -106,8 +122,9 @@ def init_multiview_exps(classifier_names, views_dictionary, nb_class,
                                                     {"param_grid": hps_kwargs[
                                                         classifier_name]},
                                                     views_dictionary=views_dictionary)]
-        elif hps_method == "Random":
-            hps_kwargs = get_random_hps_args(hps_kwargs, classifier_name)
+        elif hps_method in HPS_ARGS:
+            hps_kwargs = get_random_hps_args(hps_kwargs, classifier_name,
+                                             hps_method)
             multiview_arguments += [
                 gen_single_multiview_arg_dictionary(classifier_name,
                                                     arguments,
@@ -122,10 +139,10 @@ def init_multiview_exps(classifier_names, views_dictionary, nb_class,
                                                     hps_kwargs,
                                                     views_dictionary=views_dictionary)]
         else:
-            raise ValueError('At the moment only "None",  "Random" or "Grid" '
-                             'are available as hyper-parameter search '
-                             'methods, sadly "{}" is not'.format(hps_method)
-                             )
+            raise ValueError('At the moment only "None",  "Random", '
+                             '"Halving", "Bayesian" or "Grid" are available '
+                             'as hyper-parameter search methods, sadly "{}" '
+                             'is not'.format(hps_method))
 
     return multiview_arguments
 
@@ -168,8 +185,9 @@ def init_monoview_exps(classifier_names,
                                                                {"param_grid":
                                                                 hps_kwargs[
                                                                     classifier_name]})
-            elif hps_method == "Random":
-                hps_kwargs = get_random_hps_args(hps_kwargs, classifier_name)
+            elif hps_method in HPS_ARGS:
+                hps_kwargs = get_random_hps_args(hps_kwargs, classifier_name,
+                                                 hps_method)
                 arguments = gen_single_monoview_arg_dictionary(classifier_name,
                                                                kwargs_init,
                                                                nb_class,
@@ -186,18 +204,29 @@ def init_monoview_exps(classifier_names,
 
             else:
                 raise ValueError(
-                    'At the moment only "None",  "Random" or "Grid" '
-                    'are available as hyper-parameter search '
-                    'methods, sadly "{}" is not'.format(hps_method)
+                    'At the moment only "None",  "Random", "Halving", '
+                    '"Bayesian" or "Grid" are available as hyper-parameter '
+                    'search methods, sadly "{}" is not'.format(hps_method)
                 )
             monoview_arguments.append(arguments)
     return monoview_arguments
 
 
-def get_random_hps_args(hps_args, classifier_name):
+# The hps_args used by each sampling hyper-parameter search method, the
+# classifier-specific ones being its param_distributions
+HPS_ARGS = {"Random": ["n_iter", "equivalent_draws", "pruning",
+                       "pruning_warmup", "pruning_confidence"],
+            "Halving": ["n_iter", "equivalent_draws", "factor",
+                        "min_resources"],
+            "Bayesian": ["n_iter", "equivalent_draws", "n_startup",
+                         "batch_size", "gamma", "n_ei_candidates", "pruning",
+                         "pruning_warmup", "pruning_confidence"]}
+
+
+def get_random_hps_args(hps_args, classifier_name, hps_method="Random"):
     hps_dict = {}
     for key, value in hps_args.items():
-        if key in ["n_iter", "equivalent_draws"]:
+        if key in HPS_ARGS[hps_method]:
             hps_dict[key] = value
         if key==classifier_name:
             hps_dict["param_distributions"] = value
@@ -540,6 +569,177 @@ def benchmark_init(directory, classification_indices, labels, labels_dictionary,
 #     return [flag, results_monoview + results_multiview]
 
 
+def get_task_id(task_type, arguments):
+    """
+    Returns the identifier of an experiment in its benchmark, used for its
+    tracebacks and checkpoints.
+    """
+    if task_type == "monoview":
+        return arguments["classifier_name"] + "-" + arguments["view_name"]
+    return arguments["classifier_name"]
+
+
+def get_task_random_state(random_state, task_id):
+    """
+    Returns the random state of an experiment, seeded from the current state
+    of the random state of its iteration and from the identifier of the
+    experiment (see get_task_id), without advancing the former.
+    """
+    seed = hashlib.sha1((hash_random_state(random_state) + task_id).encode(
+        "utf-8")).hexdigest()
+    return np.random.RandomState(int(seed[:8], 16))
+
+
+def exec_one_task(dataset_var=None, task_type="monoview", arguments=None,
+                  labels_dictionary=None, directory=None,
+                  classification_indices=None, args=None, k_folds=None,
+                  random_state=None, hyper_param_search=None, metrics=None,
+                  labels=None, track_tracebacks=False, position=None,
+                  result_cache=None, view_data=None,
+                  **kwargs):  # pragma: no cover
+    """
+    Runs a single monoview or multiview experiment of a benchmark, returns
+    the list of its results (empty if it failed) and its traceback
+    dictionary. If position, the index of the experiment in the benchmark, is
+    given, they are checkpointed in directory as soon as the experiment ends.
+
+    For a monoview experiment, view_data, as returned by
+    monoview.exec_classif_mono_view.load_view, spares loading the view. It
+    can also be a function returning it, only called if the experiment is
+    actually run.
+
+    The experiment runs with its own random state, seeded from random_state
+    and its identifier (see get_task_random_state), so its result does not
+    depend on the other experiments of the benchmark, nor on their order,
+    and random_state is left untouched.
+
+    If a result_cache (see utils.result_cache.ResultCache) is given, a cached
+    result of the same experiment is returned instead of running it, and the
+    output files of the experiment are restored in its directory.
+
+    If the configuration gives the classifier a time or memory budget (see
+    utils.supervision.get_task_limits), the experiment runs in a supervised
+    subprocess, killed if it exceeds the budget. The kill is then reported
+    as a failure of the experiment, with the partial results of its
+    hyper-parameter search.
+    """
+    logging.getLogger('matplotlib.font_manager').disabled = True
+    task_id = get_task_id(task_type, arguments)
+    task_random_state = get_task_random_state(random_state, task_id)
+    cached = None
+    if result_cache is not None:
+        cache_key = result_cache.get_key(task_type, arguments,
+                                         classification_indices, k_folds,
+                                         task_random_state, hyper_param_search,
+                                         metrics, labels_dictionary,
+                                         args["hps_iter"])
+        cached = result_cache.get(cache_key)
+    if cached is not None:
+        logging.info("Info:\t Loaded the cached results of " + task_id)
+        result, outputs = cached
+        restore_outputs(get_task_directory(directory, task_type, arguments),
+                        outputs)
+        task_results = [[result], {}]
+    else:
+        if callable(view_data):
+            view_data = view_data()
+        experiment_kwargs = dict(
+            dataset_var=dataset_var, task_type=task_type, arguments=arguments,
+            labels_dictionary=labels_dictionary, directory=directory,
+            classification_indices=classification_indices, args=args,
+            k_folds=k_folds, random_state=task_random_state,
+            hyper_param_search=hyper_param_search, metrics=metrics,
+            labels=labels, view_data=view_data)
+        limits = get_task_limits(args, arguments["classifier_name"])
+        try:
+            if limits["timeout_s"] is None and limits["max_rss_mb"] is None:
+                result = run_experiment(**experiment_kwargs)
+            else:
+                try:
+                    result = run_supervised(run_supervised_experiment,
+                                            experiment_kwargs, **limits)
+                except TaskLimitExceeded as exceeded:
+                    raise TaskLimitExceeded(
+                        task_id + " : " + str(exceeded) + get_partial_hps(
+                            directory, task_type, arguments)) from None
+            task_results = [[result], {}]
+        except BaseException:
+            if track_tracebacks:
+                task_results = [[], {task_id: traceback.format_exc()}]
+            else:
+                raise
+        else:
+            if result_cache is not None:
+                result_cache.put(cache_key, (
+                    result, collect_outputs(get_task_directory(
+                        directory, task_type, arguments))))
+    if position is not None:
+        save_task_results(directory, position, task_id, *task_results,
+                          random_state=random_state.get_state()
+                          if isinstance(random_state, np.random.RandomState)
+                          else None)
+    return task_results
+
+
+def run_experiment(dataset_var=None, task_type="monoview", arguments=None,
+                   labels_dictionary=None, directory=None,
+                   classification_indices=None, args=None, k_folds=None,
+                   random_state=None, hyper_param_search=None, metrics=None,
+                   labels=None, view_data=None):  # pragma: no cover
+    """Runs the monoview or multiview experiment of a task"""
+    labels_names = list(labels_dictionary.values())
+    if task_type == "monoview":
+        if view_data is None:
+            view_data = load_view(dataset_var, arguments["view_index"],
+                                  classification_indices)
+        X, Y, train_test = view_data
+        return exec_monoview(directory, X, Y, args["name"], labels_names,
+                             classification_indices, k_folds, 1,
+                             args["file_type"], args["pathf"], random_state,
+                             hyper_param_search=hyper_param_search,
+                             metrics=metrics, train_test=train_test,
+                             **arguments)
+    else:
+        return exec_multiview(directory, dataset_var, args["name"],
+                              classification_indices, k_folds, 1,
+                              args["file_type"], args["pathf"],
+                              labels_dictionary, random_state, labels,
+                              hps_method=hyper_param_search, metrics=metrics,
+                              n_iter=args["hps_iter"],
+                              fold_cache_size=args["fold_cache_size"],
+                              **arguments)
+
+
+def run_supervised_experiment(**kwargs):  # pragma: no cover
+    """
+    Runs an experiment in the subprocess of utils.supervision.run_supervised.
+    """
+    logging.getLogger('matplotlib.font_manager').disabled = True
+    return run_experiment(**kwargs)
+
+
+def get_task_directory(directory, task_type, arguments):
+    """Returns the directory in which an experiment writes its outputs"""
+    if task_type == "monoview":
+        return os.path.join(directory, arguments["classifier_name"],
+                            arguments["view_name"])
+    return os.path.join(directory, arguments["classifier_name"])
+
+
+def get_partial_hps(directory, task_type, arguments):
+    """
+    Returns the summary of the partial hyper-parameter search reports left
+    by an interrupted task, see HPSearch.record_partial_score.
+    """
+    summary = ""
+    for file_name in sorted(glob.glob(os.path.join(
+            get_task_directory(directory, task_type, arguments),
+            "*hps_partial_report.txt"))):
+        summary += "\nPartial hyper-parameter search, kept in " + \
+            file_name + " :\n" + summarize_partial_report(file_name)
+    return summary
+
+
 def exec_one_benchmark_mono_core(dataset_var=None, labels_dictionary=None,
                                  directory=None, classification_indices=None,
                                  args=None,
@@ -548,68 +748,324 @@ def exec_one_benchmark_mono_core(dataset_var=None, labels_dictionary=None,
                                  argument_dictionaries=None,
                                  benchmark=None, views=None, views_indices=None,
                                  flag=None, labels=None,
-                                 track_tracebacks=False):  # pragma: no cover
-    results_monoview, labels_names = benchmark_init(directory,
-                                                    classification_indices,
-                                                    labels,
-                                                    labels_dictionary, k_folds,
-                                                    dataset_var)
-    logging.getLogger('matplotlib.font_manager').disabled = True
-    logging.info("Start:\t monoview benchmark")
+                                 track_tracebacks=False,
+                                 result_cache=None):  # pragma: no cover
+    """
+    Runs the experiments of a benchmark one after the other. The results of
+    each experiment are checkpointed in directory, and the ones already
+    there, saved by an interrupted run, are loaded instead of being run
+    again, leaving the random state as the experiment had left it.
+
+    The monoview experiments are run view by view : each view and its
+    train/test split are loaded once, shared by all the experiments on it,
+    and freed before loading the next one. If args["prefetch_views"] is set,
+    the next views are read in the background while the current one is used.
+    """
+    results, labels_names = benchmark_init(directory,
+                                           classification_indices,
+                                           labels,
+                                           labels_dictionary, k_folds,
+                                           dataset_var)
     traceback_outputs = {}
-    for arguments in argument_dictionaries["monoview"]:
-        try:
-            X = dataset_var.get_v(arguments["view_index"])
-            Y = dataset_var.get_labels()
-            results_monoview += [
-                exec_monoview(directory, X, Y, args["name"], labels_names,
-                              classification_indices, k_folds,
-                              1, args["file_type"], args["pathf"], random_state,
-                              hyper_param_search=hyper_param_search,
-                              metrics=metrics,
-                              **arguments)]
-        except BaseException:
-            if track_tracebacks:
-                traceback_outputs[
-                    arguments["classifier_name"] + "-" + arguments[
-                        "view_name"]] = traceback.format_exc()
+    prefetcher = None
+    if args["prefetch_views"]:
+        # The views of which an experiment has not been checkpointed yet
+        requests = [(group[0][1]["view_index"], None) for group in
+                    group_by_view(argument_dictionaries["monoview"])
+                    if any(not os.path.exists(get_checkpoint_path(
+                        directory, index, get_task_id("monoview", arguments)))
+                        for index, arguments in group)]
+        prefetcher = ViewPrefetcher(dataset_var, requests,
+                                    buffer_size=args["prefetch_views"])
+    for task_type in ["monoview", "multiview"]:
+        logging.info("Start:\t " + task_type + " benchmark")
+        if task_type == "monoview":
+            position_offset = 0
+            groups = group_by_view(argument_dictionaries["monoview"])
+        else:
+            position_offset = len(argument_dictionaries["monoview"])
+            groups = [list(enumerate(argument_dictionaries["multiview"]))]
+        for group in groups:
+            if task_type == "monoview":
+                view_data, loaded = get_view_loader(
+                    dataset_var, group[0][1]["view_index"],
+                    classification_indices, prefetcher=prefetcher)
             else:
-                raise
+                view_data, loaded = None, None
+            for index, arguments in group:
+                position = position_offset + index
+                checkpoint = load_task_results(directory, position,
+                                               get_task_id(task_type,
+                                                           arguments))
+                if checkpoint is None:
+                    checkpoint = exec_one_task(
+                        dataset_var=dataset_var, task_type=task_type,
+                        arguments=arguments,
+                        labels_dictionary=labels_dictionary,
+                        directory=directory,
+                        classification_indices=classification_indices,
+                        args=args, k_folds=k_folds, random_state=random_state,
+                        hyper_param_search=hyper_param_search,
+                        metrics=metrics, labels=labels,
+                        track_tracebacks=track_tracebacks,
+                        position=position, result_cache=result_cache,
+                        view_data=view_data)
+                else:
+                    logging.info("Info:\t Loaded the checkpointed results of "
+                                 + get_task_id(task_type, arguments))
+                    if checkpoint[2] is not None:
+                        # Leaves the random state as the run had left it
+                        random_state.set_state(checkpoint[2])
+                results += checkpoint[0]
+                traceback_outputs.update(checkpoint[1])
+            if prefetcher is not None and loaded == []:
+                # All the experiments on the view were cached
+                prefetcher.discard(group[0][1]["view_index"])
+            # Frees the view before loading the next one
+            del view_data, loaded
+        if prefetcher is not None and task_type == "monoview":
+            prefetcher.close()
+            prefetcher.log_info()
+        logging.info("Done:\t " + task_type + " benchmark")
+    return [flag, results, traceback_outputs]
+
+
+def get_view_loader(dataset_var, view_index, classification_indices,
+                    prefetcher=None):
+    """
+    Returns a function loading a view on its first call, see load_view, so
+    that a view is not read if all its experiments are cached, and the list
+    that holds the view once it is loaded.
+    """
+    loaded = []
+
+    def load():
+        if not loaded:
+            loaded.append(load_view(dataset_var, view_index,
+                                    classification_indices,
+                                    prefetcher=prefetcher))
+        return loaded[0]
+    return load, loaded
 
-    logging.info("Done:\t monoview benchmark")
 
-    logging.info("Start:\t multiview arguments initialization")
+def group_by_view(monoview_arguments):
+    """
+    Groups the monoview experiments by view, in the order of their first
+    appearance, keeping their index in monoview_arguments.
 
-    # argument_dictionaries = initMultiviewArguments(args, benchmark, views,
-    #                                               views_indices,
-    #                                               argument_dictionaries,
-    #                                               random_state, directory,
-    #                                               resultsMonoview,
-    #                                               classification_indices)
-    logging.info("Done:\t multiview arguments initialization")
+    Returns
+    -------
+    groups : list of lists of (index, arguments) couples
+    """
+    groups = {}
+    for index, arguments in enumerate(monoview_arguments):
+        groups.setdefault(arguments["view_index"], []).append(
+            (index, arguments))
+    return list(groups.values())
 
-    logging.info("Start:\t multiview benchmark")
-    results_multiview = []
-    for arguments in argument_dictionaries["multiview"]:
-        try:
-            results_multiview += [
-                exec_multiview(directory, dataset_var, args["name"],
-                               classification_indices,
-                               k_folds, 1, args["file_type"],
-                               args["pathf"], labels_dictionary, random_state,
-                               labels,
-                               hps_method=hyper_param_search,
-                               metrics=metrics, n_iter=args["hps_iter"],
-                               **arguments)]
-        except BaseException:
-            if track_tracebacks:
-                traceback_outputs[
-                    arguments["classifier_name"]] = traceback.format_exc()
-            else:
-                raise
-    logging.info("Done:\t multiview benchmark")
 
-    return [flag, results_monoview + results_multiview, traceback_outputs]
+def iter_benchmarks(nb_cores, benchmark_arguments_dictionaries, dataset_var,
+                    track_tracebacks,
+                    exec_one_benchmark_mono_core=exec_one_benchmark_mono_core):
+    """
+    Runs the benchmarks of benchmark_arguments_dictionaries, in a pool of
+    nb_cores processes if there are several of them, and yields their results
+    in the order of benchmark_arguments_dictionaries, as the serial execution.
+
+    The dataset is pickled once for each benchmark : the HDF5 datasets are
+    re-opened read-only by the workers, the memory-mapped and shared memory
+    ones are attached without copy.
+    """
+    nb_workers = min(nb_cores, len(benchmark_arguments_dictionaries))
+    if nb_workers <= 1:
+        for arguments in benchmark_arguments_dictionaries:
+            yield exec_one_benchmark_mono_core(dataset_var=dataset_var,
+                                               track_tracebacks=track_tracebacks,
+                                               **arguments)
+    else:
+        logging.info("Info:\t Running the benchmarks in " + str(nb_workers)
+                     + " processes")
+        with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+            benchmarks = [executor.submit(exec_one_benchmark_mono_core,
+                                          dataset_var=dataset_var,
+                                          track_tracebacks=track_tracebacks,
+                                          **arguments)
+                          for arguments in benchmark_arguments_dictionaries]
+            for benchmark in benchmarks:
+                yield benchmark.result()
+
+
+def get_task_name(task_type, arguments):
+    """
+    Returns the name under which the results of the experiment described by
+    arguments are saved, used as index in the durations dataframes.
+    """
+    if task_type == "monoview":
+        return get_task_id(task_type, arguments)
+    classifier_name = arguments["classifier_name"]
+    return MultiviewResult(classifier_name,
+                           arguments.get(classifier_name, {}), None, None,
+                           0, 0, 0, None).get_classifier_name()
+
+
+def gen_tasks(benchmark_arguments_dictionaries, durations=None):
+    """
+    Flattens the benchmarks in independent monoview and multiview tasks,
+    sorted longest-expected-first.
+
+    Parameters
+    ----------
+    benchmark_arguments_dictionaries : list of dicts
+        The benchmarks, as returned by execution.gen_argument_dictionaries.
+    durations : dict or None
+        The expected duration of each classifier, as returned by
+        load_durations. The classifiers without history are expected to last
+        the median of the known durations.
+
+    Returns
+    -------
+    tasks : list of dicts
+        For each task, the flag of its benchmark, its position in the results
+        of the benchmark, its type, its arguments, its name and its expected
+        duration.
+    """
+    if durations:
+        default_duration = float(np.median(list(durations.values())))
+    else:
+        durations, default_duration = {}, 0.0
+    tasks = []
+    for benchmark_arguments in benchmark_arguments_dictionaries:
+        position = 0
+        for task_type in ["monoview", "multiview"]:
+            for arguments in benchmark_arguments["argument_dictionaries"][
+                    task_type]:
+                name = get_task_name(task_type, arguments)
+                tasks.append({"flag": benchmark_arguments["flag"],
+                              "position": position,
+                              "task_type": task_type,
+                              "arguments": arguments,
+                              "name": name,
+                              "expected_duration": durations.get(
+                                  name, default_duration)})
+                position += 1
+    # The sort is stable, so without history the tasks keep the serial order
+    tasks.sort(key=lambda task: -task["expected_duration"])
+    return tasks
+
+
+def iter_tasks(nb_cores, benchmark_arguments_dictionaries, dataset_var,
+               track_tracebacks, durations=None, exec_one_task=exec_one_task,
+               benchmark_init=benchmark_init, task_queue=None):
+    """
+    Runs the monoview and multiview experiments of all the benchmarks as
+    independent tasks, and yields the results of each benchmark, in the
+    order of benchmark_arguments_dictionaries, formatted as
+    exec_one_benchmark_mono_core's.
+
+    The tasks are submitted longest-expected-first (see gen_tasks) to a pool
+    of nb_cores processes, each idle process taking the next pending task,
+    so a slow classifier does not hold the rest of its iteration. Each task
+    gets a copy of the random state of its iteration, from which
+    exec_one_task seeds the experiment as in exec_one_benchmark_mono_core,
+    so the results do not depend on the schedule.
+
+    The tasks whose results have been checkpointed by an interrupted run are
+    not run again.
+
+    If a task_queue (see utils.task_queue.TaskQueue) is given, the tasks are
+    submitted to it instead, to be run by summit worker processes, possibly
+    on other nodes, and nb_cores is not used.
+    """
+    results = {}
+    traceback_outputs = {}
+    nb_pending = {}
+    for benchmark_arguments in benchmark_arguments_dictionaries:
+        flag = benchmark_arguments["flag"]
+        benchmark_init(benchmark_arguments["directory"],
+                       benchmark_arguments["classification_indices"],
+                       benchmark_arguments.get("labels"),
+                       benchmark_arguments["labels_dictionary"],
+                       benchmark_arguments["k_folds"], dataset_var)
+        nb_pending[flag] = sum(
+            len(benchmark_arguments["argument_dictionaries"][task_type])
+            for task_type in ["monoview", "multiview"])
+        results[flag] = [[] for _ in range(nb_pending[flag])]
+        traceback_outputs[flag] = {}
+    benchmarks = dict((benchmark_arguments["flag"], benchmark_arguments)
+                      for benchmark_arguments in
+                      benchmark_arguments_dictionaries)
+    tasks = []
+    for task in gen_tasks(benchmark_arguments_dictionaries, durations):
+        checkpoint = load_task_results(
+            benchmarks[task["flag"]]["directory"], task["position"],
+            get_task_id(task["task_type"], task["arguments"]))
+        if checkpoint is None:
+            tasks.append(task)
+        else:
+            results[task["flag"]][task["position"]] = checkpoint[0]
+            traceback_outputs[task["flag"]].update(checkpoint[1])
+            nb_pending[task["flag"]] -= 1
+    nb_checkpointed = sum(len(flag_results) for flag_results in
+                          results.values()) - len(tasks)
+    if nb_checkpointed:
+        logging.info("Info:\t Loaded the checkpointed results of "
+                     + str(nb_checkpointed) + " tasks")
+
+    def task_kwargs(task):
+        return dict(benchmarks[task["flag"]],
+                    random_state=copy.deepcopy(
+                        benchmarks[task["flag"]]["random_state"]),
+                    dataset_var=dataset_var, task_type=task["task_type"],
+                    arguments=task["arguments"],
+                    track_tracebacks=track_tracebacks,
+                    position=task["position"])
+
+    def iter_done_tasks():
+        nb_workers = min(nb_cores, len(tasks))
+        if nb_workers <= 1:
+            for task in tasks:
+                yield task, exec_one_task(**task_kwargs(task))
+        else:
+            logging.info("Info:\t Scheduling " + str(len(tasks))
+                         + " tasks on " + str(nb_workers) + " processes")
+            with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+                futures = dict((executor.submit(exec_one_task,
+                                                **task_kwargs(task)), task)
+                               for task in tasks)
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+
+    def iter_queued_tasks():
+        queued_tasks = dict((str(task["flag"]) + "-" + str(task["position"]),
+                             task) for task in tasks)
+        payloads = []
+        for name, task in queued_tasks.items():
+            payload = task_kwargs(task)
+            del payload["dataset_var"]
+            payloads.append((name, payload))
+        for name, outcome in task_queue.run(
+                payloads,
+                get_run_id(benchmark_arguments_dictionaries[0]["directory"]),
+                dataset_var):
+            if "error" in outcome:
+                raise RuntimeError("The task " + name + " failed on a worker "
+                                   ":\n" + outcome["error"])
+            yield queued_tasks[name], outcome["results"]
+
+    if task_queue is None:
+        done_tasks = iter_done_tasks()
+    else:
+        done_tasks = iter_queued_tasks()
+    for benchmark_arguments in benchmark_arguments_dictionaries:
+        flag = benchmark_arguments["flag"]
+        while nb_pending[flag]:
+            task, (task_results, task_tracebacks) = next(done_tasks)
+            results[task["flag"]][task["position"]] = task_results
+            traceback_outputs[task["flag"]].update(task_tracebacks)
+            nb_pending[task["flag"]] -= 1
+        yield [flag, [result for task_results in results[flag]
+                      for result in task_results], traceback_outputs[flag]]
+    done_tasks.close()
 
 
 def exec_benchmark(nb_cores, stats_iter,
@@ -617,13 +1073,17 @@ def exec_benchmark(nb_cores, stats_iter,
                    directory, metrics, dataset_var, track_tracebacks,
                    exec_one_benchmark_mono_core=exec_one_benchmark_mono_core,
                    analyze=analyze, delete=delete_HDF5,
-                   analyze_iterations=analyze_iterations):  # pragma: no cover
+                   analyze_iterations=analyze_iterations,
+                   scheduler="iterations", durations=None,
+                   exec_one_task=exec_one_task,
+                   task_queue=None):  # pragma: no cover
     r"""Used to execute the needed benchmark(s) on multicore or mono-core functions.
 
     Parameters
     ----------
     nb_cores : int
-        Number of threads that the benchmarks can use.
+        Number of processes that the benchmarks can use, the statistical
+        iterations are run in parallel, see iter_benchmarks.
     stats_iter : int
         Number of statistical iterations that have to be done.
     benchmark_arguments_dictionaries : list of dictionaries
@@ -649,6 +1109,16 @@ def exec_benchmark(nb_cores, stats_iter,
         The full dataset that wil be used by the benchmark.
     classifiers_names : list of strings
         List of the benchmarks's monoview classifiers names.
+    scheduler : string
+        "iterations" to run each statistical iteration in a process (see
+        iter_benchmarks), "tasks" to run each experiment in a process,
+        longest-expected-first (see iter_tasks).
+    durations : dict or None
+        The expected duration of each classifier, used by the "tasks"
+        scheduler.
+    task_queue : TaskQueue or None
+        If given, the experiments are run as tasks by the workers of this
+        queue, whatever the scheduler.
     rest_of_the_args :
         Just used for testing purposes
 
@@ -660,33 +1130,27 @@ def exec_benchmark(nb_cores, stats_iter,
     """
     logging.info("Start:\t Executing all the needed benchmarks")
     results = []
-    # if nb_cores > 1:
-    #     if stats_iter > 1 or nb_multiclass > 1:
-    #         nb_exps_to_do = len(benchmark_arguments_dictionaries)
-    #         nb_multicore_to_do = range(int(math.ceil(float(nb_exps_to_do) / nb_cores)))
-    #         for step_index in nb_multicore_to_do:
-    #             results += (Parallel(n_jobs=nb_cores)(delayed(exec_one_benchmark)
-    #                                                  (core_index=core_index,
-    #                                                   **
-    #                                                   benchmark_arguments_dictionaries[
-    #                                                       core_index + step_index * nb_cores])
-    #                                                  for core_index in range(
-    #                 min(nb_cores, nb_exps_to_do - step_index * nb_cores))))
-    #     else:
-    #         results += [exec_one_benchmark_multicore(nb_cores=nb_cores, **
-    #         benchmark_arguments_dictionaries[0])]
-    # else:
-    for arguments in benchmark_arguments_dictionaries:
-        benchmark_results = exec_one_benchmark_mono_core(
-            dataset_var=dataset_var,
-            track_tracebacks=track_tracebacks,
-            **arguments)
+    if scheduler == "tasks" or task_queue is not None:
+        benchmarks = iter_tasks(nb_cores, benchmark_arguments_dictionaries,
+                                dataset_var, track_tracebacks,
+                                durations=durations,
+                                exec_one_task=exec_one_task,
+                                task_queue=task_queue)
+    else:
+        benchmarks = iter_benchmarks(
+            nb_cores, benchmark_arguments_dictionaries, dataset_var,
+            track_tracebacks,
+            exec_one_benchmark_mono_core=exec_one_benchmark_mono_core)
+    for benchmark_results in benchmarks:
         analyze_iterations([benchmark_results],
                            benchmark_arguments_dictionaries, stats_iter,
                            metrics, sample_ids=dataset_var.sample_ids,
                            labels=dataset_var.get_labels())
         results += [benchmark_results]
     logging.info("Done:\t Executing all the needed benchmarks")
+    if getattr(dataset_var, "view_cache", None) is not None:
+        logging.info("Info:\t View cache : " +
+                     str(dataset_var.get_cache_info()))
 
     # Do everything with flagging
     logging.info("Start:\t Analyzing predictions")
@@ -697,10 +1161,154 @@ def exec_benchmark(nb_cores, stats_iter,
                                 dataset_var.sample_ids,
                                 dataset_var.get_labels())
     logging.info("Done:\t Analyzing predictions")
-    delete(benchmark_arguments_dictionaries, nb_cores, dataset_var)
+    delete(dataset_var)
     return results_mean_stds
 
 
+def init_plan_random_state(random_state_arg):
+    """The random state of execution.init_random_state, without saving it"""
+    try:
+        return np.random.RandomState(int(random_state_arg))
+    except (TypeError, ValueError):
+        return np.random.RandomState(None)
+
+
+def get_run_sizes(run_directory):  # pragma: no cover
+    """
+    Returns the number of training samples of the benchmark saved in
+    run_directory and the number of features of each of its views, from the
+    dataset of its saved configuration, see planning.load_cost_history.
+    """
+    args = configuration.get_the_args(os.path.join(run_directory,
+                                                   "config_file.yml"))
+    dataset_name = os.path.basename(os.path.dirname(run_directory))
+    get_database = execution.get_database_function(dataset_name,
+                                                   args["file_type"])
+    dataset_var, _, _ = get_database(
+        args["views"], args["pathf"], dataset_name, args["nb_class"],
+        args["classes"], init_plan_random_state(args["random_state"]),
+        args["full"], **execution.get_database_kwargs(args))
+    view_features = dict((view_name,
+                          dataset_var.get_view_footprint(view_index)[0])
+                         for view_name, view_index
+                         in dataset_var.get_view_dict().items())
+    return get_train_size(dataset_var.get_nb_samples(),
+                          args["split"]), view_features
+
+
+def plan_one_dataset(dataset_name, args, nb_cores,
+                     cost_model):  # pragma: no cover
+    """
+    Expands the benchmark configured by args on a dataset in its tasks, as
+    exec_one_dataset does, without running them, and estimates its
+    schedule on nb_cores cores with the cost model (see
+    planning.fit_cost_model).
+
+    Returns
+    -------
+    plan : dict
+        See planning.plan_schedule
+    report : str
+    """
+    random_state = init_plan_random_state(args["random_state"])
+    stats_iter_random_states = execution.init_stats_iter_random_states(
+        args["stats_iter"], random_state)
+    get_database = execution.get_database_function(dataset_name,
+                                                   args["file_type"])
+    dataset_var, labels_dictionary, datasetname = get_database(
+        args["views"], args["pathf"], dataset_name, args["nb_class"],
+        args["classes"], random_state, args["full"],
+        **execution.get_database_kwargs(args))
+    args = dict(args, name=datasetname)
+    splits = execution.gen_splits(dataset_var.get_labels(), args["split"],
+                                  stats_iter_random_states)
+    k_folds = execution.gen_k_folds(args["stats_iter"], args["nb_folds"],
+                                    stats_iter_random_states)
+    views, views_indices, _ = execution.init_views(dataset_var,
+                                                   args["views"])
+    benchmark = init_benchmark(args["type"], args["algos_monoview"],
+                               args["algos_multiview"])
+    argument_dictionaries = init_argument_dictionaries(
+        benchmark, dataset_var.get_view_dict(), dataset_var.get_nb_class(),
+        init_kwargs_func(args, benchmark), args["hps_type"],
+        args["hps_args"])
+    directories = execution.gen_direcorties_names(
+        os.path.join(args["res_dir"], dataset_name, "plan"),
+        args["stats_iter"])
+    benchmark_argument_dictionaries = execution.gen_argument_dictionaries(
+        labels_dictionary, directories, splits, args["hps_type"], args,
+        k_folds, stats_iter_random_states, None, argument_dictionaries,
+        benchmark, views, views_indices)
+    view_footprints = dict((view_index,
+                            dataset_var.get_view_footprint(view_index))
+                           for view_index
+                           in dataset_var.get_view_dict().values())
+    nb_train = len(splits[0][0])
+    sizes = {}
+    durations = {}
+    for task_type in ["monoview", "multiview"]:
+        for arguments in argument_dictionaries[task_type]:
+            name = get_task_name(task_type, arguments)
+            sizes[name] = get_task_size(task_type, arguments,
+                                        view_footprints, nb_train)
+            duration = estimate_duration(cost_model, name, sizes[name][0])
+            if duration is not None:
+                durations[name] = duration
+    tasks = gen_tasks(benchmark_argument_dictionaries, durations)
+    for task in tasks:
+        task["memory"] = sizes[task["name"]][1]
+    plan = plan_schedule(tasks, nb_cores, scheduler=args["scheduler"])
+    if dataset_var.is_temp:
+        dataset_var.rm()
+    without_history = set(name for name in sizes if name not in durations)
+    return plan, format_plan(dataset_name, tasks, plan, nb_cores,
+                             args["scheduler"], without_history)
+
+
+def plan_benchmark(args, nb_cores=None,
+                   history_directory=None):  # pragma: no cover
+    """
+    Estimates the total time, the critical path and the peak memory of the
+    benchmark configured by args, without training anything. The duration
+    of each experiment is predicted from the size of its data by a cost
+    model of its classifier, fitted on the durations saved by the previous
+    benchmarks in history_directory (by default, res_dir).
+
+    Returns
+    -------
+    report : str
+    """
+    if nb_cores is None:
+        nb_cores = args["nb_cores"]
+    if history_directory is None:
+        history_directory = args["res_dir"]
+    path, dataset_list = execution.find_dataset_names(args["pathf"],
+                                                      args["file_type"],
+                                                      args["name"])
+    args = dict(args, pathf=path)
+    history = load_cost_history(history_directory, get_run_sizes)
+    if not history:
+        logging.warning("Warning:\t No durations were found in "
+                        + history_directory + ", the durations can not be "
+                                              "estimated")
+    cost_model = fit_cost_model(history)
+    nb_parallel_datasets = min(args["parallel_datasets"], len(dataset_list))
+    dataset_cores = max(nb_cores // max(nb_parallel_datasets, 1), 1)
+    plans = []
+    reports = []
+    for dataset_name in dataset_list:
+        plan, report = plan_one_dataset(dataset_name, args, dataset_cores,
+                                        cost_model)
+        plans.append(plan)
+        reports.append(report)
+    if len(dataset_list) > 1:
+        _, _, total_time = simulate_schedule(
+            [plan["total_time"] for plan in plans], nb_parallel_datasets)
+        reports.append("Estimated total time of the {} datasets : {}".format(
+            len(dataset_list), format_duration(total_time)))
+    return "\n".join(reports)
+
+
 def exec_classif(arguments):  # pragma: no cover
     """
     Runs the benchmark with the given arguments
@@ -717,110 +1325,183 @@ def exec_classif(arguments):  # pragma: no cover
     >>>
     """
     start = time.time()
-    args = execution.parse_the_args(arguments)
-    args = configuration.get_the_args(args.config_path)
+    command_line_args = execution.parse_the_args(arguments)
+    args = configuration.get_the_args(command_line_args.config_path)
+    if args["resume"]:
+        args = execution.get_resumed_args(args["resume"])
+    if command_line_args.no_cache:
+        args["cache_size"] = 0
+    for option in ["csv_block_size", "csv_n_jobs"]:
+        if getattr(command_line_args, option) is not None:
+            args[option] = getattr(command_line_args, option)
     import sys
     if not sys.platform in ["win32", "cygwin"]:
         os.nice(args["nice"])
     nb_cores = args["nb_cores"]
     if nb_cores == 1:
         os.environ['OPENBLAS_NUM_THREADS'] = '1'
-    stats_iter = args["stats_iter"]
-    hps_method = args["hps_type"]
-    hps_kwargs = args["hps_args"]
-    cl_type = args["type"]
-    monoview_algos = args["algos_monoview"]
-    multiview_algos = args["algos_multiview"]
     path, dataset_list = execution.find_dataset_names(args["pathf"],
                                                       args["file_type"],
                                                       args["name"])
     args["pathf"] = path
-    for dataset_name in dataset_list:
-        # noise_results = []
-        # for noise_std in args["noise_std"]:
+    nb_parallel_datasets = min(args["parallel_datasets"], len(dataset_list))
+    if nb_parallel_datasets > 1:
+        # The cores are shared by the datasets benchmarked at the same time
+        args["nb_cores"] = max(nb_cores // nb_parallel_datasets, 1)
+        with ProcessPoolExecutor(
+                max_workers=nb_parallel_datasets) as executor:
+            futures = [executor.submit(exec_one_dataset, dataset_name, args,
+                                       start)
+                       for dataset_name in dataset_list]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                # As in a sequential run, the remaining datasets are dropped
+                for future in futures:
+                    future.cancel()
+                raise
+    else:
+        for dataset_name in dataset_list:
+            exec_one_dataset(dataset_name, args, start)
 
-        directory = execution.init_log_file(dataset_name, args["views"],
-                                            args["file_type"],
-                                            args["log"], args["debug"],
-                                            args["label"],
-                                            args["res_dir"],
-                                            args)
 
+def exec_one_dataset(dataset_name, args, start):  # pragma: no cover
+    """
+    Runs the benchmark on one dataset, with its own result directory, log
+    file, random state and splits, possibly alongside the other datasets
+    of the run, see exec_classif.
+    """
+    args = dict(args)
+    nb_cores = args["nb_cores"]
+    stats_iter = args["stats_iter"]
+    hps_method = args["hps_type"]
+    hps_kwargs = args["hps_args"]
+    cl_type = args["type"]
+    monoview_algos = args["algos_monoview"]
+    multiview_algos = args["algos_multiview"]
+    # noise_results = []
+    # for noise_std in args["noise_std"]:
+
+    directory = execution.init_log_file(dataset_name, args["views"],
+                                        args["file_type"],
+                                        args["log"], args["debug"],
+                                        args["label"],
+                                        args["res_dir"],
+                                        args)
+
+    if args["resume"]:
+        random_state = execution.init_random_state(
+            os.path.join(directory, "random_state.pickle"), directory)
+    else:
         random_state = execution.init_random_state(args["random_state"],
                                                    directory)
-        stats_iter_random_states = execution.init_stats_iter_random_states(
-            stats_iter,
-            random_state)
-
-        get_database = execution.get_database_function(dataset_name,
-                                                       args["file_type"])
-
-        dataset_var, labels_dictionary, datasetname = get_database(
-            args["views"],
-            args["pathf"], dataset_name,
-            args["nb_class"],
-            args["classes"],
-            random_state,
-            args["full"],
-        )
-        args["name"] = datasetname
-        splits = execution.gen_splits(dataset_var.get_labels(),
-                                      args["split"],
-                                      stats_iter_random_states)
-
-        # multiclass_labels, labels_combinations, indices_multiclass = multiclass.gen_multiclass_labels(
-        #     dataset_var.get_labels(), multiclass_method, splits)
-
-        k_folds = execution.gen_k_folds(stats_iter, args["nb_folds"],
-                                        stats_iter_random_states)
-
-        dataset_files = dataset.init_multiple_datasets(args["pathf"],
-                                                       args["name"],
-                                                       nb_cores)
-
-        views, views_indices, all_views = execution.init_views(dataset_var,
-                                                               args[
-                                                                   "views"])
-        views_dictionary = dataset_var.get_view_dict()
-        nb_views = len(views)
-        nb_class = dataset_var.get_nb_class()
-
-        metrics = args["metrics"]
-        if metrics == "all":
-            metrics_names = [name for _, name, isPackage
-                             in pkgutil.iter_modules(
-                                 [os.path.join(os.path.dirname(
-                                     os.path.dirname(os.path.realpath(__file__))),
-                                     'metrics')]) if
-                             not isPackage and name not in ["framework",
-                                                            "log_loss",
-                                                            "matthews_corrcoef",
-                                                            "roc_auc_score"]]
-            metrics = dict((metric_name, {})
-                           for metric_name in metrics_names)
-        metrics = arange_metrics(metrics, args["metric_princ"])
-
-        benchmark = init_benchmark(cl_type, monoview_algos, multiview_algos, )
-        init_kwargs = init_kwargs_func(args, benchmark)
-        data_base_time = time.time() - start
-        argument_dictionaries = init_argument_dictionaries(
-            benchmark, views_dictionary,
-            nb_class, init_kwargs, hps_method, hps_kwargs)
-        # argument_dictionaries = initMonoviewExps(benchmark, viewsDictionary,
-        #                                         NB_CLASS, initKWARGS)
-        directories = execution.gen_direcorties_names(directory, stats_iter)
-        benchmark_argument_dictionaries = execution.gen_argument_dictionaries(
-            labels_dictionary, directories,
-            splits,
-            hps_method, args, k_folds,
-            stats_iter_random_states, metrics,
-            argument_dictionaries, benchmark,
-            views, views_indices)
-        results_mean_stds = exec_benchmark(
-            nb_cores, stats_iter,
-            benchmark_argument_dictionaries, directory, metrics,
-            dataset_var,
-            args["track_tracebacks"])
-        # noise_results.append([noise_std, results_mean_stds])
-        # plot_results_noise(directory, noise_results, metrics[0][0],
-        #                    dataset_name)
+    stats_iter_random_states = execution.init_stats_iter_random_states(
+        stats_iter,
+        random_state)
+
+    get_database = execution.get_database_function(dataset_name,
+                                                   args["file_type"])
+
+    dataset_var, labels_dictionary, datasetname = get_database(
+        args["views"],
+        args["pathf"], dataset_name,
+        args["nb_class"],
+        args["classes"],
+        random_state,
+        args["full"],
+        **execution.get_database_kwargs(args)
+    )
+    args["name"] = datasetname
+    if args["view_cache_size"]:
+        dataset_var.enable_cache(args["view_cache_size"] * 1024 * 1024)
+    splits = execution.gen_splits(dataset_var.get_labels(),
+                                  args["split"],
+                                  stats_iter_random_states)
+
+    # multiclass_labels, labels_combinations, indices_multiclass = multiclass.gen_multiclass_labels(
+    #     dataset_var.get_labels(), multiclass_method, splits)
+
+    k_folds = execution.gen_k_folds(stats_iter, args["nb_folds"],
+                                    stats_iter_random_states)
+
+    if args["file_type"] == ".npy":
+        # The memory-mapped .npy views are already shared by the processes
+        pass
+    elif args["task_queue"]:
+        # The workers re-open the dataset file from their node
+        pass
+    elif args["shared_memory"] and nb_cores > 1:
+        shared_dataset = dataset.SharedMemoryDataset(dataset_var)
+        if dataset_var.is_temp:
+            dataset_var.rm()
+        dataset_var = shared_dataset
+
+    views, views_indices, all_views = execution.init_views(dataset_var,
+                                                           args[
+                                                               "views"])
+    views_dictionary = dataset_var.get_view_dict()
+    nb_views = len(views)
+    nb_class = dataset_var.get_nb_class()
+
+    metrics = args["metrics"]
+    if metrics == "all":
+        metrics_names = [name for _, name, isPackage
+                         in pkgutil.iter_modules(
+                             [os.path.join(os.path.dirname(
+                                 os.path.dirname(os.path.realpath(__file__))),
+                                 'metrics')]) if
+                         not isPackage and name not in ["framework",
+                                                        "log_loss",
+                                                        "matthews_corrcoef",
+                                                        "roc_auc_score"]]
+        metrics = dict((metric_name, {})
+                       for metric_name in metrics_names)
+    metrics = arange_metrics(metrics, args["metric_princ"])
+
+    benchmark = init_benchmark(cl_type, monoview_algos, multiview_algos, )
+    init_kwargs = init_kwargs_func(args, benchmark)
+    data_base_time = time.time() - start
+    argument_dictionaries = init_argument_dictionaries(
+        benchmark, views_dictionary,
+        nb_class, init_kwargs, hps_method, hps_kwargs)
+    # argument_dictionaries = initMonoviewExps(benchmark, viewsDictionary,
+    #                                         NB_CLASS, initKWARGS)
+    if args["cache_size"]:
+        cache_dir = args["cache_dir"]
+        if cache_dir is None:
+            cache_dir = os.path.join(args["res_dir"], "cache")
+        result_cache = ResultCache(cache_dir,
+                                   args["cache_size"] * 1024 * 1024,
+                                   dataset_var.get_fingerprint())
+    else:
+        result_cache = None
+    directories = execution.gen_direcorties_names(directory, stats_iter)
+    if args["resume"]:
+        execution.check_resumed_splits(splits, directories)
+    benchmark_argument_dictionaries = execution.gen_argument_dictionaries(
+        labels_dictionary, directories,
+        splits,
+        hps_method, args, k_folds,
+        stats_iter_random_states, metrics,
+        argument_dictionaries, benchmark,
+        views, views_indices, result_cache=result_cache)
+    if args["scheduler"] == "tasks" or args["task_queue"]:
+        durations = load_durations(os.path.dirname(directory),
+                                   args["name"])
+    else:
+        durations = None
+    if args["task_queue"]:
+        task_queue = TaskQueue(args["task_queue"],
+                               lease_timeout=args["lease_timeout"])
+    else:
+        task_queue = None
+    results_mean_stds = exec_benchmark(
+        nb_cores, stats_iter,
+        benchmark_argument_dictionaries, directory, metrics,
+        dataset_var,
+        args["track_tracebacks"], scheduler=args["scheduler"],
+        durations=durations, task_queue=task_queue)
+    # noise_results.append([noise_std, results_mean_stds])
+    # plot_results_noise(directory, noise_results, metrics[0][0],
+    #                    dataset_name)
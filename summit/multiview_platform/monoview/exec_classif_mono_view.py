@@ -54,7 +54,7 @@ def exec_monoview(directory, X, Y, database_name, labels_names,
                   k_folds, nb_cores, databaseType, path,
                   random_state, hyper_param_search="Random",
                   metrics={"accuracy_score*": {}}, n_iter=30, view_name="",
-                  hps_kwargs={}, **args):
+                  hps_kwargs={}, train_test=None, **args):
     logging.info("Start:\t Loading data")
     kwargs, \
         t_start, \
@@ -79,8 +79,9 @@ def exec_monoview(directory, X, Y, database_name, labels_names,
         + str(nb_cores) + ", algorithm : " + classifier_name)
 
     logging.info("Start:\t Determine Train/Test split")
-    X_train, y_train, X_test, y_test = init_train_test(X, Y,
-                                                       classification_indices)
+    if train_test is None:
+        train_test = init_train_test(X, Y, classification_indices)
+    X_train, y_train, X_test, y_test = train_test
 
     logging.info("Info:\t Shape X_train:" + str(
         X_train.shape) + ", Length of y_train:" + str(len(y_train)))
@@ -188,6 +189,26 @@ def init_constants(args, X, classification_indices, labels_names,
     return kwargs, t_start, view_name, cl_type, X, learning_rate, labels_string, output_file_name, directory, base_file_name
 
 
+def load_view(dataset_var, view_index, classification_indices,
+              prefetcher=None):
+    """
+    Loads a view, the labels and their train/test split, to be shared by all
+    the monoview experiments on this view, see exec_monoview's train_test.
+    The view is read through the prefetcher (see
+    utils.dataset.ViewPrefetcher) if one is given.
+
+    Returns
+    -------
+    X, Y, (X_train, y_train, X_test, y_test)
+    """
+    if prefetcher is not None:
+        X = prefetcher.get_v(view_index)
+    else:
+        X = dataset_var.get_v(view_index)
+    Y = dataset_var.get_labels()
+    return X, Y, init_train_test(X, Y, classification_indices)
+
+
 def init_train_test(X, Y, classification_indices):
     train_indices, test_indices = classification_indices
     X_train = extract_subset(X, train_indices)
@@ -214,6 +235,8 @@ def get_hyper_params(classifier_module, search_method, classifier_module_name,
         hps = classifier_hp_search(estimator, scoring=metrics, cv=k_folds,
                                    random_state=random_state,
                                    framework="monoview", n_jobs=nb_cores,
+                                   partial_report_file_name=output_file_name
+                                   + "hps_partial_report.txt",
                                    **hps_kwargs)
         hps.fit(X_train, y_train)
         cl_kwargs = hps.get_best_params()
@@ -192,7 +192,7 @@ def exec_multiview(directory, dataset_var, name, classification_indices,
                    nb_cores, database_type, path,
                    labels_dictionary, random_state, labels,
                    hps_method="None", hps_kwargs={}, metrics=None,
-                   n_iter=30, **kwargs):
+                   n_iter=30, fold_cache_size=0, **kwargs):
     """Used to execute multiview classification and result analysis
 
     Parameters
@@ -229,6 +229,10 @@ def exec_multiview(directory, dataset_var, name, classification_indices,
 
     n_iter : int number of iterations
 
+    fold_cache_size : int
+        The memory budget, in MB, of the folds materialized by the
+        hyper-parameter search, see HPSearch.get_fold_datasets.
+
     kwargs
 
     Returns
@@ -281,7 +285,11 @@ def exec_multiview(directory, dataset_var, name, classification_indices,
                                random_state=random_state, framework="multiview",
                                n_jobs=nb_cores,
                                learning_indices=learning_indices,
-                               view_indices=views_indices, **hps_kwargs)
+                               view_indices=views_indices,
+                               partial_report_file_name=output_file_name
+                               + "hps_partial_report.txt",
+                               fold_cache_size=fold_cache_size * 1024 * 1024,
+                               **hps_kwargs)
         hps.fit(dataset_var, dataset_var.get_labels(), )
         classifier_config = hps.get_best_params()
         hps.gen_report(output_file_name)
@@ -91,10 +91,8 @@ class WeightedLinearEarlyFusion(BaseMultiviewClassifier, BaseFusionClassifier):
 
     def hdf5_to_monoview(self, dataset, samples):
         """Here, we concatenate the views for the asked samples """
-        monoview_data = np.concatenate(
-            [dataset.get_v(view_idx, samples)
-             for view_weight, (index, view_idx)
-             in zip(self.view_weights, enumerate(self.view_indices))], axis=1)
+        monoview_data, _ = dataset.to_numpy_array(sample_indices=samples,
+                                                  view_indices=self.view_indices)
         return monoview_data
 
     # def set_monoview_classifier_config(self, monoview_classifier_name, monoview_classifier_config):
@@ -1,5 +1,7 @@
+import glob
 import os
 
+import numpy as np
 import pandas as pd
 import plotly
 
@@ -16,6 +18,35 @@ def get_duration(results):
     return df
 
 
+def load_durations(directory, database_name):
+    """
+    Gathers the durations saved by the previous benchmarks on database_name
+    in directory and its sub-directories.
+
+    Returns
+    -------
+    durations : dict
+        Maps each classifier name (as in get_duration) to its mean total
+        duration (hps + fit + pred) in seconds.
+    """
+    file_names = glob.glob(os.path.join(directory, "**",
+                                        database_name
+                                        + "-durations_dataframe.csv"),
+                           recursive=True)
+    durations = {}
+    for file_name in file_names:
+        try:
+            df = pd.read_csv(file_name, index_col=0)
+            totals = df[["hps", "fit", "pred"]].astype(float).sum(axis=1)
+        except (OSError, KeyError, ValueError):
+            continue
+        for classifier_name, total in totals.items():
+            if np.isfinite(total):
+                durations.setdefault(classifier_name, []).append(total)
+    return dict((classifier_name, float(np.mean(totals)))
+                for classifier_name, totals in durations.items())
+
+
 def plot_durations(durations, directory, database_name,
                    durations_stds=None):  # pragma: no cover
     file_name = os.path.join(directory, database_name + "-durations")
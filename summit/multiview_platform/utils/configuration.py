@@ -27,11 +27,14 @@ def pass_default_config(log=True,
                         name=["plausible", ],
                         label="_",
                         file_type=".hdf5",
+                        csv_block_size=10000,
+                        csv_n_jobs=1,
                         views=None,
                         pathf=os.path.join(os.path.dirname(package_path), "data", ""),
                         nice=0,
                         random_state=42,
                         nb_cores=1,
+                        parallel_datasets=1,
                         full=True,
                         debug=False,
                         add_noise=False,
@@ -51,6 +54,19 @@ def pass_default_config(log=True,
                         hps_type="Random",
                         hps_iter=1,
                         hps_kwargs={'n_iter': 10, "equivalent_draws": True},
+                        view_cache_size=0,
+                        fold_cache_size=0,
+                        prefetch_views=0,
+                        shared_memory=False,
+                        scheduler="iterations",
+                        resume=None,
+                        cache_dir=None,
+                        cache_size=1024,
+                        task_queue=None,
+                        lease_timeout=600,
+                        timeout_s=None,
+                        max_rss_mb=None,
+                        task_limits=None,
                         **kwargs):
     args = dict(
         (key, value) for key, value in locals().items() if key != "kwargs")
@@ -1,11 +1,19 @@
+import hashlib
+import json
 import logging
 import os
-import select
+import queue
+import shutil
 import sys
+import threading
+import time
 from abc import abstractmethod
+from collections import OrderedDict, deque
+from multiprocessing import resource_tracker, shared_memory
 
 import h5py
 import numpy as np
+from scipy import sparse
 
 from .organization import secure_file_path
 
@@ -40,6 +48,13 @@ class Dataset():
                path=None):  # pragma: no cover
         pass
 
+    def enable_cache(self, max_bytes, cache_subsets=True):
+        """
+        Datasets stored in RAM do not need a view cache, the on-disk ones
+        override this method.
+        """
+        pass
+
     def init_sample_indices(self, sample_indices=None):
         """
         If no sample indices are provided, selects all the available samples.
@@ -73,10 +88,28 @@ class Dataset():
         """
         return self.get_v(view_index, sample_indices=sample_indices).shape
 
+    def get_view_footprint(self, view_index):
+        """
+        Gets the number of features of a view and the memory, in bytes, it
+        takes once loaded on all the samples.
+
+        Parameters
+        ----------
+        view_index : int
+            The index of the view
+
+        Returns
+        -------
+        nb_features, nb_bytes
+        """
+        return get_footprint(self.get_v(view_index))
+
     def to_numpy_array(self, sample_indices=None, view_indices=None):
         """
         Concatenates the needed views in one big numpy array while saving the
         limits of each view in a list, to be able to retrieve them later.
+        If any of the views is sparse, the views are stacked in a
+        scipy.sparse CSR matrix instead.
 
         Parameters
         ----------
@@ -88,34 +121,98 @@ class Dataset():
 
         Returns
         -------
-        concat_views : numpy array,
-            The numpy array containing all the needed views.
+        concat_views : numpy array or scipy.sparse.csr_matrix,
+            The array containing all the needed views.
 
         view_limits : list of int
             The limits of each slice used to extract the views.
 
         """
         view_limits = [0]
+        views = []
         for view_index in view_indices:
             view_data = self.get_v(view_index, sample_indices=sample_indices)
             nb_features = view_data.shape[1]
             view_limits.append(view_limits[-1] + nb_features)
-        concat_views = np.concatenate([self.get_v(view_index,
-                                                  sample_indices=sample_indices)
-                                       for view_index in view_indices], axis=1)
+            views.append(view_data)
+        if any(sparse.issparse(view_data) for view_data in views):
+            concat_views = sparse.hstack(views, format="csr")
+        else:
+            concat_views = np.concatenate(views, axis=1)
         return concat_views, view_limits
 
+    def get_fingerprint(self, block_size=10000):
+        """
+        Digests the content of the dataset : its views, read by blocks of
+        block_size samples, their names, the labels and their names. Two
+        datasets with the same content have the same fingerprint, whatever
+        their format.
+
+        Returns
+        -------
+        fingerprint : str
+            The sha1 hex digest of the dataset.
+        """
+        digest = hashlib.sha1()
+        digest.update(json.dumps(
+            [decode_label_name(label_name)
+             for label_name in self.get_label_names()]).encode("utf-8"))
+        digest.update(np.ascontiguousarray(self.get_labels(),
+                                           dtype=np.int64).tobytes())
+        nb_samples = self.get_nb_samples()
+        for view_index in range(self.nb_view):
+            digest.update(decode_label_name(
+                self.get_view_name(view_index)).encode("utf-8"))
+            for start in range(0, nb_samples, block_size):
+                view_data = self.get_v(view_index, sample_indices=np.arange(
+                    start, min(start + block_size, nb_samples)))
+                if start == 0:
+                    digest.update(str((view_data.shape[1:],
+                                       view_data.dtype.str)).encode("utf-8"))
+                if sparse.issparse(view_data):
+                    view_data = sparse.csr_matrix(view_data)
+                    view_data.sort_indices()
+                    arrays = [np.diff(view_data.indptr), view_data.indices,
+                              view_data.data]
+                else:
+                    arrays = [view_data]
+                for array in arrays:
+                    digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def get_label_codes(self):
+        """
+        Returns the lookup table giving, for each label name, its code in the
+        labels array.
+        """
+        return dict((decode_label_name(label_name), label_code)
+                    for label_code, label_name in enumerate(self.labels_names))
+
     def select_labels(self, selected_label_names):
-        selected_labels = [self.get_label_names().index(label_name.decode())
-                           if isinstance(label_name, bytes)
-                           else self.get_label_names().index(label_name)
-                           for label_name in selected_label_names]
-        selected_indices = np.array([index
-                                     for index, label in
-                                     enumerate(self.get_labels())
-                                     if label in selected_labels])
-        labels = np.array([selected_labels.index(self.get_labels()[idx])
-                           for idx in selected_indices])
+        """
+        Selects the samples labelled with one of the selected labels, and
+        recodes their labels by the rank of their name in
+        selected_label_names.
+
+        Parameters
+        ----------
+        selected_label_names : list of str
+            The names of the labels to select.
+
+        Returns
+        -------
+        labels : numpy.ndarray
+            The new labels of the selected samples.
+        selected_label_names : list of str
+            The names of the new labels.
+        selected_indices : numpy.ndarray
+            The indices of the selected samples.
+        """
+        label_codes = self.get_label_codes()
+        selected_labels = np.array([label_codes[decode_label_name(label_name)]
+                                    for label_name in selected_label_names])
+        selected_indices, labels = recode_labels(self.get_labels(),
+                                                 selected_labels)
         return labels, selected_label_names, selected_indices
 
     def select_views_and_labels(self, nb_labels=None,
@@ -175,7 +272,8 @@ class RAMDataset(Dataset):
         self.views = views
         self.labels = np.asarray(labels)
         if isinstance(are_sparse, bool):  # pragma: no cover
-            self.are_sparse = [are_sparse for _ in range(len(views))]
+            self.are_sparse = [are_sparse or sparse.issparse(view)
+                               for view in views]
         else:
             self.are_sparse = are_sparse
         self.view_names = view_names
@@ -200,7 +298,7 @@ class RAMDataset(Dataset):
         return self.views[0].shape[0]
 
     def get_label_names(self, sample_indices=None, decode=True):
-        selected_labels = self.get_labels(sample_indices)
+        selected_labels = np.unique(self.get_labels(sample_indices))
         if decode:
             return [label_name.encode("utf-8")
                     for label, label_name in enumerate(self.labels_names)
@@ -220,14 +318,15 @@ class RAMDataset(Dataset):
             return self.views[view_index][sample_indices, :]
         else:
             sample_indices = np.asarray(sample_indices)
-            # sorted_indices = np.argsort(sample_indices)
-            # sample_indices = sample_indices[sorted_indices]
             if not self.are_sparse[view_index]:
                 return self.views[view_index][
                     sample_indices, :]
-            else:  # pragma: no cover
-                # TODO Sparse support
-                pass
+            else:
+                return extract_subset(self.views[view_index], sample_indices)
+
+    def get_view_footprint(self, view_index):
+        """See Dataset.get_view_footprint, computed without copying the view"""
+        return get_footprint(self.views[view_index])
 
     def get_nb_class(self, sample_indices=None):
         sample_indices = self.init_sample_indices(sample_indices)
@@ -237,19 +336,19 @@ class RAMDataset(Dataset):
                path=None):
         if self.sample_ids is not None:
             self.sample_ids = self.sample_ids[sample_indices]
-        self.labels = self.labels[sample_indices]
-        self.labels_names = [name for lab_index, name
-                             in enumerate(self.labels_names)
-                             if lab_index in np.unique(self.labels)]
-        self.labels = np.array(
-            [np.where(label == np.unique(self.labels))[0] for label in
-             self.labels])
+        unique_labels, self.labels = np.unique(self.labels[sample_indices],
+                                               return_inverse=True)
+        self.labels = self.labels.reshape(-1)
+        self.labels_names = [self.labels_names[int(label)]
+                             for label in unique_labels]
         self.view_names = view_names
         new_views = []
         for new_view_ind, view_name in enumerate(self.view_names):
             new_views.append(
                 self.views[self.view_dict[view_name]][sample_indices, :])
         self.views = new_views
+        self.are_sparse = [self.are_sparse[self.view_dict[view_name]]
+                           for view_name in self.view_names]
         self.view_dict = dict((view_name, view_ind)
                               for view_ind, view_name
                               in enumerate(self.view_names))
@@ -279,7 +378,9 @@ class HDF5Dataset(Dataset):
         The labels for the multiview dataset, of shape (nb samples, ).
 
     are_sparse : list of bool, or None
-        The list of boolean telling if each view is sparse or not.
+        The list of boolean telling if each view is sparse or not. The views
+        given as scipy.sparse matrices are stored in CSR format, as groups
+        containing the data, indices and indptr arrays.
 
     file_name : str, or None
         The name of the hdf5 file that will be created to store the multiview
@@ -300,6 +401,15 @@ class HDF5Dataset(Dataset):
     is_temp : bool
         Used if a temporary dataset has to be stored by the benchmark.
 
+    view_cache_size : int
+        The memory budget, in bytes, of the in-process view cache. If 0, no
+        view is kept in memory between two calls to get_v.
+
+    layout : dict, or None
+        The chunking, compression and type arguments used to write the
+        views, see get_view_layout. None stores them contiguous and
+        uncompressed.
+
     Attributes
     ----------
     dataset : h5py.File object
@@ -312,15 +422,26 @@ class HDF5Dataset(Dataset):
         The dictionnary with the name of each view as the keys and their indices
          as values
 
+    view_cache : ViewCache or None
+        The LRU cache holding the views already read from the disk, None if
+        the cache is disabled.
+
     """
 
+    # Above this ratio of requested rows, get_v reads the whole view at once
+    full_read_ratio = 0.5
+
     # The following methods use h5py
 
     def __init__(self, views=None, labels=None, are_sparse=False,
                  file_name="dataset.hdf5", view_names=None, path="",
                  hdf5_file=None, labels_names=None, is_temp=False,
-                 sample_ids=None, ):
+                 sample_ids=None, view_cache_size=0, layout=None):
         self.is_temp = False
+        self.view_cache = None
+        self.cache_subsets = True
+        if view_cache_size:
+            self.enable_cache(view_cache_size)
         if hdf5_file is not None:
             self.dataset = hdf5_file
             self.init_attrs()
@@ -334,12 +455,11 @@ class HDF5Dataset(Dataset):
                 are_sparse = [are_sparse for _ in views]
             for view_index, (view_name, view, is_sparse) in enumerate(
                     zip(view_names, views, are_sparse)):
-                view_dataset = dataset_file.create_dataset(
-                    "View" + str(view_index),
-                    view.shape,
-                    data=view)
+                view_dataset = create_view_dataset(dataset_file,
+                                                   "View" + str(view_index),
+                                                   view, **(layout or {}))
                 view_dataset.attrs["name"] = view_name
-                view_dataset.attrs["sparse"] = is_sparse
+                view_dataset.attrs["sparse"] = sparse.issparse(view)
             labels_dataset = dataset_file.create_dataset("Labels",
                                                          shape=labels.shape,
                                                          data=labels)
@@ -378,23 +498,120 @@ class HDF5Dataset(Dataset):
 
         Returns
         -------
-        A numpy.ndarray containing the view data for the needed samples
+        A numpy.ndarray containing the view data for the needed samples, or a
+        scipy.sparse.csr_matrix if the view is sparse.
 
         """
-        sample_indices = self.init_sample_indices(sample_indices)
+        sample_indices = self.get_parent_indices(
+            self.init_sample_indices(sample_indices))
+        view_dataset = self.dataset["View" + str(self.view_map[view_index])]
+        if self.are_sparse[view_index]:
+            return read_sparse_rows(view_dataset, sample_indices,
+                                    full_read_ratio=self.full_read_ratio)
         if isinstance(sample_indices, int):
-            return self.dataset["View" + str(view_index)][sample_indices, :]
+            return view_dataset[sample_indices, :]
         else:
             sample_indices = np.array(sample_indices)
-            # sorted_indices = np.argsort(sample_indices)
-            # sample_indices = sample_indices[sorted_indices]
-
-            if not self.dataset["View" + str(view_index)].attrs["sparse"]:
-                return self.dataset["View" + str(view_index)][()][
-                    sample_indices, :]  # [np.argsort(sorted_indices), :]
-            else:  # pragma: no cover
-                # Work in progress
-                pass
+            if self.view_cache is None:
+                return read_rows(view_dataset, sample_indices,
+                                 full_read_ratio=self.full_read_ratio)
+            return self.get_cached_rows(self.view_map[view_index],
+                                        view_dataset, sample_indices)
+
+    def get_view_footprint(self, view_index):
+        """
+        Gets the number of features of a view and the memory, in bytes, it
+        takes once loaded on all the samples, from the metadata of the file,
+        without reading the view. For a sparse view, the samples are assumed
+        to be as dense as the whole view.
+        """
+        view_dataset = self.dataset["View" + str(self.view_map[view_index])]
+        nb_samples = self.get_nb_samples()
+        if self.are_sparse[view_index]:
+            shape = tuple(view_dataset.attrs["shape"])
+            nb_stored = view_dataset["data"].size
+            nb_bytes = nb_stored * nb_samples / max(shape[0], 1) * (
+                view_dataset["data"].dtype.itemsize
+                + view_dataset["indices"].dtype.itemsize) + \
+                (nb_samples + 1) * view_dataset["indptr"].dtype.itemsize
+        else:
+            shape = view_dataset.shape
+            nb_bytes = nb_samples * shape[1] * view_dataset.dtype.itemsize
+        return shape[1], int(nb_bytes)
+
+    def __getstate__(self):
+        # The h5py file can't be pickled, the receiving process re-opens it
+        # read-only, with an empty cache, and does not own it.
+        state = self.__dict__.copy()
+        state["dataset"] = self.dataset.filename
+        state["is_temp"] = False
+        if self.view_cache is not None:
+            state["view_cache"] = ViewCache(self.view_cache.max_bytes)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.dataset = h5py.File(state["dataset"], "r")
+
+    def get_parent_indices(self, sample_indices):
+        """
+        Translates sample indices of the filtered dataset in indices of the
+        samples in the file.
+        """
+        if self.sample_map is None:
+            return sample_indices
+        return self.sample_map[sample_indices]
+
+    def enable_cache(self, max_bytes, cache_subsets=True):
+        """
+        Enables the in-process LRU cache used by get_v.
+
+        Parameters
+        ----------
+        max_bytes : int
+            The memory budget of the cache, in bytes.
+        cache_subsets : bool
+            If True, when a whole view does not fit in the budget, the asked
+            row subsets are cached instead, keyed by a hash of their indices.
+        """
+        self.view_cache = ViewCache(max_bytes)
+        self.cache_subsets = cache_subsets
+
+    def get_cache_info(self):
+        """
+        Returns the counters of the view cache, or None if it is disabled.
+        """
+        if self.view_cache is None:
+            return None
+        return self.view_cache.get_info()
+
+    def get_cached_rows(self, view_index, view_dataset, sample_indices):
+        """
+        Serves the asked rows from the view cache, reading them from the disk
+        on a miss.
+
+        If the whole view fits in the cache budget, it is read once and the
+        rows are extracted in RAM for all the following calls. Else, if
+        cache_subsets is True, the row subset itself is cached.
+        """
+        full_key = (view_index, None)
+        view_nbytes = view_dataset.size * view_dataset.dtype.itemsize
+        if full_key in self.view_cache or self.view_cache.fits(view_nbytes):
+            full_view = self.view_cache.get(full_key)
+            if full_view is None:
+                full_view = view_dataset[()]
+                self.view_cache.put(full_key, full_view)
+            return full_view[sample_indices]
+        if not self.cache_subsets:
+            return read_rows(view_dataset, sample_indices,
+                             full_read_ratio=self.full_read_ratio)
+        subset_key = (view_index, hash_indices(sample_indices))
+        rows = self.view_cache.get(subset_key)
+        if rows is None:
+            rows = read_rows(view_dataset, sample_indices,
+                             full_read_ratio=self.full_read_ratio)
+            self.view_cache.put(subset_key, rows)
+        return rows.copy()
 
     def get_view_name(self, view_idx):
         """
@@ -410,19 +627,32 @@ class HDF5Dataset(Dataset):
             The view's name.
 
         """
-        return self.dataset["View" + str(view_idx)].attrs["name"]
+        return self.view_names[view_idx]
 
     def init_attrs(self):
         """
         Used to init the attributes that are modified when self.dataset
-        changes
+        changes. The labels and the metadata are immutable for a given file,
+        so they are read once here and served from memory afterwards.
 
         Returns
         -------
 
         """
         self.nb_view = self.dataset["Metadata"].attrs["nbView"]
-        self.view_dict = self.get_view_dict()
+        self.nb_samples = self.dataset["Metadata"].attrs["datasetLength"]
+        self.labels = self.dataset["Labels"][()]
+        self.labels_names = [label_name if isinstance(label_name, bytes)
+                             else label_name.encode()
+                             for label_name in
+                             self.dataset["Labels"].attrs["names"]]
+        self.view_names = [self.dataset["View" + str(view_index)].attrs["name"]
+                           for view_index in range(self.nb_view)]
+        self.are_sparse = [self.dataset["View" + str(view_index)].attrs["sparse"]
+                           for view_index in range(self.nb_view)]
+        self.view_dict = dict((view_name, view_index)
+                              for view_index, view_name
+                              in enumerate(self.view_names))
         if "sample_ids" in self.dataset["Metadata"].keys():
             self.sample_ids = [sample_id.decode()
                                if not is_just_number(sample_id.decode())
@@ -432,6 +662,8 @@ class HDF5Dataset(Dataset):
         else:
             self.sample_ids = ["ID_" + str(i) for i in
                                range(self.dataset["Labels"].shape[0])]
+        self.sample_map = None
+        self.view_map = list(range(self.nb_view))
 
     def get_nb_samples(self):
         """
@@ -441,18 +673,14 @@ class HDF5Dataset(Dataset):
         -------
             int
         """
-        return self.dataset["Metadata"].attrs["datasetLength"]
+        return self.nb_samples
 
     def get_view_dict(self):
         """
-        Returns the dictionary containing view indices as keys and their
-        corresponding names as values
+        Returns the dictionary containing view names as keys and their
+        corresponding indices as values
         """
-        view_dict = {}
-        for view_index in range(self.nb_view):
-            view_dict[self.dataset["View" + str(view_index)].attrs[
-                "name"]] = view_index
-        return view_dict
+        return self.view_dict
 
     def get_label_names(self, decode=True, sample_indices=None):
         """
@@ -471,16 +699,14 @@ class HDF5Dataset(Dataset):
             list
             seleted labels' names
         """
-        selected_labels = self.get_labels(sample_indices)
+        selected_labels = np.unique(self.get_labels(sample_indices))
         if decode:
             return [label_name.decode("utf-8")
-                    for label, label_name in
-                    enumerate(self.dataset["Labels"].attrs["names"])
+                    for label, label_name in enumerate(self.labels_names)
                     if label in selected_labels]
         else:
             return [label_name
-                    for label, label_name in
-                    enumerate(self.dataset["Labels"].attrs["names"])
+                    for label, label_name in enumerate(self.labels_names)
                     if label in selected_labels]
 
     def get_nb_class(self, sample_indices=None):
@@ -498,7 +724,7 @@ class HDF5Dataset(Dataset):
 
         """
         sample_indices = self.init_sample_indices(sample_indices)
-        return len(np.unique(self.dataset["Labels"][()][sample_indices]))
+        return len(np.unique(self.labels[sample_indices]))
 
     def get_labels(self, sample_indices=None):
         """Gets the label array for the asked samples
@@ -512,7 +738,7 @@ class HDF5Dataset(Dataset):
         -------
         numpy.ndarray containing the labels of the asked samples"""
         sample_indices = self.init_sample_indices(sample_indices)
-        return self.dataset["Labels"][()][sample_indices]
+        return self.labels[sample_indices]
 
     def rm(self):  # pragma: no cover
         """
@@ -531,13 +757,14 @@ class HDF5Dataset(Dataset):
     def copy_view(self, target_dataset=None, source_view_name=None,
                   target_view_index=None, sample_indices=None):
         sample_indices = self.init_sample_indices(sample_indices)
-        new_d_set = target_dataset.create_dataset(
-            "View" + str(target_view_index),
-            data=self.get_v(self.view_dict[source_view_name],
-                            sample_indices=sample_indices))
-        for key, value in self.dataset[
-                "View" + str(self.view_dict[source_view_name])].attrs.items():
-            new_d_set.attrs[key] = value
+        new_d_set = create_view_dataset(
+            target_dataset, "View" + str(target_view_index),
+            self.get_v(self.view_dict[source_view_name],
+                       sample_indices=sample_indices))
+        for key, value in self.dataset["View" + str(
+                self.view_map[self.view_dict[source_view_name]])].attrs.items():
+            if key != "shape":
+                new_d_set.attrs[key] = value
 
     def init_view_names(self, view_names=None):
         if view_names is None:
@@ -548,55 +775,109 @@ class HDF5Dataset(Dataset):
     def update_hdf5_dataset(self, path):
         if hasattr(self, 'dataset'):
             self.dataset.close()
+        if self.view_cache is not None:
+            self.view_cache.clear()
         self.dataset = h5py.File(path, 'r')
         self.is_temp = True
         self.init_attrs()
 
     def filter(self, labels, label_names, sample_indices, view_names,
                path=None):
+        """
+        Restricts the dataset to the given samples and views, without
+        writing anything on the disk : the indices are translated to the
+        ones of the file each time a view is read. Use materialize to write
+        a compact copy of the filtered dataset.
+
+        Parameters
+        ----------
+        labels : numpy.ndarray
+            The new labels of the selected samples.
+        label_names : list of str
+            The names of the new labels.
+        sample_indices : numpy.ndarray
+            The indices of the selected samples.
+        view_names : list of str, or None
+            The names of the selected views, None to keep all of them.
+        path : str
+            Unused, kept for compatibility with the other datasets.
+        """
+        sample_indices = np.asarray(sample_indices, dtype=int)
+        view_names = self.init_view_names(view_names)
+        self.sample_map = self.get_parent_indices(sample_indices)
+        self.view_map = [self.view_map[self.view_dict[view_name]]
+                         for view_name in view_names]
+        self.are_sparse = [self.are_sparse[self.view_dict[view_name]]
+                           for view_name in view_names]
+        self.sample_ids = list(np.array(self.sample_ids)[sample_indices])
+        self.labels = np.asarray(labels)
+        self.labels_names = [label_name.encode()
+                             if not isinstance(label_name, bytes)
+                             else label_name
+                             for label_name in label_names]
+        self.view_names = list(view_names)
+        self.view_dict = dict((view_name, view_index)
+                              for view_index, view_name
+                              in enumerate(self.view_names))
+        self.nb_view = len(self.view_names)
+        self.nb_samples = len(sample_indices)
+
+    def is_filtered(self):
+        """Returns True if the dataset is a filtered view of its file"""
+        return (self.sample_map is not None
+                or self.view_map != list(range(
+                    self.dataset["Metadata"].attrs["nbView"])))
+
+    def materialize(self, path):
+        """
+        Writes the filtered dataset in a new compact hdf5 file,
+        "<name>_temp_filter.hdf5" in path, and uses it afterwards.
+
+        Parameters
+        ----------
+        path : str
+            The directory in which the new file is written.
+        """
         dataset_file_path = os.path.join(path,
                                          self.get_name() + "_temp_filter.hdf5")
         new_dataset_file = h5py.File(dataset_file_path, "w")
         self.dataset.copy("Metadata", new_dataset_file)
-        if "sample_ids" in self.dataset["Metadata"].keys():
+        if "sample_ids" in new_dataset_file["Metadata"].keys():
             del new_dataset_file["Metadata"]["sample_ids"]
-            ex_ids = new_dataset_file["Metadata"].create_dataset("sample_ids",
-                                                                 data=np.array(
-                                                                     self.sample_ids)[
-                                                                     sample_indices].astype(
-                                                                     np.dtype(
-                                                                         "S100")))
-        else:
-            new_dataset_file["Metadata"].create_dataset("sample_ids",
-                                                        (
-                                                            len(
-                                                                self.sample_ids),),
-                                                        data=np.array(
-                                                            self.sample_ids).astype(
-                                                            np.dtype("S100")),
-                                                        dtype=np.dtype("S100"))
-        new_dataset_file["Metadata"].attrs["datasetLength"] = len(
-            sample_indices)
-        new_dataset_file["Metadata"].attrs["nbClass"] = np.unique(labels)
-        new_dataset_file.create_dataset("Labels", data=labels)
-        new_dataset_file["Labels"].attrs["names"] = [label_name.encode()
-                                                     if not isinstance(
-            label_name, bytes)
-            else label_name
-            for label_name in
-            label_names]
-        view_names = self.init_view_names(view_names)
-        new_dataset_file["Metadata"].attrs["nbView"] = len(view_names)
-        for new_index, view_name in enumerate(view_names):
+        for view_index in range(self.dataset["Metadata"].attrs["nbView"]):
+            limits_key = "View" + str(view_index) + "_limits"
+            if limits_key in new_dataset_file["Metadata"].keys():
+                del new_dataset_file["Metadata"][limits_key]
+        for new_index, parent_index in enumerate(self.view_map):
+            limits_key = "View" + str(parent_index) + "_limits"
+            if limits_key in self.dataset["Metadata"].keys():
+                new_dataset_file["Metadata"].create_dataset(
+                    "View" + str(new_index) + "_limits",
+                    data=self.dataset["Metadata"][limits_key][()])
+        new_dataset_file["Metadata"].create_dataset(
+            "sample_ids", data=np.array(self.sample_ids).astype(
+                np.dtype("S100")), dtype=np.dtype("S100"))
+        new_dataset_file["Metadata"].attrs["datasetLength"] = self.nb_samples
+        new_dataset_file["Metadata"].attrs["nbClass"] = len(
+            np.unique(self.labels))
+        new_dataset_file["Metadata"].attrs["nbView"] = self.nb_view
+        new_dataset_file.create_dataset("Labels", data=self.labels)
+        new_dataset_file["Labels"].attrs["names"] = self.labels_names
+        for new_index, view_name in enumerate(self.view_names):
             self.copy_view(target_dataset=new_dataset_file,
                            source_view_name=view_name,
-                           target_view_index=new_index,
-                           sample_indices=sample_indices)
+                           target_view_index=new_index)
         new_dataset_file.close()
+        previous_file_path = self.dataset.filename
+        was_temp = self.is_temp
         self.update_hdf5_dataset(dataset_file_path)
+        if was_temp:
+            os.remove(previous_file_path)
 
     def add_gaussian_noise(self, random_state, path,
                            noise_std=0.15):
+        if self.is_filtered():
+            self.materialize(path)
         noisy_dataset = h5py.File(path + self.get_name() + "_noised.hdf5", "w")
         self.dataset.copy("Metadata", noisy_dataset)
         self.dataset.copy("Labels", noisy_dataset)
@@ -607,6 +888,9 @@ class HDF5Dataset(Dataset):
         for view_index in range(noisy_dataset["Metadata"].attrs["nbView"]):
             view_key = "View" + str(view_index)
             view_dset = noisy_dataset[view_key]
+            if view_dset.attrs["sparse"]:
+                # Dense gaussian noise would fill the sparse views
+                continue
             view_limits = self.dataset[
                 "Metadata/View" + str(view_index) + "_limits"][()]
             view_ranges = view_limits[:, 1] - view_limits[:, 0]
@@ -630,6 +914,953 @@ class HDF5Dataset(Dataset):
         return os.path.split(self.dataset.filename)[-1].split('.')[0]
 
 
+class NPYDataset(Dataset):
+    """
+    Dataset class
+
+    This is used to encapsulate a multiview dataset stored in a directory of
+    .npy files, one for each view, opened as read-only memory maps. The
+    needed rows are then read through the OS page cache, which is shared by
+    all the processes using the same directory, so no copy of the dataset
+    is needed for multicore computing.
+
+    The directory, named "<name>.npy", contains :
+        - View0.npy, View1.npy, ... the dense views, or for a sparse view,
+          View0_data.npy, View0_indices.npy and View0_indptr.npy, its CSR
+          arrays,
+        - Labels.npy and sample_ids.npy,
+        - manifest.json, describing the views and labels names.
+
+    Parameters
+    ----------
+    views : list of numpy arrays or None
+        The list containing each view of the dataset as a numpy array of shape
+        (nb samples, nb features), or as a scipy.sparse matrix.
+
+    labels : numpy array or None
+        The labels for the multiview dataset, of shape (nb samples, ).
+
+    dir_name : str
+        The name of the directory that will be created to store the
+        multiview dataset.
+
+    view_names : list of str, or None
+        The name of each view.
+
+    path : str
+        The path where the dataset directory will be created.
+
+    npy_dir : str, or None
+        If not None, the dataset will be opened directly from this directory.
+
+    labels_names : list of str, or None
+        The name for each unique value of the labels given in labels.
+
+    is_temp : bool
+        Used if a temporary dataset has to be stored by the benchmark.
+
+    sample_ids : list of str, or None
+        The ids of the samples.
+
+    Attributes
+    ----------
+    views : list of numpy.memmap or scipy.sparse.csr_matrix
+        The memory-mapped views.
+
+    nb_view : int
+        The number of views in the dataset.
+
+    view_dict : dict
+        The dictionnary with the name of each view as the keys and their indices
+         as values
+
+    """
+
+    manifest_name = "manifest.json"
+
+    def __init__(self, views=None, labels=None, are_sparse=False,
+                 dir_name="dataset.npy", view_names=None, path="",
+                 npy_dir=None, labels_names=None, is_temp=False,
+                 sample_ids=None):
+        if npy_dir is None:
+            npy_dir = os.path.join(path, dir_name)
+            write_npy_dataset(npy_dir, views, labels, view_names=view_names,
+                              labels_names=labels_names,
+                              sample_ids=sample_ids)
+        self.npy_dir = npy_dir
+        self.is_temp = is_temp
+        self.init_attrs()
+
+    def init_attrs(self):
+        """
+        Reads the manifest and opens the memory maps of the views and labels.
+        """
+        with open(os.path.join(self.npy_dir, self.manifest_name)) as manifest:
+            self.manifest = json.load(manifest)
+        self.nb_view = self.manifest["nb_view"]
+        self.nb_samples = self.manifest["nb_samples"]
+        self.view_names = self.manifest["view_names"]
+        self.are_sparse = self.manifest["are_sparse"]
+        self.labels_names = [label_name.encode()
+                             for label_name in self.manifest["labels_names"]]
+        self.view_dict = dict((view_name, view_index)
+                              for view_index, view_name
+                              in enumerate(self.view_names))
+        self.labels = np.load(os.path.join(self.npy_dir, "Labels.npy"))
+        self.sample_ids = list(np.load(os.path.join(self.npy_dir,
+                                                    "sample_ids.npy")))
+        self.views = [self.load_view(view_index)
+                      for view_index in range(self.nb_view)]
+        self.sample_map = None
+        self.view_map = list(range(self.nb_view))
+
+    def load_view(self, view_index):
+        view_key = "View" + str(view_index)
+        if not self.manifest["are_sparse"][view_index]:
+            return np.load(os.path.join(self.npy_dir, view_key + ".npy"),
+                           mmap_mode="r")
+        csr_arrays = [np.load(os.path.join(self.npy_dir,
+                                           view_key + "_" + array_name
+                                           + ".npy"), mmap_mode="r")
+                      for array_name in ["data", "indices", "indptr"]]
+        return sparse.csr_matrix(tuple(csr_arrays),
+                                 shape=self.manifest["view_shapes"][
+                                     view_index], copy=False)
+
+    def __getstate__(self):
+        # The memory maps are re-opened by each process instead of being
+        # pickled, and copied, with the dataset.
+        state = self.__dict__.copy()
+        del state["views"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.views = [self.load_view(view_index)
+                      for view_index in range(self.manifest["nb_view"])]
+
+    def get_v(self, view_index, sample_indices=None):
+        """
+        Extract the view and returns a numpy.ndarray containing the
+        description of the samples specified in sample_indices. If
+        sample_indices is None and the dataset is not filtered, the read-only
+        memory map of the whole view is returned without copying it.
+
+        Parameters
+        ----------
+        view_index : int
+            The index of the view to extract
+        sample_indices : numpy.ndarray
+            The array containing the indices of the samples to extract.
+
+        Returns
+        -------
+        A numpy.ndarray containing the view data for the needed samples, or a
+        scipy.sparse.csr_matrix if the view is sparse.
+        """
+        view = self.views[self.view_map[view_index]]
+        if sample_indices is None:
+            if self.sample_map is None:
+                return view
+            return view[self.sample_map]
+        if isinstance(sample_indices, int):
+            return view[self.get_parent_indices(sample_indices), :]
+        return view[self.get_parent_indices(np.asarray(sample_indices))]
+
+    def get_view_footprint(self, view_index):
+        """
+        See Dataset.get_view_footprint, computed from the memory map of the
+        view, without reading the filtered out samples.
+        """
+        return get_footprint(self.views[self.view_map[view_index]],
+                             row_indices=self.sample_map)
+
+    def get_parent_indices(self, sample_indices):
+        """
+        Translates sample indices of the filtered dataset in indices of the
+        samples in the directory.
+        """
+        if self.sample_map is None:
+            return sample_indices
+        return self.sample_map[sample_indices]
+
+    def get_view_name(self, view_idx):
+        return self.view_names[view_idx]
+
+    def get_nb_samples(self):
+        return self.nb_samples
+
+    def get_view_dict(self):
+        return self.view_dict
+
+    def get_label_names(self, decode=True, sample_indices=None):
+        selected_labels = np.unique(self.get_labels(sample_indices))
+        if decode:
+            return [label_name.decode("utf-8")
+                    for label, label_name in enumerate(self.labels_names)
+                    if label in selected_labels]
+        else:
+            return [label_name
+                    for label, label_name in enumerate(self.labels_names)
+                    if label in selected_labels]
+
+    def get_nb_class(self, sample_indices=None):
+        sample_indices = self.init_sample_indices(sample_indices)
+        return len(np.unique(self.labels[sample_indices]))
+
+    def get_labels(self, sample_indices=None):
+        sample_indices = self.init_sample_indices(sample_indices)
+        return self.labels[sample_indices]
+
+    def get_name(self):
+        """Gets the name of the dataset directory"""
+        return os.path.split(os.path.normpath(self.npy_dir))[-1].split('.')[0]
+
+    def rm(self):
+        """
+        Deletes the dataset directory if the dataset is temporary.
+        """
+        self.views = []
+        if self.is_temp:
+            shutil.rmtree(self.npy_dir)
+
+    def filter(self, labels, label_names, sample_indices, view_names,
+               path=None):
+        """
+        Restricts the dataset to the given samples and views without writing
+        anything on the disk, see HDF5Dataset.filter.
+        """
+        sample_indices = np.asarray(sample_indices, dtype=int)
+        if view_names is None:
+            view_names = self.view_names
+        self.sample_map = self.get_parent_indices(sample_indices)
+        self.view_map = [self.view_map[self.view_dict[view_name]]
+                         for view_name in view_names]
+        self.are_sparse = [self.are_sparse[self.view_dict[view_name]]
+                           for view_name in view_names]
+        self.sample_ids = list(np.array(self.sample_ids)[sample_indices])
+        self.labels = np.asarray(labels)
+        self.labels_names = [label_name.encode()
+                             if not isinstance(label_name, bytes)
+                             else label_name
+                             for label_name in label_names]
+        self.view_names = list(view_names)
+        self.view_dict = dict((view_name, view_index)
+                              for view_index, view_name
+                              in enumerate(self.view_names))
+        self.nb_view = len(self.view_names)
+        self.nb_samples = len(sample_indices)
+
+    def materialize(self, path):
+        """
+        Writes the filtered dataset in a new compact directory,
+        "<name>_temp_filter.npy" in path, and uses it afterwards.
+        """
+        new_npy_dir = os.path.join(path, self.get_name() + "_temp_filter.npy")
+        write_npy_dataset(new_npy_dir,
+                          [self.get_v(view_index)
+                           for view_index in range(self.nb_view)],
+                          self.labels, view_names=self.view_names,
+                          labels_names=self.labels_names,
+                          sample_ids=self.sample_ids)
+        previous_npy_dir = self.npy_dir
+        was_temp = self.is_temp
+        self.views = []
+        self.npy_dir = new_npy_dir
+        self.is_temp = True
+        self.init_attrs()
+        if was_temp:
+            shutil.rmtree(previous_npy_dir)
+
+
+class SharedMemoryDataset(Dataset):
+    """
+    Dataset class
+
+    This is used to share a multiview dataset between the processes of a
+    multicore benchmark without copying it. The parent process loads each
+    view of a dataset once in a multiprocessing.shared_memory segment, and
+    when the dataset is sent to a worker, only the names of the segments are
+    pickled, the worker attaching them as zero-copy numpy arrays.
+
+    The segments are owned by the process that built the dataset, which
+    releases them in rm().
+
+    Parameters
+    ----------
+    dataset : Dataset
+        The dataset to load in shared memory.
+
+    Attributes
+    ----------
+    views : list of numpy.ndarray or scipy.sparse.csr_matrix
+        The views, backed by the shared memory segments.
+
+    nb_view : int
+        The number of views in the dataset.
+
+    view_dict : dict
+        The dictionnary with the name of each view as the keys and their indices
+         as values
+
+    """
+
+    def __init__(self, dataset):
+        self.name = dataset.get_name()
+        self.view_names = [dataset.get_view_name(view_index)
+                           for view_index in range(dataset.nb_view)]
+        self.labels = np.asarray(dataset.get_labels())
+        self.labels_names = [label_name
+                             if isinstance(label_name, bytes)
+                             else label_name.encode()
+                             for label_name in dataset.labels_names]
+        self.sample_ids = dataset.sample_ids
+        self.is_temp = True
+        self.share_views(dataset.get_v(view_index)
+                         for view_index in range(dataset.nb_view))
+
+    def share_views(self, views):
+        """
+        Copies the views in new shared memory segments. views can be a
+        generator, each view is then loaded only once the previous one has
+        been copied. If a segment cannot be created, the ones already
+        created are freed.
+        """
+        self.segments = {}
+        self.view_specs = []
+        try:
+            for view in views:
+                if sparse.issparse(view):
+                    view = sparse.csr_matrix(view)
+                    arrays = [view.data, view.indices, view.indptr]
+                else:
+                    arrays = [np.asarray(view)]
+                array_specs = []
+                for array in arrays:
+                    segment = shared_memory.SharedMemory(
+                        create=True, size=max(array.nbytes, 1))
+                    self.segments[segment.name] = segment
+                    np.ndarray(array.shape, dtype=array.dtype,
+                               buffer=segment.buf)[...] = array
+                    array_specs.append((segment.name, array.shape,
+                                        array.dtype.str))
+                self.view_specs.append((view.shape, sparse.issparse(view),
+                                        array_specs))
+                # Frees the view before loading the next one
+                del view, arrays, array
+        except BaseException:
+            for segment in self.segments.values():
+                segment.close()
+                segment.unlink()
+            self.segments = {}
+            raise
+        self.init_attrs()
+
+    def init_attrs(self):
+        self.nb_view = len(self.view_specs)
+        self.nb_samples = self.labels.shape[0]
+        self.are_sparse = [is_sparse for _, is_sparse, _ in self.view_specs]
+        self.view_dict = dict((view_name, view_index)
+                              for view_index, view_name
+                              in enumerate(self.view_names))
+        self.views = [self.load_view(view_index)
+                      for view_index in range(self.nb_view)]
+
+    def load_view(self, view_index):
+        view_shape, is_sparse, array_specs = self.view_specs[view_index]
+        arrays = []
+        for segment_name, array_shape, dtype in array_specs:
+            if segment_name not in self.segments:
+                self.segments[segment_name] = attach_shared_memory(
+                    segment_name)
+            array = np.ndarray(array_shape, dtype=dtype,
+                               buffer=self.segments[segment_name].buf)
+            array.flags.writeable = False
+            arrays.append(array)
+        if is_sparse:
+            return sparse.csr_matrix(tuple(arrays), shape=view_shape,
+                                     copy=False)
+        return arrays[0]
+
+    def __getstate__(self):
+        # Only the names of the segments are pickled, the receiving process
+        # attaches them, and does not own them.
+        state = self.__dict__.copy()
+        del state["views"]
+        del state["segments"]
+        state["is_temp"] = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.segments = {}
+        self.views = [self.load_view(view_index)
+                      for view_index in range(self.nb_view)]
+
+    def get_v(self, view_index, sample_indices=None):
+        """
+        Extract the view and returns a numpy.ndarray containing the
+        description of the samples specified in sample_indices. If
+        sample_indices is None, the read-only shared view is returned without
+        copying it.
+
+        Parameters
+        ----------
+        view_index : int
+            The index of the view to extract
+        sample_indices : numpy.ndarray
+            The array containing the indices of the samples to extract.
+
+        Returns
+        -------
+        A numpy.ndarray containing the view data for the needed samples, or a
+        scipy.sparse.csr_matrix if the view is sparse.
+        """
+        if sample_indices is None:
+            return self.views[view_index]
+        if isinstance(sample_indices, int):
+            return self.views[view_index][sample_indices, :]
+        return self.views[view_index][np.asarray(sample_indices)]
+
+    def get_view_footprint(self, view_index):
+        """See Dataset.get_view_footprint, computed without copying the view"""
+        return get_footprint(self.views[view_index])
+
+    def get_view_name(self, view_idx):
+        return self.view_names[view_idx]
+
+    def get_nb_samples(self):
+        return self.nb_samples
+
+    def get_view_dict(self):
+        return self.view_dict
+
+    def get_label_names(self, decode=True, sample_indices=None):
+        selected_labels = np.unique(self.get_labels(sample_indices))
+        if decode:
+            return [label_name.decode("utf-8")
+                    for label, label_name in enumerate(self.labels_names)
+                    if label in selected_labels]
+        else:
+            return [label_name
+                    for label, label_name in enumerate(self.labels_names)
+                    if label in selected_labels]
+
+    def get_nb_class(self, sample_indices=None):
+        sample_indices = self.init_sample_indices(sample_indices)
+        return len(np.unique(self.labels[sample_indices]))
+
+    def get_labels(self, sample_indices=None):
+        sample_indices = self.init_sample_indices(sample_indices)
+        return self.labels[sample_indices]
+
+    def get_name(self):
+        return self.name
+
+    def release_segments(self):
+        self.views = []
+        for segment in self.segments.values():
+            try:
+                segment.close()
+            except BufferError:  # pragma: no cover
+                # An array returned by get_v still uses the segment, it will
+                # be unmapped when garbage collected.
+                pass
+            if self.is_temp:
+                segment.unlink()
+        self.segments = {}
+
+    def rm(self):
+        """
+        Closes the segments, and frees them if they are owned by this process.
+        """
+        self.release_segments()
+
+    def filter(self, labels, label_names, sample_indices, view_names,
+               path=None):
+        if view_names is None:
+            view_names = self.view_names
+        views = [self.get_v(self.view_dict[view_name],
+                            sample_indices=sample_indices)
+                 for view_name in view_names]
+        if self.sample_ids is not None:
+            self.sample_ids = list(np.array(self.sample_ids)[sample_indices])
+        self.labels = np.asarray(labels)
+        self.labels_names = [label_name
+                             if isinstance(label_name, bytes)
+                             else label_name.encode()
+                             for label_name in label_names]
+        self.view_names = list(view_names)
+        self.release_segments()
+        self.is_temp = True
+        self.share_views(views)
+
+
+def get_shared_handle(dataset_var):
+    """
+    Returns a dataset equivalent to dataset_var that is cheap to send to
+    other processes : the on-disk and shared datasets only pickle a handle,
+    so a RAMDataset is copied in shared memory.
+
+    Returns
+    -------
+    shared_dataset : Dataset
+    is_shared : bool
+        True if shared_dataset has been built, it must be released with rm().
+    """
+    if isinstance(dataset_var, RAMDataset):
+        return SharedMemoryDataset(dataset_var), True
+    return dataset_var, False
+
+
+class FoldDataset(Dataset):
+    """
+    Dataset class
+
+    In-memory copy of the views of a dataset restricted to the samples of a
+    cross-validation fold, built once by a hyper-parameter search so that
+    the fit and predict of each candidate do not extract the fold from the
+    dataset (and read it from the disk) again. The train rows are stored
+    first, so the train and test matrices of the fold are served without
+    copy, as read-only arrays since they are shared by all the candidates
+    of the search, and the other subsets of the fold by indexing. The views
+    that have not been materialized, and the samples out of the fold, are
+    read from the dataset.
+
+    Parameters
+    ----------
+    dataset : Dataset
+        The dataset of the fold.
+    train_indices : numpy.ndarray
+        The indices of the train samples of the fold in the dataset.
+    test_indices : numpy.ndarray
+        The indices of the test samples of the fold in the dataset.
+
+    Attributes
+    ----------
+    blocks : dict
+        Maps the index of each materialized view to its rows for the train
+        and test samples.
+
+    hits : int
+        The number of get_v calls served from the blocks.
+
+    misses : int
+        The number of get_v calls served by the dataset.
+    """
+
+    def __init__(self, dataset, train_indices, test_indices):
+        self.dataset = dataset
+        self.train_indices = np.asarray(train_indices)
+        self.test_indices = np.asarray(test_indices)
+        self.positions = np.full(dataset.get_nb_samples(), -1)
+        self.positions[self.train_indices] = np.arange(len(train_indices))
+        self.positions[self.test_indices] = np.arange(
+            len(train_indices), len(train_indices) + len(test_indices))
+        self.blocks = {}
+        self.nb_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        # The other attributes and methods are the ones of the dataset
+        if name == "dataset":
+            raise AttributeError(name)
+        return getattr(self.dataset, name)
+
+    def materialize(self, view_index):
+        """Copies the rows of the fold of a view in memory"""
+        block = self.dataset.get_v(view_index, np.concatenate(
+            [self.train_indices, self.test_indices]))
+        if sparse.issparse(block):
+            block = sparse.csr_matrix(block)
+            self.nb_bytes += block.data.nbytes + block.indices.nbytes \
+                + block.indptr.nbytes
+        else:
+            block.flags.writeable = False
+            self.nb_bytes += block.nbytes
+        self.blocks[view_index] = block
+
+    def clear(self):
+        self.blocks = {}
+        self.nb_bytes = 0
+
+    def get_v(self, view_index, sample_indices=None):
+        """
+        Returns the rows of a view for the asked samples, from the fold
+        blocks if possible, see Dataset.get_v.
+        """
+        if view_index in self.blocks and sample_indices is not None \
+                and not isinstance(sample_indices, int):
+            sample_indices = np.asarray(sample_indices)
+            nb_train = len(self.train_indices)
+            if np.array_equal(sample_indices, self.train_indices):
+                self.hits += 1
+                return self.blocks[view_index][:nb_train]
+            if np.array_equal(sample_indices, self.test_indices):
+                self.hits += 1
+                return self.blocks[view_index][nb_train:]
+            positions = self.positions[sample_indices]
+            if len(positions) and positions.min() >= 0:
+                self.hits += 1
+                return self.blocks[view_index][positions]
+        self.misses += 1
+        return self.dataset.get_v(view_index, sample_indices)
+
+    def get_nb_samples(self):
+        return self.dataset.get_nb_samples()
+
+    def get_label_names(self, decode=True, sample_indices=None):
+        return self.dataset.get_label_names(decode=decode,
+                                            sample_indices=sample_indices)
+
+    def get_labels(self, sample_indices=None):
+        return self.dataset.get_labels(sample_indices)
+
+    def filter(self, labels, label_names, sample_indices, view_names,
+               path=None):
+        """
+        Filters the dataset, see Dataset.filter. The indices of the fold do
+        not match its samples anymore, so the fold is emptied.
+        """
+        self.clear()
+        self.dataset.filter(labels, label_names, sample_indices, view_names,
+                            path=path)
+        self.train_indices = np.array([], dtype=int)
+        self.test_indices = np.array([], dtype=int)
+        self.positions = np.full(self.dataset.get_nb_samples(), -1)
+
+
+def materialize_folds(dataset_var, folds, view_indices=None, max_bytes=0):
+    """
+    Builds a FoldDataset for each fold, materializing the views of the folds
+    in order while their estimated size fits in max_bytes, see
+    Dataset.get_view_footprint.
+
+    Parameters
+    ----------
+    folds : list of (train_indices, test_indices)
+        The indices of the samples of each fold in dataset_var.
+
+    Returns
+    -------
+    fold_datasets : list of FoldDataset
+    """
+    if view_indices is None:
+        view_indices = range(dataset_var.nb_view)
+    nb_samples = dataset_var.get_nb_samples()
+    view_bytes = dict((view_index,
+                       dataset_var.get_view_footprint(view_index)[1])
+                      for view_index in view_indices)
+    available_bytes = max_bytes
+    fold_datasets = []
+    for train_indices, test_indices in folds:
+        fold_dataset = FoldDataset(dataset_var, train_indices, test_indices)
+        for view_index in view_indices:
+            nb_bytes = view_bytes[view_index] * (
+                len(train_indices) + len(test_indices)) / nb_samples
+            if nb_bytes <= available_bytes:
+                fold_dataset.materialize(view_index)
+                available_bytes -= nb_bytes
+        fold_datasets.append(fold_dataset)
+    return fold_datasets
+
+
+class ViewCache():
+    """
+    Least recently used cache for the arrays read from an on-disk dataset,
+    bounded by a memory budget.
+
+    Parameters
+    ----------
+    max_bytes : int
+        The maximum number of bytes held by the cache.
+
+    Attributes
+    ----------
+    hits : int
+        The number of lookups served from the cache.
+
+    misses : int
+        The number of lookups that had to go to the disk.
+
+    evictions : int
+        The number of entries dropped to respect the budget.
+
+    nb_bytes : int
+        The number of bytes currently held by the cache.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = int(max_bytes)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nb_bytes = 0
+        # The cache is shared with the thread of a ViewPrefetcher
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def fits(self, nb_bytes):
+        return nb_bytes <= self.max_bytes
+
+    def get(self, key):
+        """Returns the cached array, or None on a miss"""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, array):
+        """Stores the array, evicting the least recently used entries if
+        needed. Arrays bigger than the whole budget are not stored."""
+        if not self.fits(array.nbytes):
+            return
+        with self.lock:
+            if key in self.entries:
+                self.nb_bytes -= self.entries.pop(key).nbytes
+            while self.nb_bytes + array.nbytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.nb_bytes -= evicted.nbytes
+                self.evictions += 1
+            self.entries[key] = array
+            self.nb_bytes += array.nbytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nb_bytes = 0
+
+    def get_info(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "nb_bytes": self.nb_bytes,
+                "max_bytes": self.max_bytes}
+
+
+class ViewPrefetcher():
+    """
+    Reads views in a background thread, in the order in which they will be
+    requested, so the next view is read from the disk while the experiments
+    on the current one run.
+
+    The views are requested through get_v, in the order of requests. A view
+    requested out of this order is read directly, and a request that turns
+    out to be useless is dropped with discard.
+
+    Parameters
+    ----------
+    dataset_var : Dataset
+        The dataset from which the views are read.
+    requests : list of (view_index, sample_indices) couples
+        The upcoming reads, in order.
+    buffer_size : int
+        The maximum number of views read ahead and held in memory.
+
+    Attributes
+    ----------
+    hits : int
+        The number of views that were ready when requested.
+
+    stalls : int
+        The number of views that were still being read when requested.
+
+    misses : int
+        The number of views requested out of order, read directly.
+
+    stall_time : float
+        The time, in seconds, spent waiting for the views being read.
+    """
+
+    def __init__(self, dataset_var, requests, buffer_size=1):
+        self.dataset_var = dataset_var
+        self.requests = deque(requests)
+        self.buffer = queue.Queue()
+        # A view is only read once it has a slot, freed when it is requested
+        self.slots = threading.Semaphore(buffer_size)
+        self.stop = threading.Event()
+        # The positions in requests of the discarded requests, and the
+        # number of their views still to be taken from the buffer
+        self.discarded = set()
+        self.nb_pending = 0
+        self.position = 0
+        self.hits = 0
+        self.stalls = 0
+        self.misses = 0
+        self.stall_time = 0.0
+        self.thread = threading.Thread(target=self.read,
+                                       args=(list(requests),), daemon=True)
+        self.thread.start()
+
+    def read(self, requests):
+        for position, (view_index, sample_indices) in enumerate(requests):
+            while not self.slots.acquire(timeout=0.1):
+                if self.stop.is_set():
+                    return
+            if self.stop.is_set():
+                return
+            if position in self.discarded:
+                self.buffer.put(None)
+                continue
+            try:
+                view = self.dataset_var.get_v(view_index,
+                                              sample_indices=sample_indices)
+            except BaseException as error:
+                # Raised in the main thread, when the view is requested
+                view = error
+            self.buffer.put(view)
+
+    def get_v(self, view_index, sample_indices=None):
+        """Returns the view, as Dataset.get_v"""
+        if not self.requests or not is_request(self.requests[0], view_index,
+                                               sample_indices):
+            self.misses += 1
+            return self.dataset_var.get_v(view_index,
+                                          sample_indices=sample_indices)
+        self.requests.popleft()
+        self.position += 1
+        self.drop_discarded(block=True)
+        try:
+            view = self.buffer.get_nowait()
+            self.hits += 1
+        except queue.Empty:
+            wait_beg = time.monotonic()
+            view = self.buffer.get()
+            self.stall_time += time.monotonic() - wait_beg
+            self.stalls += 1
+        self.slots.release()
+        if isinstance(view, BaseException):
+            raise view
+        return view
+
+    def discard(self, view_index, sample_indices=None):
+        """
+        Drops the next request if it is the one of the view, so the view is
+        not read, or freed if it already has been.
+        """
+        if not self.requests or not is_request(self.requests[0], view_index,
+                                               sample_indices):
+            return
+        self.requests.popleft()
+        self.discarded.add(self.position)
+        self.position += 1
+        self.nb_pending += 1
+        self.drop_discarded(block=False)
+
+    def drop_discarded(self, block):
+        """Takes the views of the discarded requests out of the buffer, they
+        are the first ones in it"""
+        while self.nb_pending:
+            try:
+                self.buffer.get(block=block)
+            except queue.Empty:
+                return
+            self.slots.release()
+            self.nb_pending -= 1
+
+    def close(self):
+        """Stops the thread and frees the views read ahead"""
+        self.stop.set()
+        self.thread.join()
+        while not self.buffer.empty():
+            self.buffer.get_nowait()
+
+    def get_info(self):
+        return {"hits": self.hits, "stalls": self.stalls,
+                "misses": self.misses, "stall_time": self.stall_time}
+
+    def log_info(self):
+        nb_requests = self.hits + self.stalls + self.misses
+        if nb_requests:
+            logging.info("Info:\t View prefetching : {} views ready in time "
+                         "out of {} ({:.0%} hit rate), {:.2f}s spent waiting "
+                         "for {} views being read".format(
+                             self.hits, nb_requests, self.hits / nb_requests,
+                             self.stall_time, self.stalls))
+
+
+def is_request(request, view_index, sample_indices):
+    requested_view_index, requested_indices = request
+    if requested_view_index != view_index:
+        return False
+    if requested_indices is None or sample_indices is None:
+        return requested_indices is None and sample_indices is None
+    return np.array_equal(requested_indices, sample_indices)
+
+
+def hash_indices(sample_indices):
+    """Used to key a set of sample indices in the view cache"""
+    return hashlib.sha1(
+        np.ascontiguousarray(sample_indices, dtype=np.int64).tobytes()
+    ).hexdigest()
+
+
+def decode_label_name(label_name):
+    """Returns the str version of a label name stored as bytes or str"""
+    if isinstance(label_name, bytes):
+        return label_name.decode("utf-8")
+    return str(label_name)
+
+
+def recode_labels(labels, selected_labels):
+    """
+    Selects the samples labelled with one of the selected labels and recodes
+    their labels by the rank of the label in selected_labels, with one
+    vectorized pass over the labels.
+
+    Parameters
+    ----------
+    labels : numpy.ndarray
+        The labels of all the samples.
+    selected_labels : numpy.ndarray
+        The labels to select, the first one will be recoded 0, the second 1,
+        ...
+
+    Returns
+    -------
+    selected_indices : numpy.ndarray
+        The indices of the selected samples.
+    new_labels : numpy.ndarray
+        The recoded labels of the selected samples.
+    """
+    labels = np.asarray(labels)
+    selected_labels = np.asarray(selected_labels)
+    selected_indices = np.flatnonzero(np.isin(labels, selected_labels))
+    sorted_labels, ranks = np.unique(selected_labels, return_index=True)
+    new_labels = ranks[np.searchsorted(sorted_labels,
+                                       labels[selected_indices])]
+    return selected_indices, new_labels
+
+
+def attach_shared_memory(segment_name):
+    """
+    Attaches an existing shared memory segment without registering it in the
+    resource tracker, as only the process that created it must free it.
+    """
+    if sys.version_info >= (3, 13):  # pragma: no cover
+        return shared_memory.SharedMemory(name=segment_name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=segment_name)
+    finally:
+        resource_tracker.register = register
+
+
 def is_just_number(string):
     try:
         float(string)
@@ -638,133 +1869,470 @@ def is_just_number(string):
         return False
 
 
-def datasets_already_exist(pathF, name, nbCores):
-    """Used to check if it's necessary to copy datasets"""
-    allDatasetExist = True
-    for coreIndex in range(nbCores):
-        allDatasetExist *= os.path.isfile(os.path.join(
-            pathF, name + str(coreIndex) + ".hdf5"))
-    return allDatasetExist
+def extract_subset(matrix, used_indices):
+    """Used to extract a subset of the rows of a matrix, without densifying
+    it if it's sparse"""
+    if sparse.issparse(matrix):
+        return sparse.csr_matrix(matrix)[used_indices]
+    else:
+        return matrix[used_indices]
+
+
+def get_footprint(view, row_indices=None):
+    """
+    Returns the number of features of a view and the memory, in bytes, that
+    its rows in row_indices (all of them if None) take once loaded, as a
+    numpy array or a CSR matrix. It is computed from the shape and dtype of
+    the view, and the row pointers if it is sparse, without copying it.
+    """
+    nb_rows = view.shape[0] if row_indices is None else len(row_indices)
+    if not sparse.issparse(view):
+        return view.shape[1], nb_rows * view.shape[1] * view.dtype.itemsize
+    if view.format == "csr":
+        index_itemsize = view.indices.dtype.itemsize
+        if row_indices is None:
+            nb_stored = view.nnz
+        else:
+            row_indices = np.asarray(row_indices)
+            nb_stored = int(np.sum(view.indptr[row_indices + 1]
+                                   - view.indptr[row_indices]))
+    else:
+        # The view would be converted to CSR, with 32 bits indices
+        index_itemsize = np.dtype(np.int32).itemsize
+        nb_stored = view.nnz * nb_rows / max(view.shape[0], 1)
+    return view.shape[1], int(nb_stored * (view.dtype.itemsize
+                                           + index_itemsize)
+                              + (nb_rows + 1) * index_itemsize)
 
 
-def extract_subset(matrix, used_indices):
-    """Used to extract a subset of a matrix even if it's sparse WIP"""
-    # if sparse.issparse(matrix):
-    #     new_indptr = np.zeros(len(used_indices) + 1, dtype=int)
-    #     oldindptr = matrix.indptr
-    #     for sampleIndexIndex, sampleIndex in enumerate(used_indices):
-    #         new_indptr[sampleIndexIndex + 1] = new_indptr[
-    #                                                 sampleIndexIndex] + (
-    #                                                     oldindptr[
-    #                                                         sampleIndex + 1] -
-    #                                                     oldindptr[sampleIndex])
-    #     new_data = np.ones(new_indptr[-1], dtype=bool)
-    #     new_indices = np.zeros(new_indptr[-1], dtype=int)
-    #     old_indices = matrix.indices
-    #     for sampleIndexIndex, sampleIndex in enumerate(used_indices):
-    #         new_indices[new_indptr[sampleIndexIndex]:new_indptr[
-    #             sampleIndexIndex + 1]] = old_indices[
-    #                                       oldindptr[sampleIndex]:
-    #                                       oldindptr[sampleIndex + 1]]
-    #     return sparse.csr_matrix((new_data, new_indices, new_indptr),
-    #                              shape=(len(used_indices), matrix.shape[1]))
-    # else:
-    return matrix[used_indices]
-
-
-def init_multiple_datasets(path_f, name, nb_cores):  # pragma: no cover
-    r"""Used to create copies of the dataset if multicore computation is used.
-
-    This is a temporary solution to fix the sharing memory issue with HDF5 datasets.
+def save_npy_view(npy_dir, view_index, view):
+    """
+    Saves a view in a NPYDataset directory, as one .npy file if it is dense,
+    or as its three CSR arrays if it is sparse.
+    """
+    view_key = "View" + str(view_index)
+    if sparse.issparse(view):
+        view = sparse.csr_matrix(view)
+        for array_name in ["data", "indices", "indptr"]:
+            np.save(os.path.join(npy_dir, view_key + "_" + array_name
+                                 + ".npy"), getattr(view, array_name))
+    else:
+        np.save(os.path.join(npy_dir, view_key + ".npy"), view)
+
+
+def write_npy_manifest(npy_dir, labels, view_names, view_shapes, are_sparse,
+                       labels_names=None, sample_ids=None):
+    """
+    Saves the labels and sample ids of a NPYDataset directory, and the
+    manifest describing its views.
+    """
+    if labels_names is None:
+        labels_names = [str(index) for index in np.unique(labels)]
+    labels_names = [label_name.decode() if isinstance(label_name, bytes)
+                    else str(label_name) for label_name in labels_names]
+    if sample_ids is None:
+        sample_ids = ["ID_" + str(i) for i in range(len(labels))]
+    sample_ids = [sample_id.decode() if isinstance(sample_id, bytes)
+                  else str(sample_id) for sample_id in sample_ids]
+    sample_ids = [sample_id if not is_just_number(sample_id)
+                  else "ID_" + sample_id for sample_id in sample_ids]
+    np.save(os.path.join(npy_dir, "Labels.npy"), np.asarray(labels))
+    np.save(os.path.join(npy_dir, "sample_ids.npy"), np.array(sample_ids))
+    manifest = {"nb_view": len(view_names),
+                "nb_samples": int(len(labels)),
+                "view_names": [view_name.decode()
+                               if isinstance(view_name, bytes)
+                               else str(view_name)
+                               for view_name in view_names],
+                "view_shapes": [[int(dim) for dim in view_shape]
+                                for view_shape in view_shapes],
+                "are_sparse": [bool(is_sparse) for is_sparse in are_sparse],
+                "labels_names": labels_names}
+    with open(os.path.join(npy_dir, NPYDataset.manifest_name),
+              "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+
+
+def write_npy_dataset(npy_dir, views, labels, view_names=None,
+                      labels_names=None, sample_ids=None):
+    """
+    Writes a multiview dataset in the directory layout of NPYDataset.
 
     Parameters
     ----------
-    path_f : string
-        Path to the original dataset directory
-    name : string
-        Name of the dataset
-    nb_cores : int
-        The number of threads that the benchmark can use
+    npy_dir : str
+        The path of the directory to create.
+    views : list of numpy.ndarray or scipy.sparse matrices
+        The views, of shape (nb samples, nb features).
+    labels : numpy.ndarray
+        The labels, of shape (nb samples, ).
+    view_names : list of str, or None
+        The name of each view.
+    labels_names : list of str, or None
+        The name for each unique value of the labels.
+    sample_ids : list of str, or None
+        The ids of the samples.
+    """
+    os.makedirs(npy_dir, exist_ok=True)
+    if view_names is None:
+        view_names = ["View" + str(index) for index in range(len(views))]
+    for view_index, view in enumerate(views):
+        save_npy_view(npy_dir, view_index, view)
+    write_npy_manifest(npy_dir, labels, view_names,
+                       [view.shape for view in views],
+                       [sparse.issparse(view) for view in views],
+                       labels_names=labels_names, sample_ids=sample_ids)
+
+
+def hdf5_to_npy(hdf5_file_path, npy_dir=None, block_size=10000):
+    """
+    Converts an HDF5 dataset to the directory layout of NPYDataset.
+
+    The dense views are copied by blocks of rows in a memory-mapped .npy
+    file, so a view never has to fit in RAM.
+
+    Parameters
+    ----------
+    hdf5_file_path : str
+        The path of the HDF5 dataset file.
+    npy_dir : str, or None
+        The path of the directory to create. If None, it is created next to
+        the HDF5 file, with the same name and the ".npy" extension.
+    block_size : int
+        The number of rows copied at once.
 
     Returns
     -------
-    datasetFiles : None
-        Dictionary resuming which mono- and multiview algorithms which will be used in the benchmark.
+    The path of the created directory.
     """
-    if nb_cores > 1:
-        if datasets_already_exist(path_f, name, nb_cores):
-            logging.info(
-                "Info:\t Enough copies of the dataset are already available")
-            pass
+    if npy_dir is None:
+        npy_dir = os.path.splitext(hdf5_file_path)[0] + ".npy"
+    os.makedirs(npy_dir, exist_ok=True)
+    hdf5_dataset = HDF5Dataset(hdf5_file=h5py.File(hdf5_file_path, "r"))
+    view_shapes = []
+    for view_index in range(hdf5_dataset.nb_view):
+        view_key = "View" + str(view_index)
+        if hdf5_dataset.are_sparse[view_index]:
+            view = hdf5_dataset.get_v(view_index)
+            save_npy_view(npy_dir, view_index, view)
         else:
-            if os.path.getsize(
-                    os.path.join(path_f, name + ".hdf5")) * nb_cores / float(
-                    1024) / 1000 / 1000 > 0.1:
-                logging.info("Start:\t Creating " + str(
-                    nb_cores) + " temporary datasets for multiprocessing")
-                logging.warning(
-                    r" WARNING : /!\ This may use a lot of HDD storage space : " +
-                    str(os.path.getsize(os.path.join(path_f,
-                                                     name + ".hdf5")) * nb_cores / float(
-                        1024) / 1000 / 1000) + " Gbytes /!\ ")
-                confirmation = confirm()
-                if not confirmation:
-                    sys.exit(0)
-                else:
-                    pass
-            else:
-                pass
-            dataset_files = copy_hdf5(path_f, name, nb_cores)
-            logging.info("Start:\t Creating datasets for multiprocessing")
-            return dataset_files
-
-
-def copy_hdf5(pathF, name, nbCores):
-    """Used to copy a HDF5 database in case of multicore computing"""
-    datasetFile = h5py.File(pathF + name + ".hdf5", "r")
-    for coreIndex in range(nbCores):
-        newDataSet = h5py.File(pathF + name + str(coreIndex) + ".hdf5", "w")
-        for dataset in datasetFile:
-            datasetFile.copy("/" + dataset, newDataSet["/"])
-        newDataSet.close()
-
-
-def delete_HDF5(benchmarkArgumentsDictionaries, nbCores, dataset):
-    """Used to delete temporary copies at the end of the benchmark"""
-    if nbCores > 1:
-        logging.info("Start:\t Deleting " + str(
-            nbCores) + " temporary datasets for multiprocessing")
-        args = benchmarkArgumentsDictionaries[0]["args"]
-        logging.info("Start:\t Deleting datasets for multiprocessing")
-
-        for coreIndex in range(nbCores):
-            os.remove(args["pathf"] + args["name"] + str(coreIndex) + ".hdf5")
-    if dataset.is_temp:
-        dataset.rm()
+            view = hdf5_dataset.dataset[view_key]
+            npy_view = np.lib.format.open_memmap(
+                os.path.join(npy_dir, view_key + ".npy"), mode="w+",
+                dtype=view.dtype, shape=view.shape)
+            for block_start in range(0, view.shape[0], block_size):
+                npy_view[block_start:block_start + block_size] = view[
+                    block_start:block_start + block_size]
+            npy_view.flush()
+            del npy_view
+        view_shapes.append(view.shape)
+    write_npy_manifest(npy_dir, hdf5_dataset.get_labels(),
+                       hdf5_dataset.view_names, view_shapes,
+                       hdf5_dataset.are_sparse,
+                       labels_names=hdf5_dataset.labels_names,
+                       sample_ids=hdf5_dataset.sample_ids)
+    hdf5_dataset.dataset.close()
+    return npy_dir
+
+
+# The layout used by repack_hdf5 and by the csv conversion : row-block
+# chunks, compressed with lzf after the shuffle filter.
+TUNED_LAYOUT = {"chunk_rows": "auto", "compression": "lzf", "shuffle": True}
+
+
+def get_chunk_rows(shape, itemsize, chunk_bytes=256 * 1024):
+    """
+    Computes the number of rows of the row-block chunks of a dataset, so that
+    each chunk holds about chunk_bytes. With the default 256KB, a few chunks
+    fit in the 1MB chunk cache of h5py, so the neighbouring rows of a fold
+    are decompressed once.
 
+    Parameters
+    ----------
+    shape : tuple of int
+        The shape of the dataset, with the samples on the first axis.
+    itemsize : int
+        The size of an element, in bytes.
+    chunk_bytes : int
+        The targeted size of a chunk, in bytes.
+
+    Returns
+    -------
+    int : the number of rows in each chunk.
+    """
+    row_nbytes = itemsize * int(np.prod(shape[1:]))
+    return int(max(1, min(shape[0], chunk_bytes // max(row_nbytes, 1))))
 
-def confirm(resp=True, timeout=15):  # pragma: no cover
-    """Used to process answer"""
-    ans = input_(timeout)
-    if not ans:
-        return resp
-    if ans not in ['y', 'Y', 'n', 'N']:
-        print('please enter y or n.')
-    if ans == 'y' or ans == 'Y':
-        return True
-    if ans == 'n' or ans == 'N':
-        return False
 
+def get_view_layout(shape, dtype, chunk_rows=None, compression=None,
+                    compression_opts=None, shuffle=False, float32=False):
+    """
+    Builds the keyword arguments of h5py's create_dataset for a view, or for
+    one of the arrays of a sparse view.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        The shape of the dataset.
+    dtype : numpy.dtype
+        The type of the data.
+    chunk_rows : int, "auto" or None
+        The number of rows of each chunk, "auto" to compute it with
+        get_chunk_rows. If None, and no filter is asked, the dataset is
+        contiguous.
+    compression : "lzf", "gzip" or None
+        The compression filter.
+    compression_opts : int or None
+        The compression level for gzip.
+    shuffle : bool
+        If True, the bytes are shuffled before compression, which improves
+        the ratio on numerical data.
+    float32 : bool
+        If True, the floating point views are downcasted to float32.
 
-def input_(timeout=15):  # pragma: no cover
-    """used as a UI to stop if too much HDD space will be used"""
-    logging.warning("You have " + str(
-        timeout) + " seconds to stop the dataset copy by typing n")
-    i, o, e = select.select([sys.stdin], [], [], timeout)
-    if i:
-        return sys.stdin.readline().strip()
+    Returns
+    -------
+    dict : the keyword arguments.
+    """
+    dtype = np.dtype(dtype)
+    if float32 and np.issubdtype(dtype, np.floating):
+        dtype = np.dtype(np.float32)
+    layout = {"dtype": dtype}
+    chunked = (chunk_rows is not None or compression is not None or shuffle)
+    if chunked and 0 not in shape:
+        if chunk_rows is None or chunk_rows == "auto":
+            chunk_rows = get_chunk_rows(shape, dtype.itemsize)
+        layout["chunks"] = (min(int(chunk_rows), shape[0]),) + tuple(
+            shape[1:])
+        if compression is not None:
+            layout["compression"] = compression
+            layout["compression_opts"] = compression_opts
+        layout["shuffle"] = shuffle
+    return layout
+
+
+def create_view_dataset(hdf5_file, view_key, view, **layout):
+    """
+    Writes a view in an HDF5 file. Dense views are stored as a single
+    dataset, sparse views as a group containing the data, indices and indptr
+    arrays of their CSR representation, with their shape as an attribute.
+
+    Parameters
+    ----------
+    hdf5_file : h5py.File or h5py.Group
+        The file in which the view is written.
+    view_key : str
+        The key of the view in the file ("View0", "View1", ...).
+    view : numpy.ndarray or scipy.sparse matrix
+        The view data.
+    layout :
+        The chunking, compression and type arguments of get_view_layout. By
+        default, the view is stored contiguous and uncompressed.
+
+    Returns
+    -------
+    The created h5py.Dataset or h5py.Group, on which the view attributes can
+    be set.
+    """
+    if sparse.issparse(view):
+        view = sparse.csr_matrix(view)
+        view_group = hdf5_file.create_group(view_key)
+        view_group.create_dataset(
+            "data", data=view.data,
+            **get_view_layout(view.data.shape, view.data.dtype, **layout))
+        index_layout = dict(layout, float32=False)
+        view_group.create_dataset(
+            "indices", data=view.indices,
+            **get_view_layout(view.indices.shape, view.indices.dtype,
+                              **index_layout))
+        view_group.create_dataset("indptr", data=view.indptr)
+        view_group.attrs["shape"] = view.shape
+        return view_group
     else:
-        return "y"
+        view = np.asarray(view)
+        return hdf5_file.create_dataset(
+            view_key, view.shape, data=view,
+            **get_view_layout(view.shape, view.dtype, **layout))
+
+
+def repack_hdf5(file_path, output_path=None, block_size=10000, **layout):
+    """
+    Rewrites a SuMMIT HDF5 file with a tuned layout. The views are copied by
+    blocks of rows, so they never have to fit in RAM, the labels and
+    metadata are copied as is.
+
+    Parameters
+    ----------
+    file_path : str
+        The path of the file to repack.
+    output_path : str or None
+        The path of the repacked file. If None, the file is replaced, once the
+        repacked copy is complete.
+    block_size : int
+        The number of rows copied at once.
+    layout :
+        The arguments of get_view_layout, TUNED_LAYOUT if none is given.
+
+    Returns
+    -------
+    The path of the repacked file.
+    """
+    if not layout:
+        layout = TUNED_LAYOUT
+    target_path = output_path
+    if output_path is None:
+        target_path = file_path + ".repack"
+    with h5py.File(file_path, "r") as source_file, \
+            h5py.File(target_path, "w") as target_file:
+        for key in source_file.keys():
+            if not key.startswith("View"):
+                source_file.copy(key, target_file)
+                continue
+            source_view = source_file[key]
+            if source_view.attrs["sparse"]:
+                view = sparse.csr_matrix((source_view["data"][()],
+                                          source_view["indices"][()],
+                                          source_view["indptr"][()]),
+                                         shape=tuple(
+                                             source_view.attrs["shape"]))
+                target_view = create_view_dataset(target_file, key, view,
+                                                  **layout)
+            else:
+                target_view = target_file.create_dataset(
+                    key, source_view.shape,
+                    **get_view_layout(source_view.shape, source_view.dtype,
+                                      **layout))
+                for block_start in range(0, source_view.shape[0],
+                                         block_size):
+                    target_view[block_start:block_start + block_size] = \
+                        source_view[block_start:block_start + block_size]
+            for attr_key, value in source_view.attrs.items():
+                if attr_key != "shape":
+                    target_view.attrs[attr_key] = value
+    if output_path is None:
+        os.replace(target_path, file_path)
+        target_path = file_path
+    return target_path
+
+
+def get_contiguous_runs(unique_indices):
+    """
+    Splits sorted unique indices in runs of consecutive values.
+
+    Returns
+    -------
+    The positions in unique_indices of the start and end (excluded) of each
+    run.
+    """
+    run_starts = np.concatenate(
+        ([0], np.where(np.diff(unique_indices) != 1)[0] + 1))
+    run_ends = np.concatenate((run_starts[1:], [len(unique_indices)]))
+    return run_starts, run_ends
+
+
+def read_rows(h5_dataset, sample_indices, full_read_ratio=0.5):
+    """
+    Reads only the needed rows of an HDF5 dataset and returns them in the
+    order of sample_indices.
+
+    The indices are sorted and de-duplicated, then grouped in runs of
+    contiguous rows, each run being read with a single slice. If more than
+    full_read_ratio of the rows are asked, the whole dataset is read in one
+    call and indexed in RAM, as it is cheaper than many small reads.
+
+    Parameters
+    ----------
+    h5_dataset : h5py.Dataset
+        The on-disk dataset, with the samples on the first axis.
+    sample_indices : numpy.ndarray
+        The indices of the rows to extract, in any order, possibly repeated.
+    full_read_ratio : float
+        The ratio of asked rows above which the full dataset is read.
+
+    Returns
+    -------
+    A numpy.ndarray containing the asked rows.
+    """
+    sample_indices = np.asarray(sample_indices)
+    if sample_indices.ndim == 0:
+        return h5_dataset[int(sample_indices)]
+    nb_rows = h5_dataset.shape[0]
+    if sample_indices.shape[0] == 0:
+        return np.empty((0,) + h5_dataset.shape[1:], dtype=h5_dataset.dtype)
+    if sample_indices.shape[0] >= full_read_ratio * nb_rows:
+        return h5_dataset[()][sample_indices]
+    sample_indices = np.where(sample_indices < 0, sample_indices + nb_rows,
+                              sample_indices)
+    unique_indices, inverse = np.unique(sample_indices, return_inverse=True)
+    run_starts, run_ends = get_contiguous_runs(unique_indices)
+    rows = np.empty((len(unique_indices),) + h5_dataset.shape[1:],
+                    dtype=h5_dataset.dtype)
+    for run_start, run_end in zip(run_starts, run_ends):
+        first_row = unique_indices[run_start]
+        rows[run_start:run_end] = h5_dataset[
+            first_row:first_row + run_end - run_start]
+    return rows[inverse.reshape(-1)]
+
+
+def read_sparse_rows(view_group, sample_indices, full_read_ratio=0.5):
+    """
+    Reads the needed rows of a sparse view stored in CSR format (see
+    create_view_dataset) without densifying it.
+
+    The indptr array is read entirely, then, as in read_rows, only the
+    data and indices slices of the contiguous runs of asked rows are read,
+    unless more than full_read_ratio of the rows are asked.
+
+    Parameters
+    ----------
+    view_group : h5py.Group
+        The group containing the data, indices and indptr datasets.
+    sample_indices : numpy.ndarray or int
+        The indices of the rows to extract, in any order, possibly repeated.
+    full_read_ratio : float
+        The ratio of asked rows above which the full view is read.
+
+    Returns
+    -------
+    A scipy.sparse.csr_matrix containing the asked rows.
+    """
+    shape = tuple(view_group.attrs["shape"])
+    indptr = view_group["indptr"][()]
+    sample_indices = np.asarray(sample_indices)
+    if sample_indices.ndim == 0:
+        sample_indices = sample_indices.reshape(1)
+    if sample_indices.shape[0] == 0:
+        return sparse.csr_matrix((0, shape[1]),
+                                 dtype=view_group["data"].dtype)
+    if sample_indices.shape[0] >= full_read_ratio * shape[0]:
+        full_view = sparse.csr_matrix((view_group["data"][()],
+                                       view_group["indices"][()], indptr),
+                                      shape=shape)
+        return full_view[sample_indices]
+    sample_indices = np.where(sample_indices < 0, sample_indices + shape[0],
+                              sample_indices)
+    unique_indices, inverse = np.unique(sample_indices, return_inverse=True)
+    run_starts, run_ends = get_contiguous_runs(unique_indices)
+    row_lengths = indptr[unique_indices + 1] - indptr[unique_indices]
+    new_indptr = np.concatenate(([0], np.cumsum(row_lengths)))
+    data = np.empty(new_indptr[-1], dtype=view_group["data"].dtype)
+    indices = np.empty(new_indptr[-1], dtype=view_group["indices"].dtype)
+    for run_start, run_end in zip(run_starts, run_ends):
+        first = indptr[unique_indices[run_start]]
+        last = indptr[unique_indices[run_end - 1] + 1]
+        data[new_indptr[run_start]:new_indptr[run_end]] = view_group[
+            "data"][first:last]
+        indices[new_indptr[run_start]:new_indptr[run_end]] = view_group[
+            "indices"][first:last]
+    subset = sparse.csr_matrix((data, indices, new_indptr),
+                               shape=(len(unique_indices), shape[1]))
+    return subset[inverse.reshape(-1)]
+
+
+def delete_HDF5(dataset):
+    """Used to delete the temporary dataset at the end of the benchmark"""
+    if dataset.is_temp:
+        dataset.rm()
 
 
 def get_samples_views_indices(dataset, samples_indices, view_indices, ):
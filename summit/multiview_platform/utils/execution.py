@@ -8,7 +8,7 @@ import numpy as np
 import sklearn
 
 from . import get_multiview_db as DB
-from ..utils.configuration import save_config
+from ..utils.configuration import save_config, get_the_args
 
 
 def parse_the_args(arguments):
@@ -26,6 +26,18 @@ def parse_the_args(arguments):
                                help='Path to the hdf5 dataset or database '
                                     'folder (default: %(default)s)',
                                default='../config_files/config.yml')
+    groupStandard.add_argument('--no-cache', action='store_true',
+                               dest='no_cache',
+                               help='Run all the experiments, without '
+                                    'reading nor filling the result cache')
+    groupStandard.add_argument('--csv_block_size', type=int, default=None,
+                               help='The number of rows of each view parsed '
+                                    'at once when converting a csv dataset, '
+                                    'overrides the configuration')
+    groupStandard.add_argument('--csv_n_jobs', type=int, default=None,
+                               help='The number of views parsed in parallel '
+                                    'when converting a csv dataset, '
+                                    'overrides the configuration')
     args = parser.parse_args(arguments)
     return args
 
@@ -104,7 +116,7 @@ def get_database_function(name, type_var):
     name : string
         Name of the database.
     type_var : string
-        type of dataset hdf5 or csv
+        type of dataset hdf5, npy or csv
 
     Returns
     -------
@@ -118,6 +130,15 @@ def get_database_function(name, type_var):
     return get_database
 
 
+def get_database_kwargs(args):
+    """Returns the options of the database extraction function of the
+    configured type of database, see get_database_function"""
+    if args["file_type"] == ".csv":
+        return {"block_size": args["csv_block_size"],
+                "n_jobs": args["csv_n_jobs"]}
+    return {}
+
+
 def init_log_file(name, views, cl_type, log, debug, label,
                   result_directory, args):
     r"""Used to init the directory where the preds will be stored and the log file.
@@ -156,7 +177,10 @@ def init_log_file(name, views, cl_type, log, debug, label,
     # result_directory = os.path.join(os.path.dirname(
     #     os.path.dirname(os.path.dirname(os.path.realpath(__file__)))),
     #                                 result_directory)
-    if debug:
+    resume = args.get("resume") if isinstance(args, dict) else None
+    if resume:
+        result_directory = resume
+    elif debug:
         result_directory = os.path.join(result_directory, name,
                                         "debug_started_" + time.strftime(
                                             "%Y_%m_%d-%H_%M_%S") + "_" + label)
@@ -166,19 +190,87 @@ def init_log_file(name, views, cl_type, log, debug, label,
                                             "%Y_%m_%d-%H_%M") + "_" + label)
     log_file_name = time.strftime("%Y_%m_%d-%H_%M") + "-" + ''.join(
         cl_type) + "-" + "_".join(views) + "-" + name + "-LOG.log"
-    if os.path.exists(result_directory):  # pragma: no cover
+    if os.path.exists(result_directory) and not resume:  # pragma: no cover
         raise NameError("The result dir already exists, wait 1 min and retry")
     log_file_path = os.path.join(result_directory, log_file_name)
-    os.makedirs(os.path.dirname(log_file_path))
-    logging.basicConfig(format='%(asctime)s %(levelname)s: %(message)s',
-                        filename=log_file_path, level=logging.INFO,
-                        filemode='w')
-    if log:
-        logging.getLogger().addHandler(logging.StreamHandler())
-    save_config(result_directory, args)
+    if not resume:
+        os.makedirs(os.path.dirname(log_file_path))
+    set_log_file(log_file_path, log=log, filemode='a' if resume else 'w')
+    if not resume:
+        save_config(result_directory, args)
     return result_directory
 
 
+def set_log_file(log_file_path, log=False, filemode='w'):
+    """
+    Sends the logs of the process to log_file_path, and to the console if
+    log, in place of the ones of the previous benchmark run by the process.
+    The handlers are set on the root logger instead of using
+    logging.basicConfig, that only configures it once per process, so each
+    dataset of a run gets its own log file.
+    """
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        if getattr(handler, "is_benchmark_handler", False):
+            root_logger.removeHandler(handler)
+            handler.close()
+    handlers = [logging.FileHandler(log_file_path, mode=filemode)]
+    if log:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(
+            logging.Formatter('%(asctime)s %(levelname)s: %(message)s'))
+        handler.is_benchmark_handler = True
+        root_logger.addHandler(handler)
+    root_logger.setLevel(logging.INFO)
+
+
+def get_resumed_args(result_directory):
+    r"""Used to reload the configuration of an interrupted benchmark, saved in
+    its result directory, in order to resume it.
+
+    Parameters
+    ----------
+    result_directory : string
+        Path to the result directory of the interrupted benchmark.
+
+    Returns
+    -------
+    args : dict
+        The configuration of the benchmark, restricted to the dataset of
+        result_directory.
+    """
+    config_path = os.path.join(result_directory, "config_file.yml")
+    if not os.path.isfile(config_path):
+        raise NameError("No benchmark to resume in " + result_directory)
+    args = get_the_args(config_path)
+    args["resume"] = result_directory
+    args["name"] = [os.path.basename(
+        os.path.dirname(os.path.normpath(result_directory)))]
+    return args
+
+
+def check_resumed_splits(splits, directories):
+    r"""Used to check that the splits of a resumed benchmark are the ones
+    saved by the interrupted run.
+
+    Parameters
+    ----------
+    splits : list of lists of numpy.ndarray
+        The splits, as returned by gen_splits.
+    directories : list of strings
+        Paths to each statistical iterations result directory.
+    """
+    for (train_indices, _), directory in zip(splits, directories):
+        file_name = os.path.join(directory, "train_indices.csv")
+        if os.path.isfile(file_name):
+            saved_indices = np.loadtxt(file_name, delimiter=",",
+                                       ndmin=1).astype(int)
+            if not np.array_equal(saved_indices, train_indices):
+                raise ValueError("The splits of the resumed benchmark differ "
+                                 "from the ones saved in " + directory)
+
+
 def gen_splits(labels, split_ratio, stats_iter_random_states):
     r"""Used to _gen the train/test splits using one or multiple random states.
 
@@ -334,7 +426,10 @@ def find_dataset_names(path, type, names):
     available_file_names = [file_name.strip().split(".")[0]
                             for file_name in
                             os.listdir(path)
-                            if file_name.endswith(type)]
+                            if file_name.endswith(type)
+                            and (type != ".npy"
+                                 or os.path.isdir(os.path.join(path,
+                                                               file_name)))]
     if names == ["all"]:
         return path, available_file_names
     elif isinstance(names, str):
@@ -363,7 +458,8 @@ def gen_argument_dictionaries(labels_dictionary, directories,
                               stats_iter_random_states, metrics,
                               argument_dictionaries,
                               benchmark, views,
-                              views_indices, ):  # pragma: no cover
+                              views_indices,
+                              result_cache=None):  # pragma: no cover
     r"""Used to generate a dictionary for each benchmark.
 
     One for each label combination (if multiclass), for each statistical iteration, generates an dictionary with
@@ -403,6 +499,8 @@ def gen_argument_dictionaries(labels_dictionary, directories,
         List of the names of the used views.
     views_indices : list of ints
         List of indices (according to the dataset) of the used views.
+    result_cache : ResultCache or None
+        The cache of the results of the experiments, if any.
 
     Returns
     -------
@@ -425,6 +523,7 @@ def gen_argument_dictionaries(labels_dictionary, directories,
             "benchmark": benchmark,
             "views": views,
             "views_indices": views_indices,
-            "flag": iter_index}
+            "flag": iter_index,
+            "result_cache": result_cache}
         benchmark_argument_dictionaries.append(benchmark_argument_dictionary)
     return benchmark_argument_dictionaries
@@ -1,9 +1,13 @@
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 import h5py
 import numpy as np
+import pandas as pd
 
-from .dataset import RAMDataset, HDF5Dataset
+from .dataset import RAMDataset, HDF5Dataset, NPYDataset, \
+    get_chunk_rows, get_view_layout, TUNED_LAYOUT
 from .organization import secure_file_path
 
 # Author-Info
@@ -147,38 +151,42 @@ def get_classic_db_hdf5(views, path_f, name_DB, nb_class, asked_labels_names,
     return dataset, labels_dictionary, dataset_name
 
 
+def get_classic_db_npy(views, path_f, name_DB, nb_class, asked_labels_names,
+                       random_state, full=False, add_noise=False,
+                       noise_std=0.15,
+                       path_for_new="../data/"):
+    """Used to load a memory-mapped .npy directory database"""
+    if add_noise:
+        raise DatasetError("Gaussian noise is only available for HDF5 "
+                           "datasets")
+    dataset = NPYDataset(npy_dir=os.path.join(path_f, name_DB + ".npy"))
+    if full:
+        dataset_name = name_DB
+        labels_dictionary = dict((label_index, label_name)
+                                 for label_index, label_name
+                                 in enumerate(dataset.get_label_names()))
+    else:
+        labels_dictionary = dataset.select_views_and_labels(nb_labels=nb_class,
+                                                            selected_label_names=asked_labels_names,
+                                                            view_names=views,
+                                                            random_state=random_state,
+                                                            path_for_new=path_for_new)
+        dataset_name = dataset.get_name()
+    return dataset, labels_dictionary, dataset_name
+
+
 def get_classic_db_csv(views, pathF, nameDB, NB_CLASS, askedLabelsNames,
                        random_state, full=False, add_noise=False,
                        noise_std=0.15,
-                       delimiter=",", path_for_new="../data/"):
-    # TODO : Update this one
-    labels_names = np.genfromtxt(pathF + nameDB + "-labels-names.csv",
-                                 dtype='str', delimiter=delimiter)
-    datasetFile = h5py.File(pathF + nameDB + ".hdf5", "w")
-    labels = np.genfromtxt(pathF + nameDB + "-labels.csv", delimiter=delimiter)
-    labelsDset = datasetFile.create_dataset(
-        "Labels", labels.shape, data=labels)
-    labelsDset.attrs["names"] = [labelName.encode() for labelName in
-                                 labels_names]
-    viewFileNames = [viewFileName for viewFileName in
-                     os.listdir(pathF + "Views/")]
-    for viewIndex, viewFileName in enumerate(os.listdir(pathF + "Views/")):
-        viewFile = pathF + "Views/" + viewFileName
-        if viewFileName[-6:] != "-s.csv":
-            viewMatrix = np.genfromtxt(viewFile, delimiter=delimiter)
-            viewDset = datasetFile.create_dataset("View" + str(viewIndex),
-                                                  viewMatrix.shape,
-                                                  data=viewMatrix)
-            del viewMatrix
-            viewDset.attrs["name"] = viewFileName[:-4]
-            viewDset.attrs["sparse"] = False
-        else:
-            pass
-    metaDataGrp = datasetFile.create_group("Metadata")
-    metaDataGrp.attrs["nbView"] = len(viewFileNames)
-    metaDataGrp.attrs["nbClass"] = len(labels_names)
-    metaDataGrp.attrs["datasetLength"] = len(labels)
-    datasetFile.close()
+                       delimiter=",", path_for_new="../data/",
+                       block_size=10000, n_jobs=1):
+    """
+    Used to load a csv database : it is converted in an HDF5 file by
+    csv_to_hdf5, that is only regenerated if the csv files have changed, and
+    loaded as an HDF5 database.
+    """
+    csv_to_hdf5(pathF, nameDB, delimiter=delimiter, block_size=block_size,
+                n_jobs=n_jobs)
     datasetFile, labelsDictionary, dataset_name = get_classic_db_hdf5(views,
                                                                       pathF,
                                                                       nameDB,
@@ -190,6 +198,134 @@ def get_classic_db_csv(views, pathF, nameDB, NB_CLASS, askedLabelsNames,
 
     return datasetFile, labelsDictionary, dataset_name
 
+
+def get_csv_fingerprint(file_paths):
+    """
+    Summarizes the size and modification time of the source csv files, to
+    know if the HDF5 file converted from them is up to date.
+    """
+    return json.dumps([[os.path.basename(file_path),
+                        os.stat(file_path).st_size,
+                        os.stat(file_path).st_mtime_ns]
+                       for file_path in file_paths])
+
+
+def stream_csv_view(csv_path, hdf5_file, view_key, delimiter=",",
+                    block_size=10000):
+    """
+    Parses a view csv file by blocks of block_size rows, appended to a
+    resizable, chunked and compressed HDF5 dataset, so only one block is in
+    memory at a time.
+
+    Parameters
+    ----------
+    csv_path : str
+        The path of the csv file, with one sample on each line.
+    hdf5_file : h5py.File
+        The file in which the view is written.
+    view_key : str
+        The name of the view dataset ("View0", "View1", ...).
+    delimiter : str
+        The delimiter of the csv file.
+    block_size : int
+        The number of rows parsed at once.
+
+    Returns
+    -------
+    The created h5py.Dataset.
+    """
+    view_dataset = None
+    for block in pd.read_csv(csv_path, header=None, sep=delimiter,
+                             chunksize=block_size, dtype=np.float64):
+        block = block.to_numpy()
+        if view_dataset is None:
+            nb_features = block.shape[1]
+            chunk_rows = get_chunk_rows((block_size, nb_features),
+                                        block.itemsize)
+            view_dataset = hdf5_file.create_dataset(
+                view_key, shape=(0, nb_features), maxshape=(None, nb_features),
+                **get_view_layout((chunk_rows, nb_features), block.dtype,
+                                  **dict(TUNED_LAYOUT, chunk_rows=chunk_rows)))
+        nb_rows = view_dataset.shape[0]
+        view_dataset.resize(nb_rows + block.shape[0], axis=0)
+        view_dataset[nb_rows:] = block
+    return view_dataset
+
+
+def csv_to_hdf5(path_f, name_DB, delimiter=",", block_size=10000, n_jobs=1):
+    """
+    Converts a csv database in an HDF5 file, "<name_DB>.hdf5" in path_f.
+
+    The database is made of "<name_DB>-labels-names.csv",
+    "<name_DB>-labels.csv" and a "Views" directory with a csv file per view.
+    The views are streamed by blocks of rows (see stream_csv_view), and
+    several views can be parsed in parallel threads. The size and
+    modification time of the source files are saved in the metadata of the
+    HDF5 file, and if they did not change, the existing file is kept.
+
+    Parameters
+    ----------
+    path_f : str
+        The path of the database directory.
+    name_DB : str
+        The name of the database.
+    delimiter : str
+        The delimiter of the csv files.
+    block_size : int
+        The number of rows parsed at once for each view.
+    n_jobs : int
+        The number of views parsed in parallel.
+
+    Returns
+    -------
+    The path of the HDF5 file.
+    """
+    hdf5_path = os.path.join(path_f, name_DB + ".hdf5")
+    labels_names_path = os.path.join(path_f, name_DB + "-labels-names.csv")
+    labels_path = os.path.join(path_f, name_DB + "-labels.csv")
+    views_path = os.path.join(path_f, "Views")
+    view_file_names = sorted(view_file_name for view_file_name
+                             in os.listdir(views_path)
+                             if view_file_name[-6:] != "-s.csv")
+    view_paths = [os.path.join(views_path, view_file_name)
+                  for view_file_name in view_file_names]
+    fingerprint = get_csv_fingerprint([labels_names_path, labels_path]
+                                      + view_paths)
+    if os.path.isfile(hdf5_path):
+        with h5py.File(hdf5_path, "r") as hdf5_file:
+            if "Metadata" in hdf5_file and hdf5_file["Metadata"].attrs.get(
+                    "csv_fingerprint") == fingerprint:
+                return hdf5_path
+    labels_names = np.genfromtxt(labels_names_path, dtype='str',
+                                 delimiter=delimiter, ndmin=1)
+    labels = pd.read_csv(labels_path, header=None,
+                         sep=delimiter).to_numpy().reshape(-1)
+    temp_path = hdf5_path + ".tmp"
+    with h5py.File(temp_path, "w") as hdf5_file:
+        labels_dataset = hdf5_file.create_dataset("Labels", labels.shape,
+                                                  data=labels)
+        labels_dataset.attrs["names"] = [label_name.encode()
+                                         for label_name in labels_names]
+        view_keys = ["View" + str(view_index)
+                     for view_index in range(len(view_paths))]
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            view_datasets = list(executor.map(
+                lambda view: stream_csv_view(view[0], hdf5_file, view[1],
+                                             delimiter=delimiter,
+                                             block_size=block_size),
+                zip(view_paths, view_keys)))
+        for view_dataset, view_file_name in zip(view_datasets,
+                                                view_file_names):
+            view_dataset.attrs["name"] = view_file_name[:-4]
+            view_dataset.attrs["sparse"] = False
+        meta_data_grp = hdf5_file.create_group("Metadata")
+        meta_data_grp.attrs["nbView"] = len(view_paths)
+        meta_data_grp.attrs["nbClass"] = len(labels_names)
+        meta_data_grp.attrs["datasetLength"] = len(labels)
+        meta_data_grp.attrs["csv_fingerprint"] = fingerprint
+    os.replace(temp_path, hdf5_path)
+    return hdf5_path
+
 #
 # def get_classes(labels):
 #     labels_set = set(list(labels))
@@ -11,23 +11,39 @@ from sklearn.base import clone, BaseEstimator
 from .multiclass import MultiClassWrapper
 from .organization import secure_file_path
 from .base import get_metric
+import functools
+import json
+import logging
+import os
 import traceback
 from abc import abstractmethod
 
 import numpy as np
 import yaml
-from scipy.stats import randint, uniform
+from joblib import Parallel, delayed, effective_n_jobs
+from scipy.stats import randint, uniform, t
 from sklearn.base import clone, BaseEstimator
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.metrics import check_scoring
 from sklearn.model_selection import RandomizedSearchCV, GridSearchCV, \
-    ParameterGrid, ParameterSampler
+    HalvingRandomSearchCV, ParameterGrid, ParameterSampler, check_cv
+from sklearn.utils import check_random_state, resample
 
 from .base import get_metric
+from .dataset import get_shared_handle, materialize_folds
 from .multiclass import MultiClassWrapper
 from .organization import secure_file_path
 
 
 class HPSearch:
 
+    partial_report_file_name = None
+    consistent_folds = False
+    pruning = None
+    pruning_warmup = 1
+    pruning_confidence = 0.95
+    fold_cache_size = 0
+
     def translate_param_distribs(self, param_distribs):
         translated_params = {}
         if param_distribs is None:
@@ -54,6 +70,44 @@ class HPSearch:
         else:
             return metric
 
+    def init_partial_report(self):
+        if self.partial_report_file_name is not None:
+            secure_file_path(self.partial_report_file_name)
+            if os.path.isfile(self.partial_report_file_name):
+                os.remove(self.partial_report_file_name)
+
+    def record_partial_score(self, params, score):
+        """
+        Appends the score of a candidate, or of one of its folds, to the
+        partial report, so the candidates evaluated before an interruption
+        are kept.
+        """
+        if self.partial_report_file_name is not None:
+            with open(self.partial_report_file_name, "a") as partial_report:
+                partial_report.write(json.dumps(
+                    {"params": format_params(params), "score": float(score)},
+                    sort_keys=True, default=str) + "\n")
+
+    def fit_monoview(self, search_class, X, y=None, groups=None,
+                     **fit_params):
+        self.init_partial_report()
+        cv = self.cv
+        scoring = self.scoring
+        if self.consistent_folds:
+            # The candidates are evaluated in several rounds, that must use
+            # the same folds, the shuffled ones are drawn once
+            self.cv = list(check_cv(cv, y, classifier=True).split(X, y,
+                                                                  groups))
+        if self.partial_report_file_name is not None:
+            self.scoring = PartialReportScorer(check_scoring(self.estimator,
+                                                             scoring), self)
+        try:
+            return search_class.fit(self, X, y=y, groups=groups,
+                                    **fit_params)
+        finally:
+            self.cv = cv
+            self.scoring = scoring
+
     def fit_multiview(self, X, y, groups=None, **fit_params):
         n_splits = self.cv.get_n_splits(self.available_indices,
                                         y[self.available_indices])
@@ -61,52 +115,37 @@ class HPSearch:
             self.cv.split(self.available_indices, y[self.available_indices]))
         self.get_candidate_params(X)
         base_estimator = clone(self.estimator)
-        results = {}
         self.cv_results_ = dict(("param_" + param_name, []) for param_name in
                                 self.candidate_params[0].keys())
         self.cv_results_["mean_test_score"] = []
         self.cv_results_["params"] = []
-        n_failed = 0
+        if self.pruning is not None:
+            self.cv_results_["pruned"] = []
+            self.cv_results_["n_folds"] = []
+        self.best_score_ = None
+        self.fold_scores_history_ = []
         self.tracebacks_params = []
-        for candidate_param_idx, candidate_param in enumerate(
-                self.candidate_params):
-            test_scores = np.zeros(n_splits) + 1000
-            try:
-                for fold_idx, (train_indices,
-                               test_indices) in enumerate(folds):
-                    current_estimator = clone(base_estimator)
-                    current_estimator.set_params(**candidate_param)
-                    current_estimator.fit(X, y,
-                                          train_indices=self.available_indices[
-                                              train_indices],
-                                          view_indices=self.view_indices)
-                    test_prediction = current_estimator.predict(
-                        X,
-                        self.available_indices[test_indices],
-                        view_indices=self.view_indices)
-                    test_score = self.scoring._score_func(
-                        y[self.available_indices[test_indices]],
-                        test_prediction,
-                        **self.scoring._kwargs)
-                    test_scores[fold_idx] = test_score
-                self.cv_results_['params'].append(
-                    current_estimator.get_params())
-                cross_validation_score = np.mean(test_scores)
-                self.cv_results_["mean_test_score"].append(
-                    cross_validation_score)
-                results[candidate_param_idx] = cross_validation_score
-                if cross_validation_score >= max(results.values()):
-                    self.best_params_ = self.candidate_params[
-                        candidate_param_idx]
-                    self.best_score_ = cross_validation_score
-            except BaseException:
-                if self.track_tracebacks:
-                    n_failed += 1
-                    self.tracebacks.append(traceback.format_exc())
-                    self.tracebacks_params.append(candidate_param)
-                else:
-                    raise
-        if n_failed == self.n_iter:
+        self.init_partial_report()
+        # The candidates and folds are evaluated by the workers in the serial
+        # order, the datasets in RAM being shared instead of sent to each one
+        if effective_n_jobs(self.n_jobs) > 1:
+            shared_X, is_shared = get_shared_handle(X)
+        else:
+            shared_X, is_shared = X, False
+        fold_datasets = self.get_fold_datasets(shared_X, folds)
+        try:
+            self.run_multiview_search(functools.partial(
+                self.evaluate_multiview_candidates,
+                base_estimator=base_estimator, y=y,
+                folds=[(fold_dataset, self.available_indices[train_indices],
+                        self.available_indices[test_indices])
+                       for fold_dataset, (train_indices, test_indices)
+                       in zip(fold_datasets, folds)]))
+        finally:
+            self.release_fold_datasets(fold_datasets)
+            if is_shared:
+                shared_X.rm()
+        if not self.cv_results_["params"]:
             raise ValueError(
                 'No fits were performed. All HP combination returned errors \n\n' + '\n'.join(
                     self.tracebacks))
@@ -119,6 +158,296 @@ class HPSearch:
         self.n_splits_ = n_splits
         return self
 
+    def run_multiview_search(self, evaluate_candidates):
+        """
+        Evaluates the candidates of a multiview search. evaluate_candidates
+        is called with a list of candidates, and returns their scores, that
+        the sequential searches use to choose the next ones.
+        """
+        evaluate_candidates(self.candidate_params)
+
+    def get_fold_datasets(self, X, folds):
+        """
+        Returns the dataset on which each fold is evaluated : X, or if
+        fold_cache_size is set, a FoldDataset holding the views of the fold
+        in memory, within fold_cache_size bytes for all the folds.
+        """
+        if not self.fold_cache_size:
+            return [X for _ in folds]
+        return materialize_folds(
+            X, [(self.available_indices[train_indices],
+                 self.available_indices[test_indices])
+                for train_indices, test_indices in folds],
+            view_indices=self.view_indices, max_bytes=self.fold_cache_size)
+
+    def release_fold_datasets(self, fold_datasets):
+        """Frees the fold blocks once the search is over"""
+        if not self.fold_cache_size:
+            return
+        logging.debug("Debug:\t Fold cache : {} blocks, {:.1f}MB, served {} of "
+                      "{} extractions".format(
+                          sum(len(fold_dataset.blocks)
+                              for fold_dataset in fold_datasets),
+                          sum(fold_dataset.nb_bytes for fold_dataset
+                              in fold_datasets) / 1024 / 1024,
+                          sum(fold_dataset.hits
+                              for fold_dataset in fold_datasets),
+                          sum(fold_dataset.hits + fold_dataset.misses
+                              for fold_dataset in fold_datasets)))
+        for fold_dataset in fold_datasets:
+            fold_dataset.clear()
+
+    def evaluate_multiview_candidates(self, candidate_params, base_estimator,
+                                      y, folds):
+        """
+        Cross-validates the candidates, records their results, and returns
+        their mean test scores, None for the candidates that failed.
+
+        Parameters
+        ----------
+        folds : list of (dataset, train_indices, test_indices)
+            The dataset of each fold (see get_fold_datasets), and the indices
+            of its samples.
+        """
+        if self.pruning is not None:
+            return self.race_multiview_candidates(candidate_params,
+                                                  base_estimator, y, folds)
+        fold_outcomes = Parallel(n_jobs=self.n_jobs, return_as="generator")(
+            delayed(evaluate_fold)(
+                base_estimator, candidate_param, fold_dataset, y,
+                train_indices, test_indices, self.view_indices,
+                self.scoring, self.track_tracebacks)
+            for candidate_param in candidate_params
+            for fold_dataset, train_indices, test_indices in folds)
+        scores = []
+        for candidate_param in candidate_params:
+            outcomes = [next(fold_outcomes) for _ in folds]
+            errors = [error for _, _, error in outcomes if error is not None]
+            if errors:
+                self.tracebacks.append(errors[0])
+                self.tracebacks_params.append(candidate_param)
+                scores.append(None)
+                continue
+            cross_validation_score = np.mean([score for score, _, _
+                                              in outcomes])
+            self.cv_results_['params'].append(outcomes[-1][1])
+            self.cv_results_["mean_test_score"].append(cross_validation_score)
+            self.record_partial_score(candidate_param, cross_validation_score)
+            if self.best_score_ is None or \
+                    cross_validation_score >= self.best_score_:
+                self.best_params_ = candidate_param
+                self.best_score_ = cross_validation_score
+            scores.append(cross_validation_score)
+        return scores
+
+    def race_multiview_candidates(self, candidate_params, base_estimator, y,
+                                  folds):
+        """
+        Evaluates the candidates fold after fold, and stops evaluating the
+        ones that can't be the best after each fold, see get_pruned. The
+        pruned candidates are recorded in cv_results_ with the mean score of
+        their evaluated folds, but are not chosen as best_params_.
+        """
+        if self.pruning not in ["median", "ttest"]:
+            raise ValueError('The pruning rule must be None, "median" or '
+                             '"ttest", not "{}"'.format(self.pruning))
+        fold_scores = [[] for _ in candidate_params]
+        fitted_params = [None for _ in candidate_params]
+        errors = [None for _ in candidate_params]
+        pruned = [False for _ in candidate_params]
+        racing = list(range(len(candidate_params)))
+        for fold_idx, (fold_dataset, train_indices,
+                       test_indices) in enumerate(folds):
+            outcomes = Parallel(n_jobs=self.n_jobs)(
+                delayed(evaluate_fold)(
+                    base_estimator, candidate_params[candidate_idx],
+                    fold_dataset, y, train_indices, test_indices,
+                    self.view_indices, self.scoring, self.track_tracebacks)
+                for candidate_idx in racing)
+            for candidate_idx, (score, params, error) in zip(racing,
+                                                             outcomes):
+                if error is not None:
+                    errors[candidate_idx] = error
+                else:
+                    fold_scores[candidate_idx].append(score)
+                    fitted_params[candidate_idx] = params
+            racing = [candidate_idx for candidate_idx in racing
+                      if errors[candidate_idx] is None]
+            if self.pruning_warmup <= fold_idx + 1 < len(folds):
+                for candidate_idx in self.get_pruned(racing, fold_scores):
+                    pruned[candidate_idx] = True
+                racing = [candidate_idx for candidate_idx in racing
+                          if not pruned[candidate_idx]]
+        scores = []
+        for candidate_idx, candidate_param in enumerate(candidate_params):
+            if errors[candidate_idx] is not None:
+                self.tracebacks.append(errors[candidate_idx])
+                self.tracebacks_params.append(candidate_param)
+                scores.append(None)
+                continue
+            cross_validation_score = np.mean(fold_scores[candidate_idx])
+            self.cv_results_['params'].append(fitted_params[candidate_idx])
+            self.cv_results_["mean_test_score"].append(cross_validation_score)
+            self.cv_results_["pruned"].append(pruned[candidate_idx])
+            self.cv_results_["n_folds"].append(len(fold_scores[candidate_idx]))
+            self.fold_scores_history_.append(fold_scores[candidate_idx])
+            if not pruned[candidate_idx]:
+                self.record_partial_score(candidate_param,
+                                          cross_validation_score)
+                if self.best_score_ is None or \
+                        cross_validation_score >= self.best_score_:
+                    self.best_params_ = candidate_param
+                    self.best_score_ = cross_validation_score
+            scores.append(cross_validation_score)
+        return scores
+
+    def get_pruned(self, racing, fold_scores):
+        """
+        Returns the racing candidates to stop after their n-th fold :
+            - with the "median" rule, the ones whose mean score is below the
+              median of the mean scores of the other candidates on their n
+              first folds, including the previously evaluated ones,
+            - with the "ttest" rule, the ones whose optimistic bound, the
+              upper limit of the pruning_confidence one-sided Student
+              interval of their mean score, is below the score of the
+              incumbent, the best previous candidate or the best racing one.
+              It needs two folds to estimate the variance of the scores.
+        """
+        if not racing:
+            return []
+        n_folds = len(fold_scores[racing[0]])
+        means = dict((candidate_idx, np.mean(fold_scores[candidate_idx]))
+                     for candidate_idx in racing)
+        if self.pruning == "median":
+            previous_means = [np.mean(scores[:n_folds]) for scores
+                              in self.fold_scores_history_
+                              if len(scores) >= n_folds]
+            pruned = []
+            for candidate_idx in racing:
+                other_means = [mean for other_idx, mean in means.items()
+                               if other_idx != candidate_idx] + previous_means
+                if len(other_means) >= 2 and \
+                        means[candidate_idx] < np.median(other_means):
+                    pruned.append(candidate_idx)
+            return pruned
+        if n_folds < 2:
+            return []
+        incumbent = max(means.values())
+        if self.best_score_ is not None:
+            incumbent = max(incumbent, self.best_score_)
+        quantile = t.ppf(self.pruning_confidence, n_folds - 1)
+        return [candidate_idx for candidate_idx in racing
+                if means[candidate_idx] + quantile * np.std(
+                    fold_scores[candidate_idx], ddof=1) / np.sqrt(n_folds)
+                < incumbent]
+
+    def fit_multiview_halving(self, X, y, groups=None, **fit_params):
+        """
+        Successive halving : all the candidates are evaluated with
+        min_resources training samples in each fold, the best 1/factor of
+        them are kept, and evaluated with factor times more samples, until
+        a single rung remains or the training sets are exhausted.
+        """
+        folds = list(
+            self.cv.split(self.available_indices, y[self.available_indices]))
+        self.get_candidate_params(X)
+        base_estimator = clone(self.estimator)
+        random_state = check_random_state(self.random_state)
+        fold_seeds = random_state.randint(np.iinfo(np.int32).max,
+                                          size=len(folds))
+        max_resources = min(len(train_indices)
+                            for train_indices, _ in folds)
+        min_resources = self.get_min_resources(y, len(folds), max_resources)
+        self.n_iterations_ = 1 + min(
+            int(np.log(len(self.candidate_params)) // np.log(self.factor)),
+            int(np.log(max_resources / min_resources) // np.log(self.factor)))
+        self.cv_results_ = dict(("param_" + param_name, []) for param_name in
+                                self.candidate_params[0].keys())
+        for key in ["mean_test_score", "params", "rung", "n_resources"]:
+            self.cv_results_[key] = []
+        self.tracebacks_params = []
+        self.init_partial_report()
+        if effective_n_jobs(self.n_jobs) > 1:
+            shared_X, is_shared = get_shared_handle(X)
+        else:
+            shared_X, is_shared = X, False
+        candidate_indices = list(range(len(self.candidate_params)))
+        fold_datasets = self.get_fold_datasets(shared_X, folds)
+        try:
+            for rung in range(self.n_iterations_):
+                n_resources = min(min_resources * self.factor ** rung,
+                                  max_resources)
+                fold_indices = [
+                    (fold_dataset, self.available_indices[subsample(
+                        train_indices, n_resources,
+                        y[self.available_indices[train_indices]], seed)],
+                     self.available_indices[test_indices])
+                    for fold_dataset, (train_indices, test_indices), seed
+                    in zip(fold_datasets, folds, fold_seeds)]
+                fold_outcomes = Parallel(n_jobs=self.n_jobs,
+                                         return_as="generator")(
+                    delayed(evaluate_fold)(
+                        base_estimator, self.candidate_params[candidate_index],
+                        fold_dataset, y, train_indices, test_indices,
+                        self.view_indices, self.scoring,
+                        self.track_tracebacks)
+                    for candidate_index in candidate_indices
+                    for fold_dataset, train_indices, test_indices
+                    in fold_indices)
+                rung_scores = {}
+                for candidate_index in candidate_indices:
+                    candidate_param = self.candidate_params[candidate_index]
+                    outcomes = [next(fold_outcomes) for _ in folds]
+                    errors = [error for _, _, error in outcomes
+                              if error is not None]
+                    if errors:
+                        self.tracebacks.append(errors[0])
+                        self.tracebacks_params.append(candidate_param)
+                        continue
+                    score = np.mean([score for score, _, _ in outcomes])
+                    self.cv_results_["params"].append(outcomes[-1][1])
+                    self.cv_results_["mean_test_score"].append(score)
+                    self.cv_results_["rung"].append(rung)
+                    self.cv_results_["n_resources"].append(n_resources)
+                    self.record_partial_score(candidate_param, score)
+                    rung_scores[candidate_index] = score
+                if not rung_scores:
+                    raise ValueError(
+                        'No fits were performed. All HP combination returned '
+                        'errors \n\n' + '\n'.join(self.tracebacks))
+                # The sort is stable, the first candidate wins the ties
+                ranked = sorted(rung_scores, key=lambda index:
+                                -rung_scores[index])
+                self.best_params_ = self.candidate_params[ranked[0]]
+                self.best_score_ = rung_scores[ranked[0]]
+                candidate_indices = sorted(ranked[:int(np.ceil(
+                    len(candidate_indices) / self.factor))])
+        finally:
+            self.release_fold_datasets(fold_datasets)
+            if is_shared:
+                shared_X.rm()
+        self.cv_results_["mean_test_score"] = np.array(
+            self.cv_results_["mean_test_score"])
+        if self.refit:
+            self.best_estimator_ = clone(base_estimator).set_params(
+                **self.best_params_)
+            self.best_estimator_.fit(X, y, **fit_params)
+        self.n_splits_ = len(folds)
+        return self
+
+    def get_min_resources(self, y, n_splits, max_resources):
+        """The number of training samples of the first rung, as in
+        sklearn's HalvingRandomSearchCV"""
+        if self.min_resources == "smallest":
+            min_resources = n_splits * 2 * len(
+                np.unique(y[self.available_indices]))
+        elif self.min_resources == "exhaust":
+            min_resources = max_resources // self.factor ** int(
+                np.log(len(self.candidate_params)) // np.log(self.factor))
+        else:
+            min_resources = self.min_resources
+        return int(min(max(min_resources, 1), max_resources))
+
     @abstractmethod
     def get_candidate_params(self, X):  # pragma: no cover
         raise NotImplementedError
@@ -130,16 +459,37 @@ class HPSearch:
         return best_params
 
     def gen_report(self, output_file_name):
-        scores_array = self.cv_results_['mean_test_score']
-        sorted_indices = np.argsort(-scores_array)
-        tested_params = [self.cv_results_["params"][score_index]
-                         for score_index in sorted_indices]
-        scores_array = scores_array[sorted_indices]
+        scores_array = np.asarray(self.cv_results_['mean_test_score'])
+        if "rung" in self.cv_results_:
+            # Each candidate is reported with the score of the last rung it
+            # reached, the scores of different rungs are not comparable.
+            rungs = np.asarray(self.cv_results_["rung"])
+            sorted_indices = sorted(get_last_rungs(self.cv_results_),
+                                    key=lambda index: (-rungs[index],
+                                                       -scores_array[index]))
+        elif "pruned" in self.cv_results_:
+            # The pruned candidates are reported after the complete ones
+            rungs = None
+            sorted_indices = sorted(
+                range(len(scores_array)),
+                key=lambda index: (self.cv_results_["pruned"][index],
+                                   -scores_array[index]))
+        else:
+            rungs = None
+            sorted_indices = np.argsort(-scores_array)
         output_string = ""
-        for parameters, score in zip(tested_params, scores_array):
-            formatted_params = format_params(parameters)
-            output_string += "\n{}\n\t\t{}".format(yaml.dump(formatted_params),
-                                                   score)
+        for score_index in sorted_indices:
+            formatted_params = format_params(
+                self.cv_results_["params"][score_index])
+            output_string += "\n{}\n\t\t{}".format(
+                yaml.dump(formatted_params), scores_array[score_index])
+            if rungs is not None:
+                output_string += " (rung {}/{})".format(
+                    rungs[score_index] + 1, self.n_iterations_)
+            if "pruned" in self.cv_results_ and \
+                    self.cv_results_["pruned"][score_index]:
+                output_string += " (pruned after {}/{} folds)".format(
+                    self.cv_results_["n_folds"][score_index], self.n_splits_)
         if self.tracebacks:
             output_string += "Failed : \n\n\n"
             for traceback, params in zip(self.tracebacks,
@@ -148,6 +498,9 @@ class HPSearch:
         secure_file_path(output_file_name + "hps_report.txt")
         with open(output_file_name + "hps_report.txt", "w") as output_file:
             output_file.write(output_string)
+        if self.partial_report_file_name is not None and os.path.isfile(
+                self.partial_report_file_name):
+            os.remove(self.partial_report_file_name)
 
 
 class Random(RandomizedSearchCV, HPSearch):
@@ -156,7 +509,10 @@ class Random(RandomizedSearchCV, HPSearch):
                  refit=False, n_jobs=1, scoring=None, cv=None,
                  random_state=None, learning_indices=None, view_indices=None,
                  framework="monoview",
-                 equivalent_draws=True, track_tracebacks=True):
+                 equivalent_draws=True, track_tracebacks=True,
+                 partial_report_file_name=None, pruning=None,
+                 pruning_warmup=1, pruning_confidence=0.95,
+                 fold_cache_size=0):
         param_distributions = self.get_param_distribs(estimator, param_distributions)
 
 
@@ -172,6 +528,11 @@ class Random(RandomizedSearchCV, HPSearch):
         self.equivalent_draws = equivalent_draws
         self.track_tracebacks = track_tracebacks
         self.tracebacks = []
+        self.partial_report_file_name = partial_report_file_name
+        self.pruning = pruning
+        self.pruning_warmup = pruning_warmup
+        self.pruning_confidence = pruning_confidence
+        self.fold_cache_size = fold_cache_size
 
     def translate_uniform(self, args):
         return CustomUniform(**args)
@@ -192,8 +553,8 @@ class Random(RandomizedSearchCV, HPSearch):
 
     def fit(self, X, y=None, groups=None, **fit_params):  # pragma: no cover
         if self.framework == "monoview":
-            return RandomizedSearchCV.fit(self, X, y=y, groups=groups,
-                                          **fit_params)
+            return HPSearch.fit_monoview(self, RandomizedSearchCV, X, y=y,
+                                         groups=groups, **fit_params)
 
         elif self.framework == "multiview":
             return HPSearch.fit_multiview(self, X, y=y, groups=groups,
@@ -213,7 +574,8 @@ class Grid(GridSearchCV, HPSearch):
     def __init__(self, estimator, param_grid={}, refit=False, n_jobs=1,
                  scoring=None, cv=None,
                  learning_indices=None, view_indices=None, framework="monoview",
-                 random_state=None, track_tracebacks=True):
+                 random_state=None, track_tracebacks=True,
+                 partial_report_file_name=None, fold_cache_size=0):
         scoring = HPSearch.get_scoring(self, scoring)
         GridSearchCV.__init__(self, estimator, param_grid, scoring=scoring,
                               n_jobs=n_jobs, iid='deprecated', refit=refit,
@@ -223,11 +585,13 @@ class Grid(GridSearchCV, HPSearch):
         self.view_indices = view_indices
         self.track_tracebacks = track_tracebacks
         self.tracebacks = []
+        self.partial_report_file_name = partial_report_file_name
+        self.fold_cache_size = fold_cache_size
 
     def fit(self, X, y=None, groups=None, **fit_params):
         if self.framework == "monoview":
-            return GridSearchCV.fit(self, X, y=y, groups=groups,
-                                    **fit_params)
+            return HPSearch.fit_monoview(self, GridSearchCV, X, y=y,
+                                         groups=groups, **fit_params)
         elif self.framework == "multiview":
             return HPSearch.fit_multiview(self, X, y=y, groups=groups,
                                           **fit_params)
@@ -236,6 +600,422 @@ class Grid(GridSearchCV, HPSearch):
         self.candidate_params = list(ParameterGrid(self.param_grid))
         self.n_iter = len(self.candidate_params)
 
+class Halving(HalvingRandomSearchCV, HPSearch):
+    """
+    Successive halving random search : n_iter candidates are drawn as in
+    Random, evaluated on min_resources training samples, and the best
+    1/factor of them are evaluated again on factor times more samples, until
+    one rung remains or the training set is exhausted. hps_report.txt shows
+    the rung reached by each candidate.
+
+    min_resources can be "smallest", "exhaust" or a number of samples, see
+    sklearn.model_selection.HalvingRandomSearchCV.
+    """
+
+    consistent_folds = True
+
+    def __init__(self, estimator, param_distributions=None, n_iter=10,
+                 factor=3, min_resources="smallest", refit=False, n_jobs=1,
+                 scoring=None, cv=None, random_state=None,
+                 learning_indices=None, view_indices=None,
+                 framework="monoview", equivalent_draws=True,
+                 track_tracebacks=True, partial_report_file_name=None,
+                 fold_cache_size=0):
+        param_distributions = Random.get_param_distribs(
+            self, estimator, param_distributions)
+        scoring = HPSearch.get_scoring(self, scoring)
+        HalvingRandomSearchCV.__init__(self, estimator, param_distributions,
+                                       n_candidates=n_iter, factor=factor,
+                                       min_resources=min_resources, cv=cv,
+                                       scoring=scoring, refit=refit,
+                                       return_train_score=False,
+                                       random_state=random_state,
+                                       n_jobs=n_jobs)
+        self.n_iter = n_iter
+        self.framework = framework
+        self.learning_indices = learning_indices
+        self.available_indices = learning_indices
+        self.view_indices = view_indices
+        self.equivalent_draws = equivalent_draws
+        self.track_tracebacks = track_tracebacks
+        self.tracebacks = []
+        self.partial_report_file_name = partial_report_file_name
+        self.fold_cache_size = fold_cache_size
+
+    def translate_uniform(self, args):
+        return CustomUniform(**args)
+
+    def translate_randint(self, args):
+        return CustomRandint(**args)
+
+    def fit(self, X, y=None, groups=None, **fit_params):
+        if self.framework == "monoview":
+            HPSearch.fit_monoview(self, HalvingRandomSearchCV, X, y=y,
+                                  groups=groups, **fit_params)
+            self.cv_results_["rung"] = self.cv_results_["iter"]
+            return self
+        elif self.framework == "multiview":
+            return HPSearch.fit_multiview_halving(self, X, y=y, groups=groups,
+                                                  **fit_params)
+
+    def get_candidate_params(self, X):
+        return Random.get_candidate_params(self, X)
+
+
+class Bayesian(RandomizedSearchCV, HPSearch):
+    """
+    Sequential model-based search with a Tree-structured Parzen Estimator
+    (Bergstra et al., 2011). After n_startup random candidates, each round
+    splits the evaluated candidates in the best gamma fraction and the
+    others, models the distribution of each parameter in both groups, and
+    suggests the candidates that maximize the ratio of their densities. The
+    CustomRandint and CustomUniform distributions are modeled before their
+    multiplier is applied, so the "e-" and "e" ones are explored on a log
+    scale, and the lists as categorical distributions.
+
+    Each round suggests batch_size candidates, evaluated in parallel, by
+    default as many as n_jobs.
+    """
+
+    consistent_folds = True
+
+    def __init__(self, estimator, param_distributions=None, n_iter=10,
+                 n_startup=None, batch_size=None, gamma=0.25,
+                 n_ei_candidates=24, refit=False, n_jobs=1, scoring=None,
+                 cv=None, random_state=None, learning_indices=None,
+                 view_indices=None, framework="monoview",
+                 equivalent_draws=True, track_tracebacks=True,
+                 partial_report_file_name=None, pruning=None,
+                 pruning_warmup=1, pruning_confidence=0.95,
+                 fold_cache_size=0):
+        param_distributions = Random.get_param_distribs(
+            self, estimator, param_distributions)
+        scoring = HPSearch.get_scoring(self, scoring)
+        RandomizedSearchCV.__init__(self, estimator, n_iter=n_iter,
+                                    param_distributions=param_distributions,
+                                    refit=refit, n_jobs=n_jobs,
+                                    scoring=scoring, cv=cv,
+                                    random_state=random_state)
+        self.n_startup = n_startup
+        self.batch_size = batch_size
+        self.gamma = gamma
+        self.n_ei_candidates = n_ei_candidates
+        self.framework = framework
+        self.learning_indices = learning_indices
+        self.available_indices = learning_indices
+        self.view_indices = view_indices
+        self.equivalent_draws = equivalent_draws
+        self.track_tracebacks = track_tracebacks
+        self.tracebacks = []
+        self.partial_report_file_name = partial_report_file_name
+        self.pruning = pruning
+        self.pruning_warmup = pruning_warmup
+        self.pruning_confidence = pruning_confidence
+        self.fold_cache_size = fold_cache_size
+
+    def translate_uniform(self, args):
+        return CustomUniform(**args)
+
+    def translate_randint(self, args):
+        return CustomRandint(**args)
+
+    def fit(self, X, y=None, groups=None, **fit_params):
+        if self.framework == "monoview":
+            return HPSearch.fit_monoview(self, RandomizedSearchCV, X, y=y,
+                                         groups=groups, **fit_params)
+        elif self.framework == "multiview":
+            return HPSearch.fit_multiview(self, X, y=y, groups=groups,
+                                          **fit_params)
+
+    def get_candidate_params(self, X):
+        """Draws the random candidates of the first round"""
+        if self.framework == "multiview" and self.equivalent_draws:
+            self.n_iter = self.n_iter * X.nb_view
+        self.random_state_ = check_random_state(self.random_state)
+        if self.n_startup is None:
+            n_startup = max(2, self.n_iter // 4)
+        else:
+            n_startup = self.n_startup
+        self.candidate_params = list(
+            ParameterSampler(self.param_distributions,
+                             min(n_startup, self.n_iter),
+                             random_state=self.random_state_))
+
+    def _run_search(self, evaluate_candidates):
+        # Monoview search, evaluate_candidates returns all the results
+        def evaluate_batch(candidate_params):
+            results = evaluate_candidates(candidate_params)
+            return list(results["mean_test_score"][-len(candidate_params):])
+        self.get_candidate_params(None)
+        self.run_multiview_search(evaluate_batch)
+
+    def run_multiview_search(self, evaluate_candidates):
+        if self.batch_size is None:
+            batch_size = effective_n_jobs(self.n_jobs)
+        else:
+            batch_size = self.batch_size
+        history = []
+        evaluated = []
+        candidate_params = self.candidate_params
+        while candidate_params:
+            scores = evaluate_candidates(candidate_params)
+            evaluated += candidate_params
+            history += [(candidate_param, score) for candidate_param, score
+                        in zip(candidate_params, scores)
+                        if score is not None and np.isfinite(score)]
+            candidate_params = suggest_tpe(
+                self.param_distributions, history, evaluated,
+                min(batch_size, self.n_iter - len(evaluated)),
+                self.random_state_, gamma=self.gamma,
+                n_ei_candidates=self.n_ei_candidates)
+
+
+def get_categorical_index(values, value):
+    for index, candidate_value in enumerate(values):
+        if candidate_value is value:
+            return index
+    for index, candidate_value in enumerate(values):
+        try:
+            if candidate_value == value:
+                return index
+        except ValueError:
+            # Arrays can't be compared
+            continue
+    return None
+
+
+class ParzenEstimator:
+    """
+    The distribution of a parameter among a group of candidates : the
+    categories are counted with a uniform prior, and the numbers, drawn from
+    a CustomRandint or a CustomUniform, are modeled by a gaussian kernel
+    around each observed number mixed with the uniform prior, before the
+    multiplier is applied.
+    """
+
+    def __init__(self, distribution, values):
+        self.distribution = distribution
+        if isinstance(distribution, list):
+            counts = np.ones(len(distribution))
+            for value in values:
+                index = get_categorical_index(distribution, value)
+                if index is not None:
+                    counts[index] += 1
+            self.probabilities = counts / counts.sum()
+            return
+        if isinstance(distribution, CustomRandint):
+            self.low = distribution.low - 0.5
+            self.high = distribution.high - 0.5
+        else:
+            self.low = distribution.loc
+            self.high = distribution.loc + distribution.state
+        width = max(self.high - self.low, 1e-12)
+        self.mus = np.clip([distribution.unmultiply(value)
+                            for value in values], self.low, self.high)
+        self.sigma = width / (1 + len(self.mus))
+        self.prior_weight = 1 / (1 + len(self.mus))
+        self.width = width
+
+    def sample(self, random_state, n_samples):
+        if isinstance(self.distribution, list):
+            return [self.distribution[index] for index in random_state.choice(
+                len(self.distribution), size=n_samples, p=self.probabilities)]
+        samples = []
+        for _ in range(n_samples):
+            if not len(self.mus) or random_state.rand() < self.prior_weight:
+                latent = random_state.uniform(self.low, self.high)
+            else:
+                latent = np.clip(random_state.normal(
+                    self.mus[random_state.randint(len(self.mus))],
+                    self.sigma), self.low, self.high)
+            samples.append(self.to_value(latent))
+        return samples
+
+    def to_value(self, latent):
+        if isinstance(self.distribution, CustomRandint):
+            latent = int(min(round(latent), self.distribution.high - 1))
+        return self.distribution.multiply(latent)
+
+    def log_pdf(self, value):
+        if isinstance(self.distribution, list):
+            index = get_categorical_index(self.distribution, value)
+            return np.log(self.probabilities[index])
+        latent = self.distribution.unmultiply(value)
+        density = self.prior_weight / self.width
+        if len(self.mus):
+            density += (1 - self.prior_weight) * np.mean(
+                np.exp(-0.5 * ((latent - self.mus) / self.sigma) ** 2)
+                / (self.sigma * np.sqrt(2 * np.pi)))
+        return np.log(density)
+
+
+def is_modeled(distribution):
+    return isinstance(distribution, (list, CustomRandint, CustomUniform))
+
+
+def suggest_tpe(param_distributions, history, evaluated, n_suggestions,
+                random_state, gamma=0.25, n_ei_candidates=24):
+    """
+    Suggests n_suggestions new candidates given the scores of the evaluated
+    ones, see Bayesian. The parameters whose distribution is not a list, a
+    CustomRandint or a CustomUniform are drawn at random.
+
+    Parameters
+    ----------
+    history : list of (params, score)
+        The candidates that have been evaluated successfully.
+    evaluated : list of dicts
+        All the evaluated candidates, that are not suggested again.
+
+    Returns
+    -------
+    candidate_params : list of dicts
+        Less than n_suggestions candidates if no new one is found.
+    """
+    ranked = sorted(history, key=lambda item: -item[1])
+    n_good = max(1, int(np.ceil(gamma * len(ranked))))
+    good = [params for params, _ in ranked[:n_good]]
+    bad = [params for params, _ in ranked[n_good:]]
+    estimators = dict(
+        (param_name, (ParzenEstimator(distribution, [params[param_name]
+                                                     for params in good]),
+                      ParzenEstimator(distribution, [params[param_name]
+                                                     for params in bad])))
+        for param_name, distribution in param_distributions.items()
+        if is_modeled(distribution))
+    seen = set(json.dumps(format_params(params), sort_keys=True, default=str)
+               for params in evaluated)
+    suggestions = []
+    for _ in range(10 * max(n_suggestions, 0)):
+        if len(suggestions) >= n_suggestions:
+            break
+        samples = dict((param_name, good_estimator.sample(random_state,
+                                                          n_ei_candidates))
+                       for param_name, (good_estimator, _)
+                       in estimators.items())
+        improvements = np.zeros(n_ei_candidates)
+        for param_name, (good_estimator, bad_estimator) in estimators.items():
+            improvements += [good_estimator.log_pdf(value)
+                             - bad_estimator.log_pdf(value)
+                             for value in samples[param_name]]
+        # The best sample that has not been evaluated nor suggested yet
+        for best in np.argsort(-improvements, kind="stable"):
+            candidate = {}
+            for param_name, distribution in param_distributions.items():
+                if param_name in estimators:
+                    candidate[param_name] = samples[param_name][best]
+                else:
+                    candidate[param_name] = distribution.rvs(
+                        random_state=random_state)
+            key = json.dumps(format_params(candidate), sort_keys=True,
+                             default=str)
+            if key not in seen:
+                seen.add(key)
+                suggestions.append(candidate)
+                break
+    return suggestions
+
+
+def get_last_rungs(cv_results):
+    """
+    Returns the index of the last result of each candidate in the
+    cv_results_ of a Halving search, the candidates being evaluated again
+    in each rung they reach.
+    """
+    last_indices = {}
+    for index, params in enumerate(cv_results["params"]):
+        last_indices[json.dumps(format_params(params), sort_keys=True,
+                                default=str)] = index
+    return sorted(last_indices.values())
+
+
+def subsample(indices, n_samples, y, seed):
+    """
+    Returns a stratified subsample of n_samples positions in indices, the
+    same seed giving the same subsample.
+    """
+    if n_samples >= len(indices):
+        return indices
+    try:
+        return resample(indices, replace=False, n_samples=n_samples,
+                        stratify=y, random_state=seed)
+    except ValueError:
+        # Too few samples to represent every class
+        return resample(indices, replace=False, n_samples=n_samples,
+                        random_state=seed)
+
+
+def evaluate_fold(base_estimator, candidate_param, X, y, train_indices,
+                  test_indices, view_indices, scoring, track_tracebacks=True):
+    """
+    Fits a multiview candidate on a fold and scores it, see
+    HPSearch.fit_multiview.
+
+    Returns
+    -------
+    score : float
+        The test score of the fold, None if it failed.
+    params : dict
+        The parameters of the fitted estimator.
+    error : str
+        The traceback of the failure, or None. If track_tracebacks is False,
+        the error is raised.
+    """
+    try:
+        current_estimator = clone(base_estimator)
+        current_estimator.set_params(**candidate_param)
+        current_estimator.fit(X, y, train_indices=train_indices,
+                              view_indices=view_indices)
+        test_prediction = current_estimator.predict(
+            X, test_indices, view_indices=view_indices)
+        test_score = scoring._score_func(y[test_indices], test_prediction,
+                                         **scoring._kwargs)
+    except BaseException:
+        if track_tracebacks:
+            return None, None, traceback.format_exc()
+        raise
+    return test_score, current_estimator.get_params(), None
+
+
+class PartialReportScorer:
+    """Wraps the scorer of a monoview search to record the score of each
+    fold of each candidate in the partial report of the search."""
+
+    def __init__(self, scorer, search):
+        self.scorer = scorer
+        self.search = search
+
+    def __call__(self, estimator, X, y, **kwargs):
+        score = self.scorer(estimator, X, y, **kwargs)
+        self.search.record_partial_score(estimator.get_params(deep=False),
+                                         score)
+        return score
+
+
+def summarize_partial_report(partial_report_file_name):
+    """
+    Summarizes the partial report of an interrupted search : the number of
+    evaluated candidates and the best one, with its mean score.
+    """
+    scores = {}
+    with open(partial_report_file_name) as partial_report:
+        for line in partial_report:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Line being written when the search was interrupted
+                continue
+            params = json.dumps(record["params"], sort_keys=True)
+            scores.setdefault(params, []).append(record["score"])
+    if not scores:
+        return "No candidate was evaluated"
+    mean_scores = dict((params, np.mean(params_scores))
+                       for params, params_scores in scores.items())
+    best_params = max(mean_scores, key=mean_scores.get)
+    return "{} candidates evaluated, the best one being\n{}\n\t\t{}".format(
+        len(mean_scores), best_params, mean_scores[best_params])
+
+
 class CustomDist:
 
     def multiply(self, random_number):
@@ -248,6 +1028,19 @@ class CustomDist:
         else:
             return random_number
 
+    def unmultiply(self, value):
+        """The inverse of multiply, the number drawn before the multiplier
+        is applied, used by the TPE search to model the exponents of the
+        log-scale distributions."""
+        if self.multiplier == "e-":
+            return -np.log10(value)
+        elif self.multiplier == "e":
+            return np.log10(value)
+        elif type(self.multiplier) in [int, float]:
+            return value / self.multiplier
+        else:
+            return value
+
 class CustomRandint(CustomDist):
     """Used as a distribution returning a integer between low and high-1.
     It can be used with a multiplier agrument to be able to perform more complex generation
@@ -274,6 +1067,8 @@ class CustomUniform(CustomDist):
 
     def __init__(self, loc=0, state=1, multiplier=""):
         self.uniform = uniform(loc, state)
+        self.loc = loc
+        self.state = state
         self.multiplier = multiplier
 
     def rvs(self, random_state=None):
@@ -1,5 +1,6 @@
 import errno
 import os
+import pickle
 
 
 def secure_file_path(file_name):  # pragma: no cover
@@ -9,3 +10,42 @@ def secure_file_path(file_name):  # pragma: no cover
         except OSError as exc:
             if exc.errno != errno.EEXIST:
                 raise
+
+
+def get_checkpoint_path(directory, position, task_id):
+    return os.path.join(directory, "checkpoints",
+                        str(position) + "-" + task_id + ".pickle")
+
+
+def save_task_results(directory, position, task_id, results,
+                      traceback_outputs, random_state=None):
+    """
+    Saves the results and tracebacks of an experiment of the benchmark
+    in directory, with the state of its random state after the experiment
+    (see numpy.random.RandomState.get_state) so a resumed benchmark can
+    restore it. The file is written aside and renamed, so an interrupted
+    benchmark never leaves a partial checkpoint.
+    """
+    file_name = get_checkpoint_path(directory, position, task_id)
+    secure_file_path(file_name)
+    temp_file_name = file_name + "." + str(os.getpid()) + ".tmp"
+    with open(temp_file_name, "wb") as handle:
+        pickle.dump((results, traceback_outputs, random_state), handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temp_file_name, file_name)
+
+
+def load_task_results(directory, position, task_id):
+    """
+    Returns the results, tracebacks and random state saved by
+    save_task_results, or None if the experiment has not been run yet.
+    """
+    try:
+        with open(get_checkpoint_path(directory, position, task_id),
+                  "rb") as handle:
+            checkpoint = pickle.load(handle)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    # The checkpoints of the previous versions have no random state
+    return tuple(checkpoint) + (None,) * (3 - len(checkpoint))
@@ -0,0 +1,292 @@
+import glob
+import heapq
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def get_cost_key(task_name):
+    """
+    Returns the key of an experiment in the cost model : the classifier
+    name of a monoview experiment, named classifier-view, or the name of a
+    multiview one.
+    """
+    return task_name.split("-")[0]
+
+
+def get_train_size(nb_samples, split):
+    """The number of training samples of a split, see execution.gen_splits"""
+    return nb_samples - int(np.ceil(nb_samples * split))
+
+
+def get_task_size(task_type, arguments, view_footprints, nb_train):
+    """
+    Returns the size of an experiment for the cost model, its number of
+    training samples times its number of features, and an estimation of the
+    memory, in bytes, of the data it holds : its views and their train/test
+    copies.
+
+    Parameters
+    ----------
+    view_footprints : dict
+        Maps each view index to its Dataset.get_view_footprint.
+    """
+    if task_type == "monoview":
+        view_indices = [arguments["view_index"]]
+    else:
+        view_indices = arguments["view_indices"]
+    nb_features = sum(view_footprints[view_index][0]
+                      for view_index in view_indices)
+    nb_bytes = sum(view_footprints[view_index][1]
+                   for view_index in view_indices)
+    return nb_train * nb_features, 2 * nb_bytes
+
+
+def load_cost_history(directory, get_run_sizes):
+    """
+    Gathers the durations saved by the previous benchmarks in directory and
+    its sub-directories, with the size of each experiment.
+
+    Parameters
+    ----------
+    directory : str
+        The directory in which the results are searched.
+    get_run_sizes : callable
+        Called with the directory of a benchmark (containing its
+        config_file.yml), returns its number of training samples and a dict
+        mapping its view names to their number of features, or None if they
+        are unknown (if its dataset is not available anymore, for example).
+
+    Returns
+    -------
+    history : list of (cost key, size, duration)
+        The size is None if it is unknown.
+    """
+    history = []
+    run_sizes = {}
+    for file_name in glob.glob(os.path.join(directory, "**",
+                                            "*-durations_dataframe.csv"),
+                               recursive=True):
+        run_directory = os.path.dirname(file_name)
+        if not os.path.isfile(os.path.join(run_directory, "config_file.yml")):
+            # The iterations are saved in sub-directories of the benchmark
+            run_directory = os.path.dirname(run_directory)
+        if run_directory not in run_sizes:
+            try:
+                run_sizes[run_directory] = get_run_sizes(run_directory)
+            except BaseException:
+                logging.debug(
+                    "Debug:\t Unable to get the sizes of " + run_directory)
+                run_sizes[run_directory] = None
+        try:
+            df = pd.read_csv(file_name, index_col=0)
+            totals = df[["hps", "fit", "pred"]].astype(float).sum(axis=1)
+        except (OSError, KeyError, ValueError):
+            continue
+        for task_name, total in totals.items():
+            if not np.isfinite(total):
+                continue
+            history.append((get_cost_key(task_name),
+                            get_history_size(task_name,
+                                             run_sizes[run_directory]),
+                            total))
+    return history
+
+
+def get_history_size(task_name, run_sizes):
+    if run_sizes is None:
+        return None
+    nb_train, view_features = run_sizes
+    if "-" in task_name:
+        view_name = task_name.split("-", 1)[1]
+        if view_name not in view_features:
+            return None
+        return nb_train * view_features[view_name]
+    return nb_train * sum(view_features.values())
+
+
+def fit_cost_model(history, min_duration=1e-3):
+    """
+    Fits, for each cost key, the power law duration = coef * size **
+    exponent on the history. With a single known size, the duration is
+    assumed proportional to the size, and without any known size, it is
+    the mean duration.
+
+    Returns
+    -------
+    cost_model : dict
+        Maps each cost key to its (coef, exponent) couple.
+    """
+    records = {}
+    for cost_key, size, duration in history:
+        records.setdefault(cost_key, []).append((size, max(duration,
+                                                           min_duration)))
+    cost_model = {}
+    for cost_key, key_records in records.items():
+        sized = [(size, duration) for size, duration in key_records
+                 if size]
+        if not sized:
+            cost_model[cost_key] = (float(np.mean([duration for _, duration
+                                                    in key_records])), 0.0)
+            continue
+        log_sizes = np.log([size for size, _ in sized])
+        log_durations = np.log([duration for _, duration in sized])
+        if len(np.unique(log_sizes)) > 1:
+            exponent = float(np.clip(np.polyfit(log_sizes, log_durations,
+                                                1)[0], 0, 3))
+        else:
+            exponent = 1.0
+        cost_model[cost_key] = (
+            float(np.exp(np.mean(log_durations - exponent * log_sizes))),
+            exponent)
+    return cost_model
+
+
+def estimate_duration(cost_model, task_name, size):
+    """Returns the estimated duration of an experiment, or None if its
+    classifier has no history"""
+    cost_key = get_cost_key(task_name)
+    if cost_key not in cost_model:
+        return None
+    coef, exponent = cost_model[cost_key]
+    return coef * max(size, 1) ** exponent
+
+
+def simulate_schedule(durations, nb_workers):
+    """
+    Simulates the list scheduling of jobs, given in the order in which
+    they are dispatched, on nb_workers workers : each job starts on the
+    first available worker.
+
+    Returns
+    -------
+    starts : list of float
+        The start time of each job.
+    workers : list of int
+        The worker of each job.
+    makespan : float
+        The time at which the last job ends.
+    """
+    available = [(0.0, worker) for worker in range(max(nb_workers, 1))]
+    heapq.heapify(available)
+    starts = []
+    workers = []
+    for duration in durations:
+        start, worker = heapq.heappop(available)
+        starts.append(start)
+        workers.append(worker)
+        heapq.heappush(available, (start + duration, worker))
+    return starts, workers, max(end for end, _ in available)
+
+
+def get_peak(starts, durations, amounts):
+    """Returns the maximum of the sum of the amounts of the jobs running at
+    the same time"""
+    events = sorted([(start + duration, -amount) for start, duration, amount
+                     in zip(starts, durations, amounts)] +
+                    [(start, amount) for start, amount
+                     in zip(starts, amounts)])
+    peak = current = 0
+    for _, amount in events:
+        current += amount
+        peak = max(peak, current)
+    return peak
+
+
+def plan_schedule(tasks, nb_cores, scheduler="iterations"):
+    """
+    Estimates the run of the tasks of a benchmark, as built by
+    exec_classif.gen_tasks, with their expected_duration and memory, on
+    nb_cores processes.
+
+    With the "tasks" scheduler, the tasks are dispatched in the given order,
+    else each statistical iteration runs its tasks one after the other in a
+    process.
+
+    Returns
+    -------
+    plan : dict
+        The estimated "total_time", the tasks of the "critical_path", the
+        chain of jobs run by the process that ends last, with its duration
+        "critical_path_time", and the "peak_memory" of the data of the tasks
+        running at the same time.
+    """
+    if scheduler == "tasks" and nb_cores > 1:
+        jobs = [[task] for task in tasks]
+    else:
+        iterations = {}
+        for task in sorted(tasks, key=lambda task: (task["flag"],
+                                                    task["position"])):
+            iterations.setdefault(task["flag"], []).append(task)
+        jobs = list(iterations.values())
+    durations = [sum(task["expected_duration"] for task in job)
+                 for job in jobs]
+    starts, workers, makespan = simulate_schedule(durations, nb_cores)
+    last_worker = workers[int(np.argmax([start + duration for start, duration
+                                         in zip(starts, durations)]))]
+    critical_path = [task for job, worker in zip(jobs, workers)
+                     if worker == last_worker for task in job]
+    peak_memory = get_peak(starts, durations,
+                           [max(task["memory"] for task in job)
+                            for job in jobs])
+    return {"total_time": makespan,
+            "critical_path": critical_path,
+            "critical_path_time": sum(task["expected_duration"]
+                                      for task in critical_path),
+            "peak_memory": peak_memory}
+
+
+def format_duration(seconds):
+    if seconds < 60:
+        return "{:.2f}s".format(seconds)
+    seconds = int(round(seconds))
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if days:
+        return "{}d {:02d}h {:02d}m".format(days, hours, minutes)
+    if hours:
+        return "{}h {:02d}m {:02d}s".format(hours, minutes, seconds)
+    return "{}m {:02d}s".format(minutes, seconds)
+
+
+def format_memory(nb_bytes):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if nb_bytes < 1024:
+            return "{:.1f}{}".format(nb_bytes, unit)
+        nb_bytes /= 1024
+    return "{:.1f}TB".format(nb_bytes)
+
+
+def format_plan(dataset_name, tasks, plan, nb_cores, scheduler,
+                without_history, nb_listed=10):
+    """Returns the report of the plan of a benchmark, see plan_schedule"""
+    nb_iterations = len(set(task["flag"] for task in tasks))
+    lines = ["Plan of the benchmark on {} : {} experiments in {} statistical "
+             "iterations, on {} cores with the {} scheduler".format(
+                 dataset_name, len(tasks), nb_iterations, nb_cores,
+                 scheduler),
+             "\tEstimated total time : {} ({} of computation)".format(
+                 format_duration(plan["total_time"]),
+                 format_duration(sum(task["expected_duration"]
+                                     for task in tasks))),
+             "\tCritical path : {}, the {} experiments of the process that "
+             "ends last :".format(format_duration(plan["critical_path_time"]),
+                                  len(plan["critical_path"]))]
+    critical_path = sorted(plan["critical_path"],
+                           key=lambda task: -task["expected_duration"])
+    for task in critical_path[:nb_listed]:
+        lines.append("\t\t{} (iteration {}) : {}".format(
+            task["name"], task["flag"] + 1,
+            format_duration(task["expected_duration"])))
+    if len(critical_path) > nb_listed:
+        lines.append("\t\tand {} shorter ones".format(len(critical_path)
+                                                      - nb_listed))
+    lines.append("\tEstimated peak memory of the data : {}".format(
+        format_memory(plan["peak_memory"])))
+    if without_history:
+        lines.append("\tWithout history, expected to last the median "
+                     "duration : " + ", ".join(sorted(without_history)))
+    return "\n".join(lines)
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import pickle
+
+import numpy as np
+
+from ... import __version__
+from .dataset import hash_indices
+
+# Changes the keys when the content of the cached entries changes
+ENTRY_FORMAT = 3
+
+
+class ResultCache():
+    """
+    Content-addressed on-disk cache of the results of the experiments,
+    shared by all the benchmarks using the same directory.
+
+    An experiment is keyed on the fingerprint of the dataset, its train/test
+    split, its cross-validation folds and random state, its classifier and
+    its resolved configuration, the hyper-parameter search settings, the
+    metrics and the version of SuMMIT, so a hit returns the exact result
+    that running it again would give.
+
+    The total size of the cache is capped at max_size bytes : when it is
+    exceeded, the least recently used results are evicted. The cache
+    directory is scanned once by each process, which then counts the
+    results it stores, and only scans it again, to evict, when this count
+    exceeds max_size.
+
+    Parameters
+    ----------
+    directory : str
+        The directory in which the results are stored.
+    max_size : int
+        The maximum size of the cache, in bytes.
+    dataset_fingerprint : str
+        The fingerprint of the benchmarked dataset, see
+        Dataset.get_fingerprint.
+    """
+
+    def __init__(self, directory, max_size, dataset_fingerprint):
+        self.directory = directory
+        self.max_size = max_size
+        self.dataset_fingerprint = dataset_fingerprint
+        # Unknown until the first scan of the directory
+        self.size = None
+        os.makedirs(directory, exist_ok=True)
+
+    def get_key(self, task_type, arguments, classification_indices, k_folds,
+                random_state, hyper_param_search, metrics, labels_dictionary,
+                hps_iter):
+        """
+        Returns the key of an experiment, the arguments are the ones of
+        exec_classif.exec_one_task.
+        """
+        description = {
+            "version": __version__,
+            "entry_format": ENTRY_FORMAT,
+            "dataset": self.dataset_fingerprint,
+            "task_type": task_type,
+            "arguments": arguments,
+            "train_indices": hash_indices(classification_indices[0]),
+            "test_indices": hash_indices(classification_indices[1]),
+            "k_folds": [k_folds.__class__.__name__,
+                        getattr(k_folds, "n_splits", None),
+                        getattr(k_folds, "shuffle", None),
+                        hash_random_state(
+                            getattr(k_folds, "random_state", None))],
+            "random_state": hash_random_state(random_state),
+            "hyper_param_search": hyper_param_search,
+            "hps_iter": hps_iter,
+            "metrics": metrics,
+            "labels_dictionary": labels_dictionary,
+        }
+        return hashlib.sha1(json.dumps(description, sort_keys=True,
+                                       default=str).encode(
+            "utf-8")).hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".pickle")
+
+    def get(self, key):
+        """
+        Returns the result stored under key, or None if it is not cached.
+        """
+        file_name = self.get_path(key)
+        try:
+            with open(file_name, "rb") as handle:
+                result = pickle.load(handle)
+            # The modification time orders the results for the LRU eviction
+            os.utime(file_name)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return result
+
+    def put(self, key, result):
+        """
+        Stores result under key, and evicts the least recently used results
+        if the cache exceeds its maximum size.
+        """
+        file_name = self.get_path(key)
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        temp_file_name = file_name + "." + str(os.getpid()) + ".tmp"
+        with open(temp_file_name, "wb") as handle:
+            pickle.dump(result, handle)
+        if self.size is None:
+            self.size = self.scan()[1]
+        if os.path.isfile(file_name):
+            self.size -= os.path.getsize(file_name)
+        self.size += os.path.getsize(temp_file_name)
+        os.replace(temp_file_name, file_name)
+        if self.size > self.max_size:
+            self.evict()
+
+    def scan(self):
+        """
+        Returns the (modification time, size, path) of the results in the
+        cache directory, and their total size.
+        """
+        entries = []
+        for root, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                if not file_name.endswith(".pickle"):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries, sum(size for _, size, _ in entries)
+
+    def evict(self):
+        """
+        Removes the least recently used results until the cache fits in
+        max_size bytes.
+        """
+        entries, total_size = self.scan()
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # Already evicted by another process
+                pass
+            total_size -= size
+        self.size = total_size
+
+
+def collect_outputs(directory):
+    """
+    Returns the content of the output files of an experiment, keyed on their
+    path relative to the parent of its directory : the files in directory,
+    and the feature importances that the monoview classifiers save next to
+    it, see monoview_utils.BaseMonoviewClassifier.get_feature_importance.
+    """
+    parent = os.path.dirname(os.path.normpath(directory))
+    paths = [path for path in [os.path.normpath(directory)
+                               + "feature_importances.pickle"]
+             if os.path.isfile(path)]
+    for root, _, file_names in os.walk(directory):
+        paths += [os.path.join(root, file_name) for file_name in file_names]
+    outputs = {}
+    for path in paths:
+        with open(path, "rb") as handle:
+            outputs[os.path.relpath(path, parent)] = handle.read()
+    return outputs
+
+
+def restore_outputs(directory, outputs):
+    """Writes the outputs gathered by collect_outputs for directory"""
+    parent = os.path.dirname(os.path.normpath(directory))
+    for relative_path, content in outputs.items():
+        path = os.path.join(parent, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as handle:
+            handle.write(content)
+
+
+def hash_random_state(random_state):
+    """Used to key the state of a random state in the result cache"""
+    if isinstance(random_state, np.random.RandomState):
+        name, keys, pos, has_gauss, cached_gaussian = random_state.get_state()
+        return hashlib.sha1(
+            keys.tobytes() + str((name, pos, has_gauss,
+                                  cached_gaussian)).encode("utf-8")
+        ).hexdigest()
+    return str(random_state)
@@ -0,0 +1,152 @@
+import logging
+import multiprocessing
+import os
+import signal
+import time
+import traceback
+
+
+class TaskLimitExceeded(Exception):
+    """Raised when a task is killed for exceeding its time or memory budget"""
+
+
+class SupervisedTaskError(Exception):
+    """Raised when a supervised task fails, with the traceback of its
+    process as message"""
+
+
+def get_task_limits(args, classifier_name):
+    """
+    Returns the time and memory budget of a classifier's tasks : the
+    timeout_s and max_rss_mb of its entry in the task_limits of the
+    configuration, or the global ones.
+    """
+    limits = {"timeout_s": args.get("timeout_s"),
+              "max_rss_mb": args.get("max_rss_mb")}
+    task_limits = args.get("task_limits")
+    if task_limits is not None and classifier_name in task_limits:
+        limits.update(task_limits[classifier_name])
+    return limits
+
+
+def get_descendants(pid):
+    """Returns the pids of the descendants of a process, through /proc"""
+    descendants = []
+    try:
+        threads = os.listdir(os.path.join("/proc", str(pid), "task"))
+    except OSError:
+        return descendants
+    for thread in threads:
+        try:
+            with open(os.path.join("/proc", str(pid), "task", thread,
+                                   "children")) as children_file:
+                children = [int(child) for child in children_file.read().split()]
+        except (OSError, ValueError):
+            continue
+        for child in children:
+            descendants += [child] + get_descendants(child)
+    return descendants
+
+
+def get_rss(pid):
+    """
+    Returns the resident memory, in MB, of a process and its descendants, or
+    None if it can not be read (/proc is only available on Linux).
+    """
+    rss = None
+    for process_id in [pid] + get_descendants(pid):
+        try:
+            with open(os.path.join("/proc", str(process_id),
+                                   "status")) as status_file:
+                for line in status_file:
+                    if line.startswith("VmRSS:"):
+                        rss = (rss or 0) + int(line.split()[1]) / 1024
+                        break
+        except (OSError, ValueError):
+            continue
+    return rss
+
+
+def kill(process):
+    """Kills a process and its descendants, such as its joblib workers"""
+    for process_id in get_descendants(process.pid):
+        try:
+            os.kill(process_id, signal.SIGKILL)
+        except OSError:
+            pass
+    process.kill()
+    process.join()
+
+
+def run_child(connection, function, kwargs):
+    try:
+        outcome = ("result", function(**kwargs))
+    except BaseException:
+        outcome = ("error", traceback.format_exc())
+    connection.send(outcome)
+    connection.close()
+
+
+def get_wait(start, timeout_s, poll_interval):
+    """Waits until the next check, or until the deadline if it is closer"""
+    if timeout_s is None:
+        return poll_interval
+    return max(min(poll_interval, start + timeout_s - time.monotonic()), 0)
+
+
+def run_supervised(function, kwargs, timeout_s=None, max_rss_mb=None,
+                   poll_interval=0.5):
+    """
+    Runs function(**kwargs) in a subprocess, and returns its output. The
+    process is killed if it runs for more than timeout_s seconds, or if its
+    resident memory exceeds max_rss_mb MB.
+
+    Raises
+    ------
+    TaskLimitExceeded
+        If the process has been killed.
+    SupervisedTaskError
+        If function raised an error.
+    """
+    if max_rss_mb is not None and get_rss(os.getpid()) is None:
+        logging.warning("Warning:\t The memory of the tasks can only be "
+                        "measured on Linux, max_rss_mb is ignored")
+        max_rss_mb = None
+    parent_connection, child_connection = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=run_child,
+                                      args=(child_connection, function,
+                                            kwargs))
+    start = time.monotonic()
+    process.start()
+    child_connection.close()
+    try:
+        while not parent_connection.poll(get_wait(start, timeout_s,
+                                                  poll_interval)):
+            duration = time.monotonic() - start
+            if timeout_s is not None and duration > timeout_s:
+                kill(process)
+                raise TaskLimitExceeded(
+                    "Killed after {:.1f}s, exceeding timeout_s={}".format(
+                        duration, timeout_s))
+            if max_rss_mb is not None:
+                rss = get_rss(process.pid)
+                if rss is not None and rss > max_rss_mb:
+                    kill(process)
+                    raise TaskLimitExceeded(
+                        "Killed using {:.0f}MB, exceeding max_rss_mb={}".format(
+                            rss, max_rss_mb))
+        try:
+            status, output = parent_connection.recv()
+        except EOFError:
+            process.join()
+            raise SupervisedTaskError("The process of the task died with "
+                                      "exit code " + str(process.exitcode))
+        process.join()
+    finally:
+        parent_connection.close()
+        if process.is_alive():
+            kill(process)
+    if status == "error":
+        raise SupervisedTaskError(output)
+    return output
+
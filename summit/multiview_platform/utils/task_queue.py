@@ -0,0 +1,221 @@
+import hashlib
+import logging
+import os
+import pickle
+import socket
+import threading
+import time
+import traceback
+
+
+class TaskQueue():
+    """
+    Task queue stored in a directory, that can be shared by several nodes
+    through a network file system, without any scheduling service.
+
+    The coordinator (see exec_classif.iter_tasks) writes each task in
+    pending/. A worker (see work, and the summit worker command) claims a
+    task by renaming it to running/ : the rename is atomic, so only one
+    worker gets it. While the task runs, the worker renews its lease by
+    touching the running file, and a lease that has not been renewed for
+    lease_timeout seconds, because its worker died, is put back in pending/.
+    The results are written in done/, where the coordinator collects them.
+
+    Parameters
+    ----------
+    directory : str
+        The directory of the queue.
+    lease_timeout : float
+        The delay, in seconds, after which a task whose lease has not been
+        renewed is given to another worker.
+    poll_interval : float
+        The delay, in seconds, between two scans of the queue.
+    """
+
+    def __init__(self, directory, lease_timeout=600, poll_interval=1.0):
+        self.directory = directory
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+        for sub_directory in ["pending", "running", "done", "datasets",
+                              "tmp"]:
+            os.makedirs(os.path.join(directory, sub_directory), exist_ok=True)
+        self.datasets = {}
+
+    def get_path(self, state, name):
+        return os.path.join(self.directory, state, name)
+
+    def write(self, path, content):
+        """Writes content in path through a rename, so it is never seen
+        partially written."""
+        temp_path = self.get_path("tmp", socket.gethostname() + "-"
+                                  + str(os.getpid()) + "-"
+                                  + os.path.basename(path))
+        with open(temp_path, "wb") as handle:
+            pickle.dump(content, handle)
+        os.replace(temp_path, path)
+
+    def submit_dataset(self, dataset_var, run_id):
+        """
+        Saves the dataset of a run once, the tasks referring to it by name.
+        The on-disk datasets only pickle their path, that must be reachable
+        by the workers.
+        """
+        name = run_id + ".pickle"
+        self.write(self.get_path("datasets", name), dataset_var)
+        return name
+
+    def submit(self, name, payload):
+        """Adds a task to the queue, the tasks are claimed in the order of
+        their names."""
+        self.write(self.get_path("pending", name), payload)
+
+    def claim(self):
+        """
+        Returns the name of the first pending task, leased to this worker,
+        or None if there is no pending task.
+        """
+        for name in sorted(os.listdir(self.get_path("pending", ""))):
+            try:
+                os.rename(self.get_path("pending", name),
+                          self.get_path("running", name))
+                # The lease starts now, not when the task was submitted
+                os.utime(self.get_path("running", name))
+            except OSError:
+                # Claimed by another worker
+                continue
+            return name
+        return None
+
+    def release(self, name):
+        """Puts a leased task back in the queue."""
+        try:
+            os.rename(self.get_path("running", name),
+                      self.get_path("pending", name))
+        except OSError:
+            pass
+
+    def complete(self, name, outcome):
+        """Saves the outcome of a leased task and ends its lease."""
+        self.write(self.get_path("done", name), outcome)
+        try:
+            os.remove(self.get_path("running", name))
+        except OSError:
+            pass
+
+    def requeue_expired(self):
+        """Puts the tasks whose lease has expired back in the queue."""
+        deadline = time.time() - self.lease_timeout
+        for name in os.listdir(self.get_path("running", "")):
+            try:
+                expired = os.stat(
+                    self.get_path("running", name)).st_mtime < deadline
+            except OSError:
+                continue
+            if expired:
+                logging.warning("Warning:\t The lease of " + name
+                                + " has expired, it is put back in the "
+                                  "queue")
+                self.release(name)
+
+    def run(self, tasks, run_id, dataset_var):
+        """
+        Submits the tasks, given as (name, payload) couples, and yields the
+        (name, outcome) couples as the workers complete them. The outcome is
+        {"results": ...} or {"error": traceback} if the task raised an error.
+        """
+        dataset_name = self.submit_dataset(dataset_var, run_id)
+        names = {}
+        for rank, (name, payload) in enumerate(tasks):
+            queue_name = "{:06d}-{}-{}.pickle".format(rank, run_id, name)
+            self.submit(queue_name, dict(payload, dataset_name=dataset_name))
+            names[queue_name] = name
+        logging.info("Info:\t Submitted " + str(len(names))
+                     + " tasks to the queue " + self.directory)
+        try:
+            while names:
+                for queue_name in sorted(names):
+                    path = self.get_path("done", queue_name)
+                    if not os.path.exists(path):
+                        continue
+                    with open(path, "rb") as handle:
+                        outcome = pickle.load(handle)
+                    os.remove(path)
+                    yield names.pop(queue_name), outcome
+                if names:
+                    self.requeue_expired()
+                    time.sleep(self.poll_interval)
+        finally:
+            # If the run is aborted, its pending tasks are withdrawn
+            for queue_name in names:
+                try:
+                    os.remove(self.get_path("pending", queue_name))
+                except OSError:
+                    pass
+            try:
+                os.remove(self.get_path("datasets", dataset_name))
+            except OSError:
+                pass
+
+    def load_dataset(self, dataset_name):
+        if dataset_name not in self.datasets:
+            with open(self.get_path("datasets", dataset_name), "rb") as handle:
+                self.datasets = {dataset_name: pickle.load(handle)}
+        return self.datasets[dataset_name]
+
+    def renew_lease(self, name, stop):
+        while not stop.wait(self.lease_timeout / 4):
+            try:
+                os.utime(self.get_path("running", name))
+            except OSError:
+                pass
+
+    def work(self, exec_task, idle_timeout=None, max_tasks=None):
+        """
+        Claims and runs tasks with exec_task until the queue has been empty
+        for idle_timeout seconds (forever if None), or max_tasks tasks have
+        been run.
+
+        Returns
+        -------
+        nb_tasks : int
+            The number of tasks run by the worker.
+        """
+        nb_tasks = 0
+        idle_since = time.time()
+        while max_tasks is None or nb_tasks < max_tasks:
+            name = self.claim()
+            if name is None:
+                if idle_timeout is not None and \
+                        time.time() - idle_since > idle_timeout:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            stop = threading.Event()
+            lease = threading.Thread(target=self.renew_lease,
+                                     args=(name, stop), daemon=True)
+            lease.start()
+            try:
+                with open(self.get_path("running", name), "rb") as handle:
+                    payload = pickle.load(handle)
+                logging.info("Info:\t Running " + name)
+                dataset_var = self.load_dataset(payload.pop("dataset_name"))
+                outcome = {"results": exec_task(dataset_var=dataset_var,
+                                                **payload)}
+            except (KeyboardInterrupt, SystemExit):
+                self.release(name)
+                raise
+            except BaseException:
+                outcome = {"error": traceback.format_exc()}
+            finally:
+                stop.set()
+                lease.join()
+            self.complete(name, outcome)
+            nb_tasks += 1
+            idle_since = time.time()
+        return nb_tasks
+
+
+def get_run_id(directory):
+    """Identifies the tasks of a benchmark in a shared queue"""
+    return hashlib.sha1(os.path.abspath(directory).encode(
+        "utf-8")).hexdigest()[:12]
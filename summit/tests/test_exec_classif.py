@@ -1,12 +1,17 @@
 import os
 import unittest
+from multiprocessing import Process
 
 import h5py
 import numpy as np
+from sklearn.model_selection import KFold
 
 from summit.tests.utils import rm_tmp, tmp_path, test_dataset
 
 from summit.multiview_platform import exec_classif
+from summit.multiview_platform.utils.organization import save_task_results
+from summit.multiview_platform.utils.result_cache import ResultCache
+from summit.multiview_platform.utils.task_queue import TaskQueue
 
 
 # class Test_execute(unittest.TestCase):
@@ -260,7 +265,7 @@ def fakegetResults(results, stats_iter,
     return 3
 
 
-def fakeDelete(a, b, c):
+def fakeDelete(a):
     return 9
 
 
@@ -268,6 +273,15 @@ def fake_analyze(a, b, c, d, sample_ids=None, labels=None):
     pass
 
 
+def fake_get_pid_benchmark(dataset_var=1, a=4, args=1, track_tracebacks=False):
+    return [a, os.getpid()]
+
+
+def fake_get_results(results, stats_iter, benchmark_arguments_dictionaries,
+                     metrics, directory, sample_ids, labels):
+    return results
+
+
 class Test_execBenchmark(unittest.TestCase):
 
     @classmethod
@@ -351,11 +365,237 @@ class Test_execBenchmark(unittest.TestCase):
                                           analyze_iterations=fake_analyze)
         cls.assertEqual(res, 3)
 
+    def test_multicore(cls):
+        argument_dictionaries = [{"a": 10, "args": cls.args},
+                                 {"a": 4, "args": cls.args},
+                                 {"a": 55, "args": cls.args}]
+        analyzed = []
+        res = exec_classif.exec_benchmark(
+            nb_cores=2, stats_iter=3,
+            benchmark_arguments_dictionaries=argument_dictionaries,
+            directory="", metrics=[[[1, 2], [3, 4, 5]]],
+            dataset_var=cls.Dataset, track_tracebacks=6,
+            exec_one_benchmark_mono_core=fake_get_pid_benchmark,
+            analyze=fake_get_results, delete=fakeDelete,
+            analyze_iterations=lambda results, *args, **kwargs:
+            analyzed.append(results[0][0]))
+        cls.assertEqual([result[0] for result in res], [10, 4, 55])
+        cls.assertEqual(analyzed, [10, 4, 55])
+        cls.assertNotIn(os.getpid(), [result[1] for result in res])
+
     @classmethod
     def tearDownClass(cls):
         rm_tmp()
 
 
+def fake_exec_one_task(dataset_var=None, task_type="monoview", arguments=None,
+                       random_state=None, track_tracebacks=False, **kwargs):
+    if arguments["classifier_name"] == "failing":
+        return [], {arguments["classifier_name"]: "traceback"}
+    return [(arguments["classifier_name"], random_state.randint(100),
+             os.getpid())], {}
+
+
+def fake_benchmark_init(directory, classification_indices, labels,
+                        labels_dictionary, k_folds, dataset_var):
+    return [], list(labels_dictionary.values())
+
+
+def fake_queue_worker(queue_dir):
+    TaskQueue(queue_dir, poll_interval=0.05).work(fake_exec_one_task,
+                                                   idle_timeout=1)
+
+
+class Test_tasks(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        argument_dictionaries = {
+            "monoview": [{"classifier_name": "fast", "view_name": "v0"},
+                         {"classifier_name": "slow", "view_name": "v0"},
+                         {"classifier_name": "failing", "view_name": "v0"}],
+            "multiview": [{"classifier_name": "multi"}]}
+        cls.benchmark_arguments_dictionaries = [
+            {"flag": flag, "directory": "", "classification_indices": None,
+             "labels_dictionary": {0: "a", 1: "b"}, "k_folds": None,
+             "random_state": np.random.RandomState(flag),
+             "argument_dictionaries": argument_dictionaries}
+            for flag in range(3)]
+        cls.durations = {"slow-v0": 10.0, "fast-v0": 1.0, "multi": 4.0}
+
+    def test_gen_tasks(self):
+        tasks = exec_classif.gen_tasks(self.benchmark_arguments_dictionaries,
+                                       self.durations)
+        self.assertEqual(len(tasks), 12)
+        self.assertEqual([task["name"] for task in tasks[:3]],
+                         ["slow-v0"] * 3)
+        self.assertEqual([task["expected_duration"] for task in tasks],
+                         sorted([task["expected_duration"] for task in tasks],
+                                reverse=True))
+        # Without history, the median of the known durations is expected
+        failing = [task for task in tasks if task["name"] == "failing-v0"]
+        self.assertEqual(failing[0]["expected_duration"], 4.0)
+        self.assertEqual(failing[0]["position"], 2)
+
+    def test_gen_tasks_no_history(self):
+        tasks = exec_classif.gen_tasks(self.benchmark_arguments_dictionaries)
+        self.assertEqual([(task["flag"], task["position"]) for task in tasks],
+                         [(flag, position) for flag in range(3)
+                          for position in range(4)])
+
+    def test_iter_tasks(self):
+        results = list(exec_classif.iter_tasks(
+            1, self.benchmark_arguments_dictionaries, None, True,
+            durations=self.durations, exec_one_task=fake_exec_one_task,
+            benchmark_init=fake_benchmark_init))
+        self.assertEqual([result[0] for result in results], [0, 1, 2])
+        for flag, benchmark_results, tracebacks in results:
+            self.assertEqual([result[0] for result in benchmark_results],
+                             ["fast", "slow", "multi"])
+            self.assertEqual(tracebacks, {"failing": "traceback"})
+            # Each task starts from the random state of its iteration
+            self.assertEqual(
+                set(result[1] for result in benchmark_results),
+                {np.random.RandomState(flag).randint(100)})
+
+    def test_iter_tasks_checkpointed(self):
+        rm_tmp()
+        benchmark_arguments_dictionaries = [
+            dict(benchmark_arguments, directory=tmp_path)
+            for benchmark_arguments in self.benchmark_arguments_dictionaries[:1]]
+        save_task_results(tmp_path, 1, "slow-v0", [("checkpointed",)], {})
+        results = list(exec_classif.iter_tasks(
+            1, benchmark_arguments_dictionaries, None, True,
+            exec_one_task=fake_exec_one_task,
+            benchmark_init=fake_benchmark_init))
+        rm_tmp()
+        self.assertEqual([result[0] for result in results[0][1]],
+                         ["fast", "checkpointed", "multi"])
+
+    def test_iter_tasks_queue(self):
+        rm_tmp()
+        queue_dir = os.path.join(tmp_path, "queue")
+        workers = [Process(target=fake_queue_worker, args=(queue_dir,))
+                   for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        queued = list(exec_classif.iter_tasks(
+            1, self.benchmark_arguments_dictionaries, None, True,
+            durations=self.durations, exec_one_task=fake_exec_one_task,
+            benchmark_init=fake_benchmark_init,
+            task_queue=TaskQueue(queue_dir, poll_interval=0.05)))
+        for worker in workers:
+            worker.join()
+        rm_tmp()
+        serial = list(exec_classif.iter_tasks(
+            1, self.benchmark_arguments_dictionaries, None, True,
+            durations=self.durations, exec_one_task=fake_exec_one_task,
+            benchmark_init=fake_benchmark_init))
+        self.assertEqual(
+            [[flag, [result[:2] for result in benchmark_results], tracebacks]
+             for flag, benchmark_results, tracebacks in serial],
+            [[flag, [result[:2] for result in benchmark_results], tracebacks]
+             for flag, benchmark_results, tracebacks in queued])
+        self.assertNotIn(os.getpid(), [result[2] for _, benchmark_results, _
+                                       in queued
+                                       for result in benchmark_results])
+
+    def test_iter_tasks_multicore(self):
+        serial = list(exec_classif.iter_tasks(
+            1, self.benchmark_arguments_dictionaries, None, True,
+            durations=self.durations, exec_one_task=fake_exec_one_task,
+            benchmark_init=fake_benchmark_init))
+        parallel = list(exec_classif.iter_tasks(
+            2, self.benchmark_arguments_dictionaries, None, True,
+            durations=self.durations, exec_one_task=fake_exec_one_task,
+            benchmark_init=fake_benchmark_init))
+        self.assertEqual(
+            [[flag, [result[:2] for result in benchmark_results], tracebacks]
+             for flag, benchmark_results, tracebacks in serial],
+            [[flag, [result[:2] for result in benchmark_results], tracebacks]
+             for flag, benchmark_results, tracebacks in parallel])
+        self.assertNotIn(os.getpid(), [result[2] for _, benchmark_results, _
+                                       in parallel
+                                       for result in benchmark_results])
+
+
+class Test_group_by_view(unittest.TestCase):
+
+    def test_simple(self):
+        monoview_arguments = [
+            {"classifier_name": classifier_name, "view_index": view_index}
+            for view_index in [1, 0] for classifier_name in ["a", "b"]]
+        monoview_arguments.append({"classifier_name": "c", "view_index": 1})
+        groups = exec_classif.group_by_view(monoview_arguments)
+        self.assertEqual([[index for index, _ in group] for group in groups],
+                         [[0, 1, 4], [2, 3]])
+        self.assertEqual(groups[1][0][1], monoview_arguments[2])
+
+
+class Test_get_view_loader(unittest.TestCase):
+
+    def test_lazy(self):
+        load, loaded = exec_classif.get_view_loader(
+            test_dataset, 1, [np.array([0, 2, 4]), np.array([1, 3])])
+        self.assertEqual(loaded, [])
+        X, Y, (X_train, y_train, X_test, y_test) = load()
+        np.testing.assert_array_equal(X_train,
+                                      test_dataset.get_v(1, [0, 2, 4]))
+        self.assertIs(load()[0], X)
+        self.assertEqual(len(loaded), 1)
+
+
+def fake_run_experiment(random_state=None, arguments=None, **kwargs):
+    fake_run_experiment.ran.append(arguments["classifier_name"])
+    return arguments["classifier_name"], random_state.randint(1000)
+
+
+class Test_result_cache(unittest.TestCase):
+
+    def setUp(self):
+        rm_tmp()
+        self.run_experiment = exec_classif.run_experiment
+        exec_classif.run_experiment = fake_run_experiment
+
+    def tearDown(self):
+        exec_classif.run_experiment = self.run_experiment
+        rm_tmp()
+
+    def run_benchmark(self, classifier_names, result_cache):
+        fake_run_experiment.ran = []
+        directory = os.path.join(tmp_path, "_".join(classifier_names), "")
+        argument_dictionaries = {
+            "monoview": [{"classifier_name": classifier_name,
+                          "view_name": view_name, "view_index": view_index}
+                         for view_name, view_index in [("ViewN0", 0),
+                                                       ("ViewN1", 1)]
+                         for classifier_name in classifier_names],
+            "multiview": [{"classifier_name": "multi_" + classifier_name}
+                          for classifier_name in classifier_names]}
+        _, results, _ = exec_classif.exec_one_benchmark_mono_core(
+            dataset_var=test_dataset, labels_dictionary={0: "a", 1: "b"},
+            directory=directory,
+            classification_indices=[np.array([0, 1, 2, 3]), np.array([4])],
+            args={"prefetch_views": 0, "hps_iter": 1},
+            k_folds=KFold(n_splits=2), random_state=np.random.RandomState(42),
+            hyper_param_search="None", metrics={"accuracy_score": {}},
+            argument_dictionaries=argument_dictionaries, flag=0,
+            labels=test_dataset.get_labels(), result_cache=result_cache)
+        return dict(results), fake_run_experiment.ran
+
+    def test_added_classifier(self):
+        result_cache = ResultCache(os.path.join(tmp_path, "cache"), 10 ** 6,
+                                   "fingerprint")
+        results, ran = self.run_benchmark(["a", "c"], result_cache)
+        self.assertEqual(len(ran), 6)
+        added_results, ran = self.run_benchmark(["a", "b", "c"],
+                                                result_cache)
+        # Only the experiments of the added classifier are run
+        self.assertEqual(sorted(ran), ["b", "b", "multi_b"])
+        for classifier_name, score in results.items():
+            self.assertEqual(added_results[classifier_name], score)
+
+
 def fakeExecMono(directory, name, labels_names, classification_indices, k_folds,
                  coreIndex, type, pathF, random_state, labels,
                  hyper_param_search="try", metrics="try", n_iter=1, **arguments):
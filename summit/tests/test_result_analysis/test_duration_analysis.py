@@ -1,7 +1,9 @@
+import os
 import unittest
 import numpy as np
 import pandas as pd
 
+from summit.tests.utils import rm_tmp, tmp_path
 from summit.multiview_platform.result_analysis import duration_analysis
 
 
@@ -37,3 +39,30 @@ class Test_get_duration(unittest.TestCase):
                                                    data=np.array([np.array([10, 12, 15]),
                                                                   np.array([1, 2, 5])]),
                                                    dtype=object))
+
+
+class Test_load_durations(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rm_tmp()
+        for run_index, hps in enumerate([10, 20]):
+            directory = os.path.join(tmp_path, "started_" + str(run_index),
+                                     "iter_1")
+            os.makedirs(directory)
+            pd.DataFrame(index=["test1", "test2"],
+                         columns=["hps", "fit", "pred"],
+                         data=[[hps, 2, 1], [1, 1, 1]]).to_csv(
+                os.path.join(directory, "db-durations_dataframe.csv"))
+
+    def test_simple(self):
+        durations = duration_analysis.load_durations(tmp_path, "db")
+        self.assertEqual(durations, {"test1": 18.0, "test2": 3.0})
+
+    def test_no_history(self):
+        self.assertEqual(duration_analysis.load_durations(tmp_path, "other"),
+                         {})
+
+    @classmethod
+    def tearDownClass(cls):
+        rm_tmp()
@@ -5,6 +5,7 @@ import h5py
 import numpy as np
 
 from summit.multiview_platform.utils import get_multiview_db
+from summit.multiview_platform.utils.dataset import write_npy_dataset
 from summit.tests.utils import rm_tmp, tmp_path
 
 
@@ -78,6 +79,43 @@ class Test_get_classic_db_hdf5(unittest.TestCase):
         rm_tmp()
 
 
+class Test_get_classic_db_npy(unittest.TestCase):
+
+    def setUp(self):
+        rm_tmp()
+        os.mkdir(tmp_path)
+        self.rs = np.random.RandomState(42)
+        self.nb_class = 3
+        self.views = [self.rs.randint(0, 10, size=(6, 7)) for _ in range(3)]
+        self.labels = np.array([0, 1, 2, 0, 1, 2])
+        self.view_names = ["ViewN" + str(index) for index in
+                           range(len(self.views))]
+        write_npy_dataset(os.path.join(tmp_path, "test.npy"), self.views,
+                          self.labels, view_names=self.view_names)
+
+    def test_simple(self):
+        dataset, labels_dictionary, dataset_name = get_multiview_db.get_classic_db_npy(
+            ["ViewN2"], tmp_path, "test", 2, ["0", "2"],
+            self.rs, path_for_new=tmp_path)
+        self.assertEqual(dataset.nb_view, 1)
+        self.assertEqual(labels_dictionary, {0: "0", 1: "2"})
+        self.assertEqual(dataset_name, "test")
+        self.assertEqual(dataset.get_nb_samples(), 4)
+        np.testing.assert_array_equal(dataset.get_v(0),
+                                      self.views[2][[0, 2, 3, 5]])
+
+    def test_asked_the_whole_dataset(self):
+        dataset, labels_dictionary, dataset_name = get_multiview_db.get_classic_db_npy(
+            None, tmp_path, "test", self.nb_class, None,
+            self.rs, path_for_new=tmp_path, full=True)
+        self.assertEqual(dataset_name, "test")
+        self.assertEqual(dataset.nb_view, 3)
+        self.assertEqual(labels_dictionary, {0: "0", 1: "1", 2: "2"})
+
+    def tearDown(self):
+        rm_tmp()
+
+
 class Test_get_classic_db_csv(unittest.TestCase):
 
     def setUp(self):
@@ -117,6 +155,32 @@ class Test_get_classic_db_csv(unittest.TestCase):
         self.assertEqual(dataset.get_nb_samples(), 3)
         self.assertEqual(dataset.get_nb_class(), 2)
 
+    def test_csv_to_hdf5(self):
+        hdf5_path = get_multiview_db.csv_to_hdf5(self.pathF, self.nameDB,
+                                                 block_size=3, n_jobs=2)
+        with h5py.File(hdf5_path, "r") as hdf5_file:
+            self.assertEqual(hdf5_file["Metadata"].attrs["nbView"], 4)
+            for view_index, data in enumerate(self.datas):
+                view_dataset = hdf5_file["View" + str(view_index)]
+                self.assertEqual(view_dataset.attrs["name"],
+                                 "test_view_" + str(view_index))
+                self.assertEqual(view_dataset.maxshape, (None, 20))
+                self.assertEqual(view_dataset.compression, "lzf")
+                np.testing.assert_array_equal(view_dataset[()], data)
+
+    def test_fingerprint(self):
+        hdf5_path = get_multiview_db.csv_to_hdf5(self.pathF, self.nameDB)
+        with h5py.File(hdf5_path, "a") as hdf5_file:
+            hdf5_file["Metadata"].attrs["marker"] = True
+        get_multiview_db.csv_to_hdf5(self.pathF, self.nameDB)
+        with h5py.File(hdf5_path, "r") as hdf5_file:
+            self.assertIn("marker", hdf5_file["Metadata"].attrs)
+        view_path = os.path.join(self.pathF, "Views", "test_view_0.csv")
+        os.utime(view_path, ns=(0, 0))
+        get_multiview_db.csv_to_hdf5(self.pathF, self.nameDB)
+        with h5py.File(hdf5_path, "r") as hdf5_file:
+            self.assertNotIn("marker", hdf5_file["Metadata"].attrs)
+
     @classmethod
     def tearDown(self):
         rm_tmp()
@@ -1,7 +1,13 @@
+import pickle
+import sys
+import threading
+import time
 import unittest
+from concurrent.futures import ProcessPoolExecutor
 import h5py
 import numpy as np
 import os
+from scipy import sparse
 
 from summit.tests.utils import rm_tmp, tmp_path
 from summit.multiview_platform.utils import dataset
@@ -98,10 +104,83 @@ class Test_Dataset(unittest.TestCase):
                               ["ViewN0"], tmp_path)
         self.assertEqual(dataset_object.nb_view, 1)
         np.testing.assert_array_equal(dataset_object.get_labels(), [0, 1, 0])
+        self.assertEqual(dataset_object.get_nb_samples(), 3)
+        self.assertEqual(dataset_object.get_view_dict(), {"ViewN0": 0})
+        self.assertEqual(dataset_object.get_label_names(), ["0", "1"])
+        np.testing.assert_array_equal(dataset_object.get_v(0),
+                                      self.views[0][[1, 2, 3]])
+        np.testing.assert_array_equal(dataset_object.get_v(0, [2, 0]),
+                                      self.views[0][[3, 1]])
+        self.assertFalse(os.path.isfile(
+            os.path.join(tmp_path, "test_filter_temp_filter.hdf5")))
+        dataset_object.filter(np.array([1, 0]), ["0", "1"], [1, 2],
+                              None, tmp_path)
+        np.testing.assert_array_equal(dataset_object.get_v(0),
+                                      self.views[0][[2, 3]])
+        self.assertEqual(dataset_object.sample_ids, ["ID_2", "ID_3"])
         dataset_object.dataset.close()
-        os.remove(os.path.join(tmp_path, "test_filter_temp_filter.hdf5"))
         os.remove(os.path.join(tmp_path, "test_filter.hdf5"))
 
+    def test_pickle(self):
+        dataset_object = dataset.HDF5Dataset(views=self.views,
+                                             labels=self.labels,
+                                             file_name="test_pickle.hdf5",
+                                             view_names=self.view_names,
+                                             path=tmp_path,
+                                             labels_names=self.labels_names,
+                                             view_cache_size=10 ** 6)
+        dataset_object.filter(np.array([0, 1]), ["0", "1"], [3, 0],
+                              ["ViewN1"], tmp_path)
+        dataset_object.get_v(0)
+        unpickled = pickle.loads(pickle.dumps(dataset_object))
+        self.assertFalse(unpickled.is_temp)
+        self.assertEqual(unpickled.dataset.mode, "r")
+        self.assertEqual(unpickled.get_cache_info()["nb_bytes"], 0)
+        np.testing.assert_array_equal(unpickled.get_v(0),
+                                      self.views[1][[3, 0]])
+        unpickled.dataset.close()
+        dataset_object.rm()
+
+    def test_materialize(self):
+        dataset_object = dataset.HDF5Dataset(views=self.views,
+                                             labels=self.labels,
+                                             file_name="test_materialize.hdf5",
+                                             view_names=self.view_names,
+                                             path=tmp_path,
+                                             labels_names=self.labels_names)
+        dataset_object.filter(np.array([1, 0]), ["a", "b"], [4, 1],
+                              ["ViewN2"], tmp_path)
+        self.assertTrue(dataset_object.is_filtered())
+        dataset_object.materialize(tmp_path)
+        self.assertFalse(dataset_object.is_filtered())
+        self.assertTrue(dataset_object.is_temp)
+        self.assertEqual(dataset_object.get_name(),
+                         "test_materialize_temp_filter")
+        self.assertEqual(dataset_object.dataset["View0"].shape,
+                         (2, self.nb_attr))
+        np.testing.assert_array_equal(dataset_object.get_v(0),
+                                      self.views[2][[4, 1]])
+        np.testing.assert_array_equal(dataset_object.get_labels(), [1, 0])
+        self.assertEqual(dataset_object.get_label_names(), ["a", "b"])
+        self.assertEqual(dataset_object.sample_ids, ["ID_4", "ID_1"])
+        dataset_object.rm()
+        self.assertFalse(os.path.isfile(
+            os.path.join(tmp_path, "test_materialize.hdf5")))
+
+    def test_get_fingerprint(self):
+        hdf5_dataset = dataset.HDF5Dataset(hdf5_file=self.dataset_file)
+        ram_dataset = dataset.RAMDataset(views=[view.copy()
+                                                for view in self.views],
+                                         labels=self.labels,
+                                         are_sparse=self.are_sparse,
+                                         view_names=self.view_names,
+                                         labels_names=self.labels_names)
+        fingerprint = hdf5_dataset.get_fingerprint(block_size=3)
+        self.assertEqual(fingerprint, hdf5_dataset.get_fingerprint())
+        self.assertEqual(fingerprint, ram_dataset.get_fingerprint())
+        ram_dataset.views[1] = ram_dataset.views[1] + 1
+        self.assertNotEqual(fingerprint, ram_dataset.get_fingerprint())
+
     def test_for_hdf5_file(self):
         dataset_object = dataset.HDF5Dataset(hdf5_file=self.dataset_file)
 
@@ -134,6 +213,30 @@ class Test_Dataset(unittest.TestCase):
         view = dataset.HDF5Dataset(
             hdf5_file=self.dataset_file).get_v(1, [0, 1, 2])
         np.testing.assert_array_equal(view, self.views[1][[0, 1, 2, ], :])
+        view = dataset.HDF5Dataset(
+            hdf5_file=self.dataset_file).get_v(1, [4, 0])
+        np.testing.assert_array_equal(view, self.views[1][[4, 0], :])
+
+    def test_get_v_cached(self):
+        dataset_object = dataset.HDF5Dataset(hdf5_file=self.dataset_file,
+                                             view_cache_size=10000)
+        view = dataset_object.get_v(1, [4, 0])
+        np.testing.assert_array_equal(view, self.views[1][[4, 0], :])
+        view = dataset_object.get_v(1)
+        np.testing.assert_array_equal(view, self.views[1])
+        info = dataset_object.get_cache_info()
+        self.assertEqual((info["hits"], info["misses"]), (1, 1))
+        self.assertEqual(info["nb_bytes"], self.views[1].nbytes)
+
+    def test_get_v_cached_subsets(self):
+        dataset_object = dataset.HDF5Dataset(hdf5_file=self.dataset_file)
+        dataset_object.enable_cache(self.views[1].nbytes - 1)
+        view = dataset_object.get_v(1, [4, 0])
+        view = dataset_object.get_v(1, [4, 0])
+        np.testing.assert_array_equal(view, self.views[1][[4, 0], :])
+        info = dataset_object.get_cache_info()
+        self.assertEqual((info["hits"], info["misses"]), (1, 1))
+        self.assertEqual(info["nb_bytes"], view.nbytes)
 
     def test_get_nb_class(self):
         nb_class = dataset.HDF5Dataset(
@@ -239,7 +342,6 @@ class Test_Dataset(unittest.TestCase):
         self.assertEqual(names, {0: '0', 1: '1'})
         self.assertEqual(dataset_object.nb_view, 1)
         dataset_object.dataset.close()
-        os.remove(os.path.join(tmp_path, "test_filter_temp_filter.hdf5"))
         os.remove(os.path.join(tmp_path, "test_filter.hdf5"))
 
     def test_add_gaussian_noise(self):
@@ -348,7 +450,25 @@ class TestRAMDataset(unittest.TestCase):
         dataset_object.filter("", "", np.array([1, 2]), ["ViewN0", "ViewN1"],
                               path=None)
         self.assertEqual(dataset_object.nb_view, 2)
-        self.assertEqual(dataset_object.labels.shape, (2, 1))
+        self.assertEqual(dataset_object.labels.shape, (2,))
+        unique_labels = np.unique(self.labels[[1, 2]])
+        np.testing.assert_array_equal(
+            dataset_object.labels,
+            np.searchsorted(unique_labels, self.labels[[1, 2]]))
+        self.assertEqual(dataset_object.labels_names,
+                         [str(label) for label in unique_labels])
+
+    def test_select_labels(self):
+        dataset_object = dataset.RAMDataset(views=self.views,
+                                            labels=np.array([2, 0, 1, 2, 0]),
+                                            are_sparse=self.are_sparse,
+                                            view_names=self.view_names,
+                                            labels_names=["a", "b", "c"])
+        labels, label_names, indices = dataset_object.select_labels(
+            ["c", b"a"])
+        np.testing.assert_array_equal(indices, [0, 1, 3, 4])
+        np.testing.assert_array_equal(labels, [0, 1, 0, 1])
+        self.assertEqual(label_names, ["c", b"a"])
 
     def test_get_view_dict(self):
         dataset_object = dataset.RAMDataset(views=self.views,
@@ -369,6 +489,532 @@ class TestRAMDataset(unittest.TestCase):
         self.assertEqual(n, None)
 
 
+class Test_SparseDataset(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rm_tmp()
+        os.mkdir(tmp_path)
+        cls.rs = np.random.RandomState(42)
+        cls.nb_samples = 10
+        cls.views = [sparse.random(cls.nb_samples, 8, density=0.2,
+                                   format="csr", random_state=cls.rs),
+                     cls.rs.randint(0, 10, size=(cls.nb_samples, 3))]
+        cls.labels = cls.rs.randint(0, 2, cls.nb_samples)
+        cls.view_names = ["sparse_view", "dense_view"]
+        cls.dataset_object = dataset.HDF5Dataset(views=cls.views,
+                                                 labels=cls.labels,
+                                                 file_name="sparse.hdf5",
+                                                 view_names=cls.view_names,
+                                                 path=tmp_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.dataset_object.dataset.close()
+        rm_tmp()
+
+    def test_storage(self):
+        self.assertEqual(self.dataset_object.are_sparse, [True, False])
+        self.assertEqual(
+            sorted(self.dataset_object.dataset["View0"].keys()),
+            ["data", "indices", "indptr"])
+
+    def test_get_v(self):
+        view = self.dataset_object.get_v(0)
+        self.assertTrue(sparse.isspmatrix_csr(view))
+        np.testing.assert_array_equal(view.toarray(), self.views[0].toarray())
+        view = self.dataset_object.get_v(0, [7, 2, 3, 7])
+        self.assertTrue(sparse.isspmatrix_csr(view))
+        np.testing.assert_array_equal(view.toarray(),
+                                      self.views[0][[7, 2, 3, 7]].toarray())
+
+    def test_to_numpy_array(self):
+        array, limits = self.dataset_object.to_numpy_array(
+            sample_indices=[1, 4], view_indices=[0, 1])
+        self.assertTrue(sparse.isspmatrix_csr(array))
+        self.assertEqual(limits, [0, 8, 11])
+        np.testing.assert_array_equal(
+            array.toarray(),
+            np.concatenate((self.views[0][[1, 4]].toarray(),
+                            self.views[1][[1, 4]]), axis=1))
+
+    def test_copy_view(self):
+        new_dataset = h5py.File(os.path.join(tmp_path, "sparse_copy.hdf5"), "w")
+        self.dataset_object.copy_view(target_dataset=new_dataset,
+                                      source_view_name="sparse_view",
+                                      target_view_index=0,
+                                      sample_indices=[0, 5, 6])
+        self.assertTrue(new_dataset["View0"].attrs["sparse"])
+        self.assertEqual(tuple(new_dataset["View0"].attrs["shape"]), (3, 8))
+        copied = dataset.read_sparse_rows(new_dataset["View0"], [0, 1, 2])
+        np.testing.assert_array_equal(copied.toarray(),
+                                      self.views[0][[0, 5, 6]].toarray())
+        new_dataset.close()
+
+    def test_read_no_rows(self):
+        rows = dataset.read_sparse_rows(
+            self.dataset_object.dataset["View0"], np.array([], dtype=int))
+        self.assertTrue(sparse.isspmatrix_csr(rows))
+        self.assertEqual(rows.shape, (0, 8))
+
+    def test_ram_dataset(self):
+        ram_dataset = dataset.RAMDataset(views=self.views, labels=self.labels,
+                                         view_names=self.view_names,
+                                         labels_names=["0", "1"])
+        view = ram_dataset.get_v(0, [3, 1])
+        self.assertTrue(sparse.issparse(view))
+        np.testing.assert_array_equal(view.toarray(),
+                                      self.views[0][[3, 1]].toarray())
+        ram_dataset.filter(None, None, np.array([0, 2]), ["dense_view",
+                                                          "sparse_view"])
+        self.assertEqual(ram_dataset.are_sparse, [False, True])
+
+    def test_extract_subset(self):
+        subset = dataset.extract_subset(self.views[0].tocsc(), [2, 0])
+        self.assertTrue(sparse.isspmatrix_csr(subset))
+        np.testing.assert_array_equal(subset.toarray(),
+                                      self.views[0][[2, 0]].toarray())
+
+
+class Test_NPYDataset(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rm_tmp()
+        os.mkdir(tmp_path)
+        cls.rs = np.random.RandomState(42)
+        cls.nb_samples = 6
+        cls.views = [cls.rs.randint(0, 10, size=(cls.nb_samples, 4)),
+                     sparse.random(cls.nb_samples, 5, density=0.3,
+                                   format="csr", random_state=cls.rs)]
+        cls.labels = np.array([0, 1, 2, 0, 1, 2])
+        cls.view_names = ["dense_view", "sparse_view"]
+        cls.labels_names = ["a", "b", "c"]
+        cls.dataset_object = dataset.NPYDataset(views=cls.views,
+                                                labels=cls.labels,
+                                                dir_name="test.npy",
+                                                view_names=cls.view_names,
+                                                path=tmp_path,
+                                                labels_names=cls.labels_names)
+
+    @classmethod
+    def tearDownClass(cls):
+        rm_tmp()
+
+    def test_init(self):
+        self.assertEqual(self.dataset_object.get_name(), "test")
+        self.assertEqual(self.dataset_object.get_nb_samples(), 6)
+        self.assertEqual(self.dataset_object.get_view_dict(),
+                         {"dense_view": 0, "sparse_view": 1})
+        self.assertEqual(self.dataset_object.get_label_names(),
+                         ["a", "b", "c"])
+        self.assertEqual(self.dataset_object.sample_ids[0], "ID_0")
+        self.assertIsInstance(self.dataset_object.views[0], np.memmap)
+
+    def test_get_v(self):
+        np.testing.assert_array_equal(self.dataset_object.get_v(0, [4, 1, 4]),
+                                      self.views[0][[4, 1, 4]])
+        view = self.dataset_object.get_v(1, [5, 0])
+        self.assertTrue(sparse.issparse(view))
+        np.testing.assert_array_equal(view.toarray(),
+                                      self.views[1][[5, 0]].toarray())
+        full_view = self.dataset_object.get_v(0)
+        self.assertFalse(full_view.flags.writeable)
+
+    def test_get_view_footprint(self):
+        dense_view = np.asarray(self.views[0])
+        self.assertEqual(self.dataset_object.get_view_footprint(0),
+                         (4, dense_view.nbytes))
+        sparse_view = self.views[1]
+        self.assertEqual(self.dataset_object.get_view_footprint(1),
+                         (5, sparse_view.data.nbytes
+                          + sparse_view.indices.nbytes
+                          + sparse_view.indptr.nbytes))
+        ram_dataset = dataset.RAMDataset(
+            views=[sparse.csc_matrix(sparse_view)], labels=self.labels,
+            view_names=["sparse_view"], labels_names=self.labels_names)
+        self.assertEqual(ram_dataset.get_view_footprint(0),
+                         self.dataset_object.get_view_footprint(1))
+
+    def test_pickle(self):
+        unpickled = pickle.loads(pickle.dumps(self.dataset_object))
+        self.assertIsInstance(unpickled.views[0], np.memmap)
+        np.testing.assert_array_equal(unpickled.get_v(0), self.views[0])
+
+    def test_filter(self):
+        dataset_object = dataset.NPYDataset(
+            npy_dir=os.path.join(tmp_path, "test.npy"))
+        dataset_object.filter(np.array([0, 1]), ["b", "c"],
+                              np.array([1, 5]), ["sparse_view"], tmp_path)
+        self.assertEqual(dataset_object.get_name(), "test")
+        self.assertEqual(dataset_object.get_view_dict(), {"sparse_view": 0})
+        self.assertEqual(dataset_object.get_label_names(), ["b", "c"])
+        self.assertEqual(dataset_object.sample_ids, ["ID_1", "ID_5"])
+        np.testing.assert_array_equal(dataset_object.get_v(0).toarray(),
+                                      self.views[1][[1, 5]].toarray())
+        self.assertFalse(os.path.isdir(os.path.join(tmp_path,
+                                                    "test_temp_filter.npy")))
+        filtered_view = dataset_object.get_v(0)
+        self.assertEqual(dataset_object.get_view_footprint(0),
+                         (5, filtered_view.data.nbytes
+                          + filtered_view.indices.nbytes
+                          + filtered_view.indptr.nbytes))
+        dataset_object.materialize(tmp_path)
+        self.assertEqual(dataset_object.get_name(), "test_temp_filter")
+        np.testing.assert_array_equal(dataset_object.get_v(0, [1]).toarray(),
+                                      self.views[1][[5]].toarray())
+        dataset_object.rm()
+        self.assertFalse(os.path.isdir(os.path.join(tmp_path,
+                                                    "test_temp_filter.npy")))
+
+    def test_hdf5_to_npy(self):
+        hdf5_dataset = dataset.HDF5Dataset(views=self.views,
+                                           labels=self.labels,
+                                           file_name="converted.hdf5",
+                                           view_names=self.view_names,
+                                           path=tmp_path,
+                                           labels_names=self.labels_names)
+        hdf5_dataset.dataset.close()
+        npy_dir = dataset.hdf5_to_npy(os.path.join(tmp_path, "converted.hdf5"),
+                                      block_size=4)
+        self.assertEqual(npy_dir, os.path.join(tmp_path, "converted.npy"))
+        dataset_object = dataset.NPYDataset(npy_dir=npy_dir)
+        self.assertEqual(dataset_object.view_names, self.view_names)
+        self.assertEqual(dataset_object.get_label_names(), self.labels_names)
+        np.testing.assert_array_equal(dataset_object.get_labels(),
+                                      self.labels)
+        np.testing.assert_array_equal(dataset_object.get_v(0), self.views[0])
+        np.testing.assert_array_equal(dataset_object.get_v(1).toarray(),
+                                      self.views[1].toarray())
+
+
+def sum_shared_view(dataset_object):
+    return dataset_object.get_v(0).sum()
+
+
+class Test_SharedMemoryDataset(unittest.TestCase):
+
+    def setUp(self):
+        self.rs = np.random.RandomState(42)
+        self.views = [self.rs.randint(0, 10, size=(6, 4)),
+                      sparse.random(6, 5, density=0.3, format="csr",
+                                    random_state=self.rs)]
+        self.labels = np.array([0, 1, 2, 0, 1, 2])
+        self.ram_dataset = dataset.RAMDataset(views=self.views,
+                                              labels=self.labels,
+                                              view_names=["dense", "sparse"],
+                                              labels_names=["a", "b", "c"],
+                                              sample_ids=np.array(
+                                                  ["s" + str(i)
+                                                   for i in range(6)]),
+                                              name="ram")
+        self.dataset_object = dataset.SharedMemoryDataset(self.ram_dataset)
+
+    def tearDown(self):
+        self.dataset_object.rm()
+
+    def test_init(self):
+        self.assertEqual(self.dataset_object.get_name(), "ram")
+        self.assertEqual(self.dataset_object.get_nb_samples(), 6)
+        self.assertEqual(self.dataset_object.get_view_dict(),
+                         {"dense": 0, "sparse": 1})
+        self.assertEqual(self.dataset_object.get_label_names(),
+                         ["a", "b", "c"])
+        self.assertEqual(self.dataset_object.are_sparse, [False, True])
+
+    def test_get_v(self):
+        np.testing.assert_array_equal(self.dataset_object.get_v(0, [3, 1]),
+                                      self.views[0][[3, 1]])
+        np.testing.assert_array_equal(
+            self.dataset_object.get_v(1, [5, 0]).toarray(),
+            self.views[1][[5, 0]].toarray())
+        self.assertFalse(self.dataset_object.get_v(0).flags.writeable)
+
+    def test_pickle(self):
+        state = pickle.dumps(self.dataset_object)
+        self.assertLess(len(state), 2000)
+        attached = pickle.loads(state)
+        self.assertFalse(attached.is_temp)
+        np.testing.assert_array_equal(attached.get_v(1).toarray(),
+                                      self.views[1].toarray())
+        attached.rm()
+        np.testing.assert_array_equal(self.dataset_object.get_v(0),
+                                      self.views[0])
+
+    def test_worker_process(self):
+        with ProcessPoolExecutor(1) as executor:
+            view_sum = executor.submit(sum_shared_view,
+                                       self.dataset_object).result()
+        self.assertEqual(view_sum, self.views[0].sum())
+
+    def test_filter(self):
+        segment_names = list(self.dataset_object.segments.keys())
+        self.dataset_object.filter(np.array([0, 1]), ["b", "c"],
+                                   np.array([1, 5]), ["sparse"])
+        self.assertEqual(self.dataset_object.get_view_dict(), {"sparse": 0})
+        self.assertEqual(self.dataset_object.get_label_names(), ["b", "c"])
+        self.assertEqual(self.dataset_object.sample_ids, ["s1", "s5"])
+        np.testing.assert_array_equal(
+            self.dataset_object.get_v(0).toarray(),
+            self.views[1][[1, 5]].toarray())
+        self.assertRaises(FileNotFoundError, dataset.attach_shared_memory,
+                          segment_names[0])
+
+    def test_share_views_failure(self):
+        segment_names = []
+
+        def failing_views():
+            yield self.views[0]
+            segment_names.extend(self.dataset_object.segments.keys())
+            raise MemoryError()
+
+        self.dataset_object.release_segments()
+        self.assertRaises(MemoryError, self.dataset_object.share_views,
+                          failing_views())
+        self.assertEqual(len(segment_names), 1)
+        self.assertEqual(self.dataset_object.segments, {})
+        self.assertRaises(FileNotFoundError, dataset.attach_shared_memory,
+                          segment_names[0])
+
+
+class Test_FoldDataset(unittest.TestCase):
+
+    def setUp(self):
+        self.rs = np.random.RandomState(42)
+        self.views = [self.rs.randint(0, 10, size=(8, 4)),
+                      sparse.random(8, 5, density=0.3, format="csr",
+                                    random_state=self.rs)]
+        self.ram_dataset = dataset.RAMDataset(views=self.views,
+                                              labels=np.array([0, 1] * 4),
+                                              view_names=["dense", "sparse"],
+                                              labels_names=["a", "b"],
+                                              name="ram")
+        self.train_indices = np.array([6, 0, 3, 5])
+        self.test_indices = np.array([1, 7])
+
+    def test_get_v(self):
+        fold_dataset = dataset.FoldDataset(self.ram_dataset,
+                                           self.train_indices,
+                                           self.test_indices)
+        fold_dataset.materialize(0)
+        fold_dataset.materialize(1)
+        np.testing.assert_array_equal(
+            fold_dataset.get_v(0, self.train_indices),
+            self.views[0][self.train_indices])
+        np.testing.assert_array_equal(
+            fold_dataset.get_v(0, self.test_indices),
+            self.views[0][self.test_indices])
+        np.testing.assert_array_equal(
+            fold_dataset.get_v(1, [7, 0]).toarray(),
+            self.views[1][[7, 0]].toarray())
+        self.assertEqual(fold_dataset.hits, 3)
+        # Out of the fold, or the whole view, is read from the dataset
+        np.testing.assert_array_equal(fold_dataset.get_v(0, [2, 0]),
+                                      self.views[0][[2, 0]])
+        np.testing.assert_array_equal(fold_dataset.get_v(0), self.views[0])
+        self.assertEqual(fold_dataset.misses, 2)
+        self.assertEqual(fold_dataset.get_view_dict(),
+                         {"dense": 0, "sparse": 1})
+        np.testing.assert_array_equal(
+            fold_dataset.get_labels(self.test_indices), [1, 1])
+        fold_dataset.clear()
+        self.assertEqual(fold_dataset.nb_bytes, 0)
+        fold_dataset.get_v(0, self.train_indices)
+        self.assertEqual(fold_dataset.misses, 3)
+
+    def test_read_only(self):
+        fold_dataset = dataset.FoldDataset(self.ram_dataset,
+                                           self.train_indices,
+                                           self.test_indices)
+        fold_dataset.materialize(0)
+        train = fold_dataset.get_v(0, self.train_indices)
+        self.assertFalse(train.flags.writeable)
+        with self.assertRaises(ValueError):
+            train[0, 0] = -1
+        np.testing.assert_array_equal(
+            fold_dataset.get_v(0, self.train_indices),
+            self.views[0][self.train_indices])
+
+    def test_filter(self):
+        fold_dataset = dataset.FoldDataset(self.ram_dataset,
+                                           self.train_indices,
+                                           self.test_indices)
+        fold_dataset.materialize(0)
+        fold_dataset.filter(np.array([1, 0, 1]), ["a", "b"],
+                            np.array([1, 2, 3]), ["dense"])
+        self.assertEqual(fold_dataset.blocks, {})
+        self.assertEqual(fold_dataset.get_nb_samples(), 3)
+        self.assertEqual(fold_dataset.get_view_dict(), {"dense": 0})
+        np.testing.assert_array_equal(fold_dataset.get_v(0, [2, 0]),
+                                      self.views[0][[3, 1]])
+
+    def test_materialize_folds(self):
+        folds = [(self.train_indices, self.test_indices),
+                 (self.test_indices, self.train_indices)]
+        view_bytes = self.ram_dataset.get_view_footprint(0)[1]
+        fold_datasets = dataset.materialize_folds(self.ram_dataset, folds,
+                                                  view_indices=[0],
+                                                  max_bytes=view_bytes * 1.5)
+        self.assertEqual([list(fold_dataset.blocks)
+                          for fold_dataset in fold_datasets], [[0], [0]])
+        fold_datasets = dataset.materialize_folds(self.ram_dataset, folds,
+                                                  view_indices=[0],
+                                                  max_bytes=view_bytes / 2)
+        self.assertEqual([list(fold_dataset.blocks)
+                          for fold_dataset in fold_datasets], [[], []])
+        fold_datasets = dataset.materialize_folds(
+            self.ram_dataset, folds, view_indices=[0],
+            max_bytes=view_bytes)
+        self.assertEqual([list(fold_dataset.blocks)
+                          for fold_dataset in fold_datasets], [[0], []])
+
+
+class Test_ViewCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = dataset.ViewCache(max_bytes=200)
+        cache.put("a", np.zeros(10))
+        cache.put("b", np.zeros(10))
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("c", np.zeros(10))
+        self.assertIn("a", cache)
+        self.assertIn("c", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.get_info(), {"hits": 1, "misses": 0,
+                                            "evictions": 1, "nb_bytes": 160,
+                                            "max_bytes": 200})
+
+    def test_too_big(self):
+        cache = dataset.ViewCache(max_bytes=10)
+        cache.put("a", np.zeros(10))
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.misses, 1)
+
+    def test_threads(self):
+        cache = dataset.ViewCache(max_bytes=240)
+        errors = []
+
+        def use_cache(thread_index):
+            try:
+                for index in range(20000):
+                    key = (thread_index, index % 7)
+                    if cache.get(key) is None:
+                        cache.put(key, np.zeros(10))
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=use_cache, args=(thread_index,))
+                   for thread_index in range(8)]
+        # Switches between the threads often, to interleave their accesses
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+        self.assertEqual(errors, [])
+        self.assertEqual(cache.nb_bytes,
+                         sum(array.nbytes for array in cache.entries.values()))
+        self.assertLessEqual(cache.nb_bytes, 240)
+
+    def test_pickle(self):
+        cache = pickle.loads(pickle.dumps(dataset.ViewCache(max_bytes=200)))
+        cache.put("a", np.zeros(10))
+        self.assertIn("a", cache)
+
+
+class FakeSlowDataset():
+
+    def __init__(self, views, read_time=0.0):
+        self.views = views
+        self.read_time = read_time
+        self.reads = []
+
+    def get_v(self, view_index, sample_indices=None):
+        time.sleep(self.read_time)
+        self.reads.append(view_index)
+        if view_index >= len(self.views):
+            raise IndexError("No view " + str(view_index))
+        return self.views[view_index]
+
+
+class Test_ViewPrefetcher(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.views = [np.full((3, 2), view_index) for view_index in range(3)]
+
+    def test_ready_views(self):
+        dataset_var = FakeSlowDataset(self.views)
+        prefetcher = dataset.ViewPrefetcher(
+            dataset_var, [(view_index, None) for view_index in range(3)])
+        for view_index in range(3):
+            # Lets the thread read the next view
+            time.sleep(0.3)
+            np.testing.assert_array_equal(prefetcher.get_v(view_index),
+                                          self.views[view_index])
+        prefetcher.close()
+        self.assertEqual(prefetcher.get_info()["hits"], 3)
+        self.assertEqual(dataset_var.reads, [0, 1, 2])
+
+    def test_buffer_size(self):
+        dataset_var = FakeSlowDataset(self.views)
+        prefetcher = dataset.ViewPrefetcher(
+            dataset_var, [(view_index, None) for view_index in range(3)],
+            buffer_size=1)
+        time.sleep(0.3)
+        self.assertEqual(dataset_var.reads, [0])
+        prefetcher.get_v(0)
+        time.sleep(0.3)
+        self.assertEqual(dataset_var.reads, [0, 1])
+        prefetcher.close()
+
+    def test_discard(self):
+        dataset_var = FakeSlowDataset(self.views, read_time=0.1)
+        prefetcher = dataset.ViewPrefetcher(
+            dataset_var, [(view_index, None) for view_index in range(3)],
+            buffer_size=1)
+        # Not the next request
+        prefetcher.discard(1)
+        np.testing.assert_array_equal(prefetcher.get_v(0), self.views[0])
+        prefetcher.discard(1)
+        np.testing.assert_array_equal(prefetcher.get_v(2), self.views[2])
+        prefetcher.close()
+        # The view is not read if it is discarded before its reading starts
+        self.assertIn(dataset_var.reads, [[0, 2], [0, 1, 2]])
+        self.assertEqual(prefetcher.misses, 0)
+        self.assertEqual(prefetcher.nb_pending, 0)
+
+    def test_stall(self):
+        dataset_var = FakeSlowDataset(self.views, read_time=0.2)
+        prefetcher = dataset.ViewPrefetcher(dataset_var, [(0, None)])
+        np.testing.assert_array_equal(prefetcher.get_v(0), self.views[0])
+        prefetcher.close()
+        self.assertEqual(prefetcher.stalls, 1)
+        self.assertGreater(prefetcher.stall_time, 0.1)
+
+    def test_out_of_order(self):
+        dataset_var = FakeSlowDataset(self.views)
+        prefetcher = dataset.ViewPrefetcher(dataset_var,
+                                            [(1, None), (2, None)],
+                                            buffer_size=2)
+        np.testing.assert_array_equal(prefetcher.get_v(0), self.views[0])
+        np.testing.assert_array_equal(prefetcher.get_v(1), self.views[1])
+        prefetcher.close()
+        self.assertEqual(prefetcher.misses, 1)
+        self.assertEqual(prefetcher.hits + prefetcher.stalls, 1)
+
+    def test_error(self):
+        prefetcher = dataset.ViewPrefetcher(FakeSlowDataset(self.views),
+                                            [(5, None)])
+        with self.assertRaises(IndexError):
+            prefetcher.get_v(5)
+        prefetcher.close()
+
+
 class Test_Functions(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -412,17 +1058,108 @@ class Test_Functions(unittest.TestCase):
         cls.dataset_file.close()
         rm_tmp()
 
-    def test_datasets_already_exist(self):
-        self.assertEqual(
-            True, dataset.datasets_already_exist(
-                tmp_path, "test", 1))
-
-    def test_init_multiple_datasets(self):
-        dataset.init_multiple_datasets(tmp_path, "test0", 2)
-        self.assertTrue(os.path.isfile(os.path.join(tmp_path, 'test00.hdf5')))
-        dataset.delete_HDF5([{"args": {"pathf": tmp_path, "name": "test0"}}],
-                            2, dataset.HDF5Dataset(hdf5_file=self.dataset_file))
-        self.assertFalse(os.path.isfile(os.path.join(tmp_path, 'test00.hdf5')))
+    def test_recode_labels(self):
+        indices, labels = dataset.recode_labels(
+            np.array([3., 1., 0., 3., 2., 1.]), np.array([1, 3, 2]))
+        np.testing.assert_array_equal(indices, [0, 1, 3, 4, 5])
+        np.testing.assert_array_equal(labels, [1, 0, 1, 2, 0])
+        indices, labels = dataset.recode_labels(np.array([0, 1]),
+                                                np.array([2]))
+        self.assertEqual(indices.shape, (0,))
+        self.assertEqual(labels.shape, (0,))
+
+    def test_get_chunk_rows(self):
+        self.assertEqual(dataset.get_chunk_rows((10000, 128), 8), 256)
+        self.assertEqual(dataset.get_chunk_rows((10, 128), 8), 10)
+        self.assertEqual(dataset.get_chunk_rows((10, 10 ** 6), 8), 1)
+
+    def test_get_view_layout(self):
+        self.assertEqual(dataset.get_view_layout((10, 3), np.float64),
+                         {"dtype": np.dtype(np.float64)})
+        layout = dataset.get_view_layout((10000, 128), np.float64,
+                                         float32=True,
+                                         **dataset.TUNED_LAYOUT)
+        self.assertEqual(layout["dtype"], np.dtype(np.float32))
+        self.assertEqual(layout["chunks"], (512, 128))
+        self.assertEqual(layout["compression"], "lzf")
+        self.assertTrue(layout["shuffle"])
+        layout = dataset.get_view_layout((10, 3), np.int64, chunk_rows=4,
+                                         float32=True)
+        self.assertEqual(layout["dtype"], np.dtype(np.int64))
+        self.assertEqual(layout["chunks"], (4, 3))
+
+    def test_layout(self):
+        views = [self.rs.uniform(size=(20, 3)),
+                 sparse.random(20, 6, density=0.3, format="csr",
+                               random_state=self.rs)]
+        dataset_object = dataset.HDF5Dataset(
+            views=views, labels=np.zeros(20, dtype=int),
+            file_name="layout.hdf5", path=tmp_path,
+            layout={"chunk_rows": 8, "compression": "gzip", "float32": True})
+        self.assertEqual(dataset_object.dataset["View0"].chunks, (8, 3))
+        self.assertEqual(dataset_object.dataset["View0"].compression, "gzip")
+        self.assertEqual(dataset_object.dataset["View1"]["data"].dtype,
+                         np.float32)
+        np.testing.assert_array_almost_equal(dataset_object.get_v(0, [3, 9]),
+                                             views[0][[3, 9]])
+        np.testing.assert_array_almost_equal(
+            dataset_object.get_v(1, [2]).toarray(), views[1][[2]].toarray())
+        dataset_object.rm()
+
+    def test_repack_hdf5(self):
+        views = [self.rs.randint(0, 10, size=(30, 4)),
+                 sparse.random(30, 6, density=0.3, format="csr",
+                               random_state=self.rs)]
+        dataset_object = dataset.HDF5Dataset(views=views,
+                                             labels=np.arange(30) % 2,
+                                             file_name="repack.hdf5",
+                                             view_names=["dense", "sparse"],
+                                             path=tmp_path)
+        dataset_object.dataset.close()
+        file_path = os.path.join(tmp_path, "repack.hdf5")
+        self.assertEqual(dataset.repack_hdf5(file_path, block_size=7),
+                         file_path)
+        self.assertFalse(os.path.isfile(file_path + ".repack"))
+        with h5py.File(file_path, "r") as repacked_file:
+            self.assertEqual(repacked_file["View0"].compression, "lzf")
+            self.assertEqual(repacked_file["View0"].chunks, (30, 4))
+            self.assertTrue(repacked_file["View0"].shuffle)
+            self.assertEqual(repacked_file["View1"]["data"].compression,
+                             "lzf")
+            repacked = dataset.HDF5Dataset(hdf5_file=repacked_file)
+            self.assertEqual(repacked.view_names, ["dense", "sparse"])
+            np.testing.assert_array_equal(repacked.get_v(0), views[0])
+            np.testing.assert_array_equal(repacked.get_v(1).toarray(),
+                                          views[1].toarray())
+            np.testing.assert_array_equal(repacked.get_labels(),
+                                          np.arange(30) % 2)
+        output_path = os.path.join(tmp_path, "repack_gzip.hdf5")
+        dataset.repack_hdf5(file_path, output_path=output_path,
+                            compression="gzip", chunk_rows=5)
+        with h5py.File(output_path, "r") as repacked_file:
+            self.assertEqual(repacked_file["View0"].compression, "gzip")
+            self.assertEqual(repacked_file["View0"].chunks, (5, 4))
+        os.remove(output_path)
+        os.remove(file_path)
+
+    def test_read_rows(self):
+        view_dataset = self.dataset_file["View0"]
+        rows = dataset.read_rows(view_dataset, np.array([3, 0, 3]))
+        np.testing.assert_array_equal(rows, self.views[0][[3, 0, 3], :])
+        rows = dataset.read_rows(view_dataset, np.array([4, 1, 2, 0]))
+        np.testing.assert_array_equal(rows, self.views[0][[4, 1, 2, 0], :])
+        rows = dataset.read_rows(view_dataset, np.array([], dtype=int))
+        self.assertEqual(rows.shape, (0, self.nb_attr))
+
+    def test_delete_HDF5(self):
+        dataset_object = dataset.HDF5Dataset(views=self.views,
+                                             labels=self.labels,
+                                             file_name="test_delete.hdf5",
+                                             path=tmp_path)
+        dataset_object.is_temp = True
+        dataset.delete_HDF5(dataset_object)
+        self.assertFalse(os.path.isfile(os.path.join(tmp_path,
+                                                     "test_delete.hdf5")))
 
 
 if __name__ == '__main__':
@@ -1,3 +1,4 @@
+import logging
 import os
 import unittest
 
@@ -16,6 +17,26 @@ class Test_parseTheArgs(unittest.TestCase):
     def test_empty_args(self):
         args = execution.parse_the_args([])
 
+    def test_no_cache(self):
+        self.assertFalse(execution.parse_the_args([]).no_cache)
+        self.assertTrue(execution.parse_the_args(["--no-cache"]).no_cache)
+
+    def test_csv_options(self):
+        args = execution.parse_the_args(["--csv_block_size", "100",
+                                         "--csv_n_jobs", "4"])
+        self.assertEqual((args.csv_block_size, args.csv_n_jobs), (100, 4))
+        self.assertIsNone(execution.parse_the_args([]).csv_block_size)
+
+
+class Test_get_database_kwargs(unittest.TestCase):
+
+    def test_simple(self):
+        args = {"file_type": ".csv", "csv_block_size": 100, "csv_n_jobs": 4}
+        self.assertEqual(execution.get_database_kwargs(args),
+                         {"block_size": 100, "n_jobs": 4})
+        self.assertEqual(execution.get_database_kwargs(
+            dict(args, file_type=".hdf5")), {})
+
 
 class Test_init_log_file(unittest.TestCase):
 
@@ -74,6 +95,82 @@ class Test_init_log_file(unittest.TestCase):
             "tmp_tests", "test_dataset", "debug_started")))
 
 
+    def test_log_per_benchmark(self):
+        first_dir = execution.init_log_file(name="first_dataset", views=[],
+                                            cl_type="", log=False,
+                                            debug=False, label="log",
+                                            result_directory=tmp_path,
+                                            args={})
+        logging.info("first message")
+        second_dir = execution.init_log_file(name="second_dataset", views=[],
+                                             cl_type="", log=False,
+                                             debug=False, label="log",
+                                             result_directory=tmp_path,
+                                             args={})
+        logging.info("second message")
+        for directory, message, other_message in [
+                (first_dir, "first message", "second message"),
+                (second_dir, "second message", "first message")]:
+            log_file_name = [file_name for file_name in os.listdir(directory)
+                             if file_name.endswith("LOG.log")][0]
+            with open(os.path.join(directory, log_file_name)) as log_file:
+                log = log_file.read()
+            self.assertIn(message, log)
+            self.assertNotIn(other_message, log)
+        self.assertEqual(len([handler for handler
+                              in logging.getLogger().handlers
+                              if getattr(handler, "is_benchmark_handler",
+                                         False)]), 1)
+
+
+class Test_resume(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rm_tmp()
+        os.mkdir(tmp_path)
+        cls.res_dir = execution.init_log_file(name="test_dataset",
+                                              views=["V1"], cl_type="",
+                                              log=False, debug=False,
+                                              label="resume",
+                                              result_directory=tmp_path,
+                                              args={"name": ["test_dataset",
+                                                             "other"],
+                                                    "stats_iter": 3})
+        cls.splits = [[np.array([0, 2, 4]), np.array([1, 3])],
+                      [np.array([1, 2, 3]), np.array([0, 4])]]
+        cls.directories = [os.path.join(cls.res_dir, "iter_1"),
+                           os.path.join(cls.res_dir, "iter_2")]
+        for (train_indices, _), directory in zip(cls.splits,
+                                                 cls.directories):
+            os.mkdir(directory)
+            np.savetxt(os.path.join(directory, "train_indices.csv"),
+                       train_indices, delimiter=",")
+
+    @classmethod
+    def tearDownClass(cls):
+        rm_tmp()
+
+    def test_get_resumed_args(self):
+        args = execution.get_resumed_args(self.res_dir)
+        self.assertEqual(args["name"], ["test_dataset"])
+        self.assertEqual(args["stats_iter"], 3)
+        self.assertEqual(args["resume"], self.res_dir)
+        self.assertEqual(execution.init_log_file(
+            name="test_dataset", views=["V1"], cl_type="", log=False,
+            debug=False, label="other", result_directory=tmp_path,
+            args=args), self.res_dir)
+
+    def test_get_resumed_args_no_benchmark(self):
+        self.assertRaises(NameError, execution.get_resumed_args,
+                          os.path.join(tmp_path, "not_a_benchmark"))
+
+    def test_check_resumed_splits(self):
+        execution.check_resumed_splits(self.splits, self.directories)
+        self.assertRaises(ValueError, execution.check_resumed_splits,
+                          self.splits[::-1], self.directories)
+
+
 class Test_gen_k_folds(unittest.TestCase):
 
     @classmethod
@@ -142,6 +239,8 @@ class Test_find_dataset_names(unittest.TestCase):
             file_stream.write("test")
         with open(os.path.join(tmp_path, "test1.txt"), "w") as file_stream:
             file_stream.write("test")
+        os.mkdir(os.path.join(tmp_path, "test_dir.npy"))
+        np.save(os.path.join(tmp_path, "test_file.npy"), np.zeros(1))
 
     @classmethod
     def tearDownClass(cls):
@@ -158,6 +257,8 @@ class Test_find_dataset_names(unittest.TestCase):
         path, names = execution.find_dataset_names(
             os.path.join("examples","data"), ".hdf5", ["all"])
         self.assertIn("doc_summit", names)
+        path, names = execution.find_dataset_names(tmp_path, ".npy", ["all"])
+        self.assertEqual(names, ["test_dir"])
         self.assertRaises(ValueError, execution.find_dataset_names, tmp_path + "test", ".txt",
                           ["test"])
         self.assertRaises(
@@ -217,6 +318,13 @@ class Test_getDatabaseFunction(unittest.TestCase):
             get_classic_db_hdf5
         cls.assertEqual(getDB, get_classic_db_hdf5)
 
+    def test_npy(cls):
+        cls.type = ".npy"
+        getDB = execution.get_database_function(cls.name, cls.type)
+        from summit.multiview_platform.utils.get_multiview_db import \
+            get_classic_db_npy
+        cls.assertEqual(getDB, get_classic_db_npy)
+
     def test_plausible_hdf5(cls):
         cls.name = "plausible"
         cls.type = ".hdf5"
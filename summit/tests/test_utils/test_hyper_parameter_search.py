@@ -10,7 +10,7 @@ from sklearn.base import BaseEstimator
 import sys
 
 
-from summit.multiview_platform.utils.dataset import HDF5Dataset
+from summit.multiview_platform.utils.dataset import HDF5Dataset, RAMDataset
 from summit.multiview_platform.utils import hyper_parameter_search
 from summit.multiview_platform.multiview_classifiers import weighted_linear_early_fusion
 
@@ -19,6 +19,7 @@ class FakeEstim(BaseEstimator):
     def __init__(self, param1=None, param2=None, random_state=None):
         self.param1 = param1
         self.param2 = param2
+        self.random_state = random_state
 
     def fit(self, X, y,):
         return self
@@ -145,6 +146,331 @@ class Test_Random(unittest.TestCase):
         self.assertEqual(RSCV.best_params_["param1"], "return exact")
 
 
+class FailingEstimMV(FakeEstimMV):
+
+    def fit(self, X, y, train_indices=None, view_indices=None):
+        if self.param2 == "fail":
+            raise ValueError("fake failure")
+        return FakeEstimMV.fit(self, X, y, train_indices=train_indices,
+                               view_indices=view_indices)
+
+
+class Test_parallel_fit_multiview(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.y = np.random.RandomState(42).randint(0, 2, 10)
+        cls.X = RAMDataset(views=[test_dataset.get_v(view_index)
+                                  for view_index in
+                                  range(test_dataset.nb_view)],
+                           labels=cls.y, are_sparse=False,
+                           view_names=["view_{}".format(view_index)
+                                       for view_index in
+                                       range(test_dataset.nb_view)],
+                           labels_names=["0", "1"])
+
+    def search(self, n_jobs, X):
+        RSCV = hyper_parameter_search.Random(
+            FailingEstimMV(), {"param1": [10, "return exact"],
+                               "param2": [11, "fail", 101]},
+            n_iter=6, n_jobs=n_jobs, scoring=make_scorer(accuracy_score),
+            cv=StratifiedKFold(2), random_state=np.random.RandomState(42),
+            learning_indices=np.arange(10), framework="multiview",
+            equivalent_draws=False)
+        return RSCV.fit(X, self.y)
+
+    def test_same_as_serial(self):
+        serial = self.search(1, self.X)
+        for X in [self.X, test_dataset]:
+            parallel = self.search(2, X)
+            np.testing.assert_array_equal(
+                parallel.cv_results_["mean_test_score"],
+                serial.cv_results_["mean_test_score"])
+            self.assertEqual(parallel.cv_results_["params"],
+                             serial.cv_results_["params"])
+            self.assertEqual(parallel.best_params_, serial.best_params_)
+            self.assertEqual(parallel.tracebacks_params,
+                             serial.tracebacks_params)
+            self.assertEqual(len(parallel.tracebacks),
+                             len(serial.tracebacks))
+        self.assertEqual(serial.best_params_["param1"], "return exact")
+        self.assertTrue(serial.tracebacks)
+        self.assertIn("fake failure", serial.tracebacks[0])
+
+
+class Test_Halving(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rm_tmp()
+        os.mkdir(tmp_path)
+        cls.random_state = np.random.RandomState(42)
+        cls.y = cls.random_state.randint(0, 2, 40)
+        cls.param_distributions = {"param1": list(range(8))
+                                             + ["return exact"],
+                                   "param2": [11]}
+
+    @classmethod
+    def tearDownClass(cls):
+        rm_tmp()
+
+    def test_fit_multiview(self):
+        halving = hyper_parameter_search.Halving(
+            FakeEstimMV(), self.param_distributions, n_iter=9, factor=3,
+            min_resources=2, scoring=make_scorer(accuracy_score),
+            cv=StratifiedKFold(2), random_state=np.random.RandomState(42),
+            learning_indices=np.arange(40), framework="multiview",
+            equivalent_draws=False)
+        halving.fit(test_dataset, self.y)
+        self.assertEqual(halving.n_iterations_, 3)
+        self.assertEqual(np.bincount(halving.cv_results_["rung"]).tolist(),
+                         [9, 3, 1])
+        self.assertEqual(sorted(set(halving.cv_results_["n_resources"])),
+                         [2, 6, 18])
+        self.assertEqual(halving.best_params_["param1"], "return exact")
+        halving.gen_report(os.path.join(tmp_path, "halving-"))
+        with open(os.path.join(tmp_path, "halving-hps_report.txt")) as report:
+            report = report.read()
+        self.assertEqual(report.count("rung 3/3"), 1)
+        self.assertEqual(report.count("rung 2/3"), 2)
+        self.assertEqual(report.count("rung 1/3"), 6)
+        self.assertLess(report.index("return exact"), report.index("rung 2/3"))
+
+    def test_fit_monoview(self):
+        halving = hyper_parameter_search.Halving(
+            FakeEstim(), {"param1": [10, 100, 1000], "param2": [11]},
+            n_iter=3, factor=3, min_resources=6,
+            scoring=make_scorer(accuracy_score), cv=StratifiedKFold(2),
+            random_state=np.random.RandomState(42), framework="monoview")
+        X = self.random_state.randint(0, 100, (40, 5))
+        halving.fit(X, self.y)
+        self.assertEqual(list(halving.cv_results_["rung"]), [0, 0, 0, 1])
+        self.assertIn("param1", halving.get_best_params())
+
+
+class Test_Bayesian(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.random_state = np.random.RandomState(42)
+        cls.y = cls.random_state.randint(0, 2, 20)
+
+    def test_fit_multiview(self):
+        bayesian = hyper_parameter_search.Bayesian(
+            FakeEstimMV(), {"param1": list(range(8)) + ["return exact"],
+                            "param2": [11, 12]},
+            n_iter=10, n_startup=3, batch_size=2,
+            scoring=make_scorer(accuracy_score), cv=StratifiedKFold(2),
+            random_state=np.random.RandomState(42),
+            learning_indices=np.arange(20), framework="multiview",
+            equivalent_draws=False)
+        bayesian.fit(test_dataset, self.y)
+        params = [(candidate["param1"], candidate["param2"])
+                  for candidate in bayesian.cv_results_["params"]]
+        self.assertEqual(len(params), 10)
+        self.assertEqual(len(set(params)), 10)
+        self.assertEqual(bayesian.best_params_["param1"], "return exact")
+
+    def test_fit_monoview(self):
+        bayesian = hyper_parameter_search.Bayesian(
+            FakeEstim(), {"param1": {"Randint": {"low": 1, "high": 50}},
+                          "param2": ["a", "b"]},
+            n_iter=6, n_startup=2, scoring=make_scorer(accuracy_score),
+            cv=StratifiedKFold(2), random_state=np.random.RandomState(42),
+            framework="monoview")
+        bayesian.fit(self.random_state.randint(0, 100, (20, 5)), self.y)
+        self.assertEqual(len(bayesian.cv_results_["params"]), 6)
+
+    def test_suggest_log_scale(self):
+        distribution = hyper_parameter_search.CustomUniform(
+            loc=0, state=10, multiplier="e-")
+        self.assertAlmostEqual(
+            distribution.unmultiply(distribution.multiply(3.5)), 3.5)
+        random_state = np.random.RandomState(42)
+        history = [({"C": 10. ** -exponent}, exponent)
+                   for exponent in random_state.uniform(0, 10, 20)]
+        suggestions = hyper_parameter_search.suggest_tpe(
+            {"C": distribution}, history, [params for params, _ in history],
+            4, random_state)
+        self.assertEqual(len(suggestions), 4)
+        self.assertGreater(np.mean([-np.log10(params["C"])
+                                    for params in suggestions]), 5)
+
+    def test_suggest_exhausted(self):
+        history = [({"param": value}, value) for value in [1, 2]]
+        self.assertEqual(hyper_parameter_search.suggest_tpe(
+            {"param": [1, 2]}, history, [params for params, _ in history], 2,
+            np.random.RandomState(42)), [])
+
+
+class ViewReadingEstimMV(FakeEstimMV):
+    """Predicts from the sum of the rows of the first view"""
+    datasets = []
+
+    def fit(self, X, y, train_indices=None, view_indices=None):
+        self.datasets.append(type(X).__name__)
+        self.threshold = np.median(X.get_v(0, train_indices).sum(axis=1))
+        return self
+
+    def predict(self, X, sample_indices=None, view_indices=None):
+        return (X.get_v(0, sample_indices).sum(axis=1)
+                > self.threshold * self.param1).astype(int)
+
+
+class Test_fold_cache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        random_state = np.random.RandomState(42)
+        cls.y = random_state.randint(0, 2, 40)
+        cls.X = RAMDataset(views=[random_state.randint(0, 100, (40, 6))
+                                  for _ in range(2)],
+                           labels=cls.y, are_sparse=False,
+                           view_names=["view_0", "view_1"],
+                           labels_names=["0", "1"])
+
+    def search(self, fold_cache_size):
+        ViewReadingEstimMV.datasets = []
+        RSCV = hyper_parameter_search.Random(
+            ViewReadingEstimMV(), {"param1": [0.5, 0.9, 1, 1.1, 1.5],
+                                   "param2": [11]},
+            n_iter=5, scoring=make_scorer(accuracy_score),
+            cv=StratifiedKFold(3), random_state=np.random.RandomState(42),
+            learning_indices=np.arange(40), framework="multiview",
+            equivalent_draws=False, fold_cache_size=fold_cache_size)
+        return RSCV.fit(self.X, self.y)
+
+    def test_same_results(self):
+        uncached = self.search(0)
+        self.assertNotIn("FoldDataset", ViewReadingEstimMV.datasets)
+        cached = self.search(10 ** 6)
+        self.assertIn("FoldDataset", ViewReadingEstimMV.datasets)
+        np.testing.assert_array_equal(cached.cv_results_["mean_test_score"],
+                                      uncached.cv_results_["mean_test_score"])
+        self.assertEqual(cached.cv_results_["params"],
+                         uncached.cv_results_["params"])
+
+
+class RacingEstimMV(FakeEstimMV):
+    """Predicts the labels of the first param1 / 8 of the samples"""
+
+    def predict(self, X, sample_indices=None, view_indices=None):
+        n_exact = int(len(sample_indices) * self.param1 / 8)
+        prediction = 1 - self.y[sample_indices]
+        prediction[:n_exact] = self.y[sample_indices][:n_exact]
+        return prediction
+
+
+class Test_pruning(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rm_tmp()
+        os.mkdir(tmp_path)
+        cls.y = np.random.RandomState(42).randint(0, 2, 40)
+
+    @classmethod
+    def tearDownClass(cls):
+        rm_tmp()
+
+    def search(self, **pruning_args):
+        RSCV = hyper_parameter_search.Random(
+            RacingEstimMV(), {"param1": list(range(9)), "param2": [11]},
+            n_iter=9, scoring=make_scorer(accuracy_score),
+            cv=StratifiedKFold(4), random_state=np.random.RandomState(42),
+            learning_indices=np.arange(40), framework="multiview",
+            equivalent_draws=False, **pruning_args)
+        return RSCV.fit(test_dataset, self.y)
+
+    def test_median(self):
+        RSCV = self.search(pruning="median")
+        self.assertEqual(len(RSCV.cv_results_["params"]), 9)
+        self.assertTrue(any(RSCV.cv_results_["pruned"]))
+        for pruned, n_folds in zip(RSCV.cv_results_["pruned"],
+                                   RSCV.cv_results_["n_folds"]):
+            self.assertEqual(n_folds < 4, pruned)
+        self.assertEqual(RSCV.best_params_["param1"], 8)
+        RSCV.gen_report(os.path.join(tmp_path, "pruning-"))
+        with open(os.path.join(tmp_path, "pruning-hps_report.txt")) as report:
+            report = report.read()
+        self.assertEqual(report.count("pruned after"),
+                         sum(RSCV.cv_results_["pruned"]))
+
+    def test_ttest(self):
+        RSCV = self.search(pruning="ttest", pruning_warmup=2)
+        self.assertEqual(RSCV.best_params_["param1"], 8)
+        pruned_folds = [n_folds for pruned, n_folds
+                        in zip(RSCV.cv_results_["pruned"],
+                               RSCV.cv_results_["n_folds"]) if pruned]
+        self.assertTrue(pruned_folds)
+        self.assertTrue(all(n_folds >= 2 for n_folds in pruned_folds))
+
+    def test_unknown_rule(self):
+        with self.assertRaises(ValueError):
+            self.search(pruning="unknown")
+
+
+class Test_partial_report(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rm_tmp()
+        os.mkdir(tmp_path)
+        cls.random_state = np.random.RandomState(42)
+        cls.y = cls.random_state.randint(0, 2, 10)
+        cls.file_name = os.path.join(tmp_path, "hps_partial_report.txt")
+
+    @classmethod
+    def tearDownClass(cls):
+        rm_tmp()
+
+    def test_record_monoview(self):
+        RSCV = hyper_parameter_search.Random(
+            FakeEstim(), {"param1": [10, 100], "param2": [11, 101]}, n_iter=4,
+            scoring=make_scorer(accuracy_score), cv=StratifiedKFold(2),
+            random_state=np.random.RandomState(42), framework="monoview",
+            equivalent_draws=False, partial_report_file_name=self.file_name)
+        RSCV.init_partial_report()
+        scorer = hyper_parameter_search.PartialReportScorer(RSCV.scoring,
+                                                            RSCV)
+        X = self.random_state.randint(0, 100, (10, 11))
+        for param1 in [10, 10, 100]:
+            score = scorer(FakeEstim(param1=param1).fit(X, self.y), X, self.y)
+            self.assertEqual(score, accuracy_score(self.y, np.zeros(10)))
+        with open(self.file_name) as partial_report:
+            self.assertEqual(len(partial_report.readlines()), 3)
+        self.assertTrue(hyper_parameter_search.summarize_partial_report(
+            self.file_name).startswith("2 candidates evaluated"))
+
+    def test_record_multiview(self):
+        RSCV = hyper_parameter_search.Random(
+            FakeEstimMV(), {"param1": [10, "return exact"], "param2": [11]},
+            n_iter=2, scoring=make_scorer(accuracy_score),
+            cv=StratifiedKFold(2), random_state=np.random.RandomState(42),
+            learning_indices=np.array([0, 1, 2, 3, 4, ]),
+            framework="multiview", equivalent_draws=False,
+            partial_report_file_name=self.file_name)
+        RSCV.fit(test_dataset, self.y)
+        summary = hyper_parameter_search.summarize_partial_report(
+            self.file_name)
+        self.assertIn("return exact", summary)
+        self.assertTrue(summary.endswith("1.0"))
+        # The report of the completed search replaces the partial one
+        RSCV.gen_report(os.path.join(tmp_path, "test-"))
+        self.assertFalse(os.path.exists(self.file_name))
+
+    def test_summarize_interrupted(self):
+        with open(self.file_name, "w") as partial_report:
+            partial_report.write('{"params": {"param1": 1}, "score": 0.5}\n'
+                                 '{"params": {"param1": 2}, "sc')
+        self.assertTrue(hyper_parameter_search.summarize_partial_report(
+            self.file_name).startswith("1 candidates evaluated"))
+        with open(self.file_name, "w") as partial_report:
+            partial_report.write("")
+        self.assertEqual(hyper_parameter_search.summarize_partial_report(
+            self.file_name), "No candidate was evaluated")
+
+
 class Test_Grid(unittest.TestCase):
 
     @classmethod
@@ -0,0 +1,46 @@
+import os
+import pickle
+import unittest
+
+from summit.tests.utils import rm_tmp, tmp_path
+
+from summit.multiview_platform.utils import organization
+
+
+class Test_task_results(unittest.TestCase):
+
+    def setUp(self):
+        rm_tmp()
+        os.mkdir(tmp_path)
+
+    def tearDown(self):
+        rm_tmp()
+
+    def test_save_load(self):
+        organization.save_task_results(tmp_path, 3, "decision_tree-V1",
+                                       [{"score": 0.5}], {},
+                                       random_state=("MT19937", 1))
+        self.assertEqual(organization.load_task_results(tmp_path, 3,
+                                                        "decision_tree-V1"),
+                         ([{"score": 0.5}], {}, ("MT19937", 1)))
+        self.assertEqual(os.listdir(os.path.join(tmp_path, "checkpoints")),
+                         ["3-decision_tree-V1.pickle"])
+
+    def test_previous_version(self):
+        file_name = organization.get_checkpoint_path(tmp_path, 0, "svm")
+        organization.secure_file_path(file_name)
+        with open(file_name, "wb") as handle:
+            pickle.dump(([{"score": 0.5}], {}), handle)
+        self.assertEqual(organization.load_task_results(tmp_path, 0, "svm"),
+                         ([{"score": 0.5}], {}, None))
+
+    def test_not_run(self):
+        self.assertIsNone(organization.load_task_results(tmp_path, 0,
+                                                         "decision_tree-V1"))
+
+    def test_truncated(self):
+        file_name = organization.get_checkpoint_path(tmp_path, 0, "svm")
+        organization.secure_file_path(file_name)
+        with open(file_name, "wb") as handle:
+            handle.write(b"\x80")
+        self.assertIsNone(organization.load_task_results(tmp_path, 0, "svm"))
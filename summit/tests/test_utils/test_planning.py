@@ -0,0 +1,132 @@
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from summit.multiview_platform.utils import planning
+from summit.tests.utils import rm_tmp, tmp_path
+
+
+def fake_task(name, flag, position, duration, memory=1):
+    return {"name": name, "flag": flag, "position": position,
+            "expected_duration": duration, "memory": memory}
+
+
+class Test_fit_cost_model(unittest.TestCase):
+
+    def test_power_law(self):
+        history = [("svm_rbf", size, 2e-6 * size ** 2)
+                   for size in [100, 1000, 10000]]
+        coef, exponent = planning.fit_cost_model(history)["svm_rbf"]
+        np.testing.assert_almost_equal(exponent, 2)
+        np.testing.assert_almost_equal(
+            planning.estimate_duration({"svm_rbf": (coef, exponent)},
+                                       "svm_rbf-view_0", 5000), 50)
+
+    def test_single_size(self):
+        cost_model = planning.fit_cost_model([("knn", 100, 1.0),
+                                              ("knn", 100, 3.0)])
+        self.assertEqual(cost_model["knn"][1], 1.0)
+        np.testing.assert_almost_equal(
+            planning.estimate_duration(cost_model, "knn-view_0", 200),
+            2 * np.sqrt(3))
+
+    def test_unknown_sizes(self):
+        cost_model = planning.fit_cost_model([("knn", None, 1.0),
+                                              ("knn", None, 3.0)])
+        self.assertEqual(cost_model["knn"], (2.0, 0.0))
+        self.assertIsNone(planning.estimate_duration(cost_model,
+                                                     "adaboost-view_0", 10))
+
+
+class Test_simulate_schedule(unittest.TestCase):
+
+    def test_list_scheduling(self):
+        starts, workers, makespan = planning.simulate_schedule([4, 1, 1, 1],
+                                                               2)
+        self.assertEqual(starts, [0, 0, 1, 2])
+        self.assertEqual(workers, [0, 1, 1, 1])
+        self.assertEqual(makespan, 4)
+
+    def test_peak(self):
+        self.assertEqual(planning.get_peak([0, 0, 1, 2], [4, 1, 1, 1],
+                                           [10, 1, 2, 3]), 13)
+        # A job starting when another ends does not overlap it
+        self.assertEqual(planning.get_peak([0, 1], [1, 1], [5, 5]), 5)
+
+
+class Test_plan_schedule(unittest.TestCase):
+
+    def setUp(self):
+        self.tasks = [fake_task("a", 0, 0, 3, memory=10),
+                      fake_task("b", 0, 1, 1, memory=20),
+                      fake_task("a", 1, 0, 1, memory=10),
+                      fake_task("b", 1, 1, 1, memory=20)]
+
+    def test_iterations(self):
+        plan = planning.plan_schedule(self.tasks, 2)
+        self.assertEqual(plan["total_time"], 4)
+        self.assertEqual(plan["critical_path_time"], 4)
+        self.assertEqual([task["flag"] for task in plan["critical_path"]],
+                         [0, 0])
+        self.assertEqual(plan["peak_memory"], 40)
+
+    def test_tasks(self):
+        plan = planning.plan_schedule(self.tasks, 2, scheduler="tasks")
+        self.assertEqual(plan["total_time"], 3)
+        self.assertEqual(plan["peak_memory"], 30)
+
+    def test_mono_core(self):
+        plan = planning.plan_schedule(self.tasks, 1, scheduler="tasks")
+        self.assertEqual(plan["total_time"], 6)
+        self.assertEqual(len(plan["critical_path"]), 4)
+
+
+class Test_load_cost_history(unittest.TestCase):
+
+    def setUp(self):
+        rm_tmp()
+        self.run_directory = os.path.join(tmp_path, "dataset",
+                                          "started_2020_01_01-00_00_")
+        for iteration in ["iter_1", "iter_2"]:
+            os.makedirs(os.path.join(self.run_directory, iteration))
+            pd.DataFrame({"hps": [1.0, 0.0], "fit": [2.0, 4.0],
+                          "pred": [0.0, 1.0]},
+                         index=["knn-view_0", "late_fusion"]).to_csv(
+                os.path.join(self.run_directory, iteration,
+                             "2020_01_01-00_00-dataset-durations_dataframe"
+                             ".csv"))
+        open(os.path.join(self.run_directory, "config_file.yml"),
+             "w").close()
+        self.asked = []
+
+    def tearDown(self):
+        rm_tmp()
+
+    def fake_get_run_sizes(self, run_directory):
+        self.asked.append(run_directory)
+        return 10, {"view_0": 3, "view_1": 2}
+
+    def test_history(self):
+        history = planning.load_cost_history(tmp_path,
+                                             self.fake_get_run_sizes)
+        self.assertEqual(self.asked, [self.run_directory])
+        self.assertEqual(sorted(history), [("knn", 30, 3.0),
+                                           ("knn", 30, 3.0),
+                                           ("late_fusion", 50, 5.0),
+                                           ("late_fusion", 50, 5.0)])
+
+    def test_unknown_sizes(self):
+        def failing_get_run_sizes(run_directory):
+            raise OSError("The dataset is not available")
+        history = planning.load_cost_history(tmp_path,
+                                             failing_get_run_sizes)
+        self.assertEqual(sorted(history), [("knn", None, 3.0),
+                                           ("knn", None, 3.0),
+                                           ("late_fusion", None, 5.0),
+                                           ("late_fusion", None, 5.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
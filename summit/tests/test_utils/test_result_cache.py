@@ -0,0 +1,116 @@
+import os
+import time
+import unittest
+
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+
+from summit.tests.utils import rm_tmp, tmp_path
+
+from summit.multiview_platform.utils.result_cache import ResultCache, \
+    hash_random_state, collect_outputs, restore_outputs
+
+
+class Test_ResultCache(unittest.TestCase):
+
+    def setUp(self):
+        rm_tmp()
+        self.cache = ResultCache(tmp_path, 10 ** 6, "fingerprint")
+        self.key_args = dict(
+            task_type="monoview",
+            arguments={"classifier_name": "decision_tree",
+                       "decision_tree": {"max_depth": 3}},
+            classification_indices=[np.arange(5), np.arange(5, 10)],
+            k_folds=StratifiedKFold(n_splits=2, shuffle=True,
+                                    random_state=np.random.RandomState(4)),
+            random_state=np.random.RandomState(42),
+            hyper_param_search="None", metrics={"accuracy_score": {}},
+            labels_dictionary={0: "a", 1: "b"}, hps_iter=1)
+
+    def tearDown(self):
+        rm_tmp()
+
+    def test_get_key(self):
+        key = self.cache.get_key(**self.key_args)
+        self.assertEqual(key, self.cache.get_key(**self.key_args))
+        for name, value in [
+                ("arguments", {"classifier_name": "decision_tree",
+                               "decision_tree": {"max_depth": 4}}),
+                ("classification_indices", [np.arange(4), np.arange(4, 10)]),
+                ("random_state", np.random.RandomState(43)),
+                ("hyper_param_search", "Random")]:
+            self.assertNotEqual(key, self.cache.get_key(
+                **dict(self.key_args, **{name: value})))
+        self.assertNotEqual(key, ResultCache(tmp_path, 10 ** 6,
+                                             "other").get_key(**self.key_args))
+
+    def test_get_put(self):
+        self.assertIsNone(self.cache.get("0123"))
+        self.cache.put("0123", {"score": 0.5})
+        self.assertEqual(self.cache.get("0123"), {"score": 0.5})
+
+    def test_evict(self):
+        result = np.zeros(1000)
+        self.cache.put("00", result)
+        self.cache.put("01", result)
+        self.cache.max_size = 2.5 * os.path.getsize(self.cache.get_path("00"))
+        past = time.time() - 100
+        os.utime(self.cache.get_path("00"), (past, past))
+        os.utime(self.cache.get_path("01"), (past + 1, past + 1))
+        # Reading 00 makes 01 the least recently used result
+        self.cache.get("00")
+        self.cache.put("02", result)
+        self.assertIsNotNone(self.cache.get("00"))
+        self.assertIsNone(self.cache.get("01"))
+        self.assertIsNotNone(self.cache.get("02"))
+
+    def test_scan_over_budget(self):
+        scans = []
+        scan = self.cache.scan
+
+        def counting_scan():
+            scans.append(1)
+            return scan()
+        self.cache.scan = counting_scan
+        result = np.zeros(1000)
+        for key in ["00", "01", "02"]:
+            self.cache.put(key, result)
+        # Only once, to know the size of the cache
+        self.assertEqual(len(scans), 1)
+        self.cache.put("00", result)
+        self.assertEqual(self.cache.size,
+                         3 * os.path.getsize(self.cache.get_path("00")))
+        self.cache.max_size = self.cache.size - 1
+        self.cache.put("03", result)
+        self.assertEqual(len(scans), 2)
+        self.assertLessEqual(self.cache.size, self.cache.max_size)
+
+    def test_outputs(self):
+        output_directory = os.path.join(tmp_path, "run", "decision_tree",
+                                        "view_0")
+        os.makedirs(os.path.join(output_directory, "images"))
+        files = {os.path.join("view_0", "summary.txt"): b"summary",
+                 os.path.join("view_0", "images", "a.png"): b"\x89PNG",
+                 "view_0feature_importances.pickle": b"importances"}
+        for relative_path, content in files.items():
+            with open(os.path.join(tmp_path, "run", "decision_tree",
+                                   relative_path), "wb") as file:
+                file.write(content)
+        # The outputs of an other view are not collected
+        open(os.path.join(tmp_path, "run", "decision_tree",
+                          "view_1feature_importances.pickle"), "w").close()
+        outputs = collect_outputs(output_directory)
+        self.assertEqual(outputs, files)
+        restored_directory = os.path.join(tmp_path, "restored",
+                                          "decision_tree", "view_0")
+        restore_outputs(restored_directory, outputs)
+        self.assertEqual(collect_outputs(restored_directory), outputs)
+
+    def test_hash_random_state(self):
+        random_state = np.random.RandomState(42)
+        state_hash = hash_random_state(random_state)
+        self.assertEqual(state_hash,
+                         hash_random_state(np.random.RandomState(42)))
+        random_state.randint(10)
+        self.assertNotEqual(state_hash, hash_random_state(random_state))
+        self.assertEqual(hash_random_state(42), "42")
@@ -0,0 +1,74 @@
+import os
+import time
+import unittest
+
+import numpy as np
+
+from summit.multiview_platform.utils import supervision
+
+
+def fake_task(value=0, duration=0, size_mb=0):
+    memory = np.ones(int(size_mb * 1024 * 1024 / 8))
+    time.sleep(duration)
+    return value + memory.shape[0] * 0
+
+
+def fake_failing_task():
+    raise ValueError("fake error")
+
+
+def fake_dying_task():
+    os._exit(3)
+
+
+class Test_get_task_limits(unittest.TestCase):
+
+    def test_global(self):
+        limits = supervision.get_task_limits({"timeout_s": 10}, "svm_poly")
+        self.assertEqual(limits, {"timeout_s": 10, "max_rss_mb": None})
+
+    def test_classifier(self):
+        args = {"timeout_s": 10, "max_rss_mb": 100,
+                "task_limits": {"svm_poly": {"timeout_s": 20}}}
+        self.assertEqual(supervision.get_task_limits(args, "svm_poly"),
+                         {"timeout_s": 20, "max_rss_mb": 100})
+        self.assertEqual(supervision.get_task_limits(args, "svm_rbf"),
+                         {"timeout_s": 10, "max_rss_mb": 100})
+
+
+class Test_run_supervised(unittest.TestCase):
+
+    def test_result(self):
+        output = supervision.run_supervised(fake_task, {"value": 4},
+                                            timeout_s=10, max_rss_mb=10000,
+                                            poll_interval=0.05)
+        self.assertEqual(output, 4)
+
+    def test_timeout(self):
+        start = time.monotonic()
+        with self.assertRaises(supervision.TaskLimitExceeded) as context:
+            supervision.run_supervised(fake_task, {"duration": 30},
+                                       timeout_s=0.5, poll_interval=0.05)
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertIn("timeout_s=0.5", str(context.exception))
+
+    @unittest.skipIf(supervision.get_rss(os.getpid()) is None,
+                     "The memory is only measured on Linux")
+    def test_max_rss(self):
+        with self.assertRaises(supervision.TaskLimitExceeded) as context:
+            supervision.run_supervised(fake_task, {"duration": 30,
+                                                   "size_mb": 200},
+                                       max_rss_mb=150, poll_interval=0.05)
+        self.assertIn("max_rss_mb=150", str(context.exception))
+
+    def test_error(self):
+        with self.assertRaises(supervision.SupervisedTaskError) as context:
+            supervision.run_supervised(fake_failing_task, {}, timeout_s=10,
+                                       poll_interval=0.05)
+        self.assertIn("ValueError: fake error", str(context.exception))
+
+    def test_died(self):
+        with self.assertRaises(supervision.SupervisedTaskError) as context:
+            supervision.run_supervised(fake_dying_task, {}, timeout_s=10,
+                                       poll_interval=0.05)
+        self.assertIn("exit code 3", str(context.exception))
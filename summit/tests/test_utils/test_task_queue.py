@@ -0,0 +1,86 @@
+import os
+import pickle
+import time
+import unittest
+from multiprocessing import Process
+
+from summit.tests.utils import rm_tmp, tmp_path
+
+from summit.multiview_platform.utils.task_queue import TaskQueue, get_run_id
+
+
+def fake_exec_task(dataset_var=None, value=0):
+    if value < 0:
+        raise ValueError("negative value")
+    return [dataset_var, value * 2, os.getpid()]
+
+
+def fake_worker(queue_dir):
+    TaskQueue(queue_dir, poll_interval=0.05).work(fake_exec_task,
+                                                   idle_timeout=1)
+
+
+class Test_TaskQueue(unittest.TestCase):
+
+    def setUp(self):
+        rm_tmp()
+        self.queue = TaskQueue(tmp_path, lease_timeout=60,
+                               poll_interval=0.05)
+
+    def tearDown(self):
+        rm_tmp()
+
+    def test_claim(self):
+        self.queue.submit("1-b", {})
+        self.queue.submit("0-a", {})
+        self.assertEqual(self.queue.claim(), "0-a")
+        self.assertEqual(self.queue.claim(), "1-b")
+        self.assertIsNone(self.queue.claim())
+        self.queue.release("0-a")
+        self.assertEqual(self.queue.claim(), "0-a")
+
+    def test_requeue_expired(self):
+        self.queue.submit("0-a", {})
+        self.queue.submit("1-b", {})
+        self.queue.claim()
+        self.queue.claim()
+        past = time.time() - 120
+        os.utime(self.queue.get_path("running", "0-a"), (past, past))
+        self.queue.requeue_expired()
+        self.assertEqual(os.listdir(self.queue.get_path("pending", "")),
+                         ["0-a"])
+        self.assertEqual(os.listdir(self.queue.get_path("running", "")),
+                         ["1-b"])
+
+    def test_work(self):
+        self.queue.submit_dataset("data", "run")
+        self.queue.submit("0-a", {"dataset_name": "run.pickle", "value": 3})
+        self.queue.submit("1-b", {"dataset_name": "run.pickle",
+                                  "value": -1})
+        self.assertEqual(self.queue.work(fake_exec_task, idle_timeout=0), 2)
+        with open(self.queue.get_path("done", "0-a"), "rb") as handle:
+            self.assertEqual(pickle.load(handle)["results"],
+                             ["data", 6, os.getpid()])
+        with open(self.queue.get_path("done", "1-b"), "rb") as handle:
+            self.assertIn("negative value",
+                          pickle.load(handle)["error"])
+        self.assertEqual(os.listdir(self.queue.get_path("running", "")), [])
+
+    def test_run_local_workers(self):
+        workers = [Process(target=fake_worker, args=(tmp_path,))
+                   for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        outcomes = dict(self.queue.run([(str(index), {"value": index})
+                                        for index in range(12)],
+                                       get_run_id(tmp_path), "data"))
+        for worker in workers:
+            worker.join()
+        self.assertEqual(sorted(outcomes, key=int),
+                         [str(index) for index in range(12)])
+        self.assertEqual([outcomes[str(index)]["results"][:2]
+                          for index in range(12)],
+                         [["data", index * 2] for index in range(12)])
+        self.assertNotIn(os.getpid(), [outcome["results"][2]
+                                       for outcome in outcomes.values()])
+        self.assertEqual(os.listdir(self.queue.get_path("datasets", "")), [])